@@ -2,9 +2,10 @@ import logging
 import os
 import subprocess
 import time
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import ClassVar, Dict, Optional
+from typing import ClassVar, Dict, List, Optional, Tuple, Type
 
 from appium.webdriver.common.appiumby import AppiumBy
 from selenium.common.exceptions import TimeoutException, InvalidElementStateException, StaleElementReferenceException, \
@@ -12,9 +13,23 @@ from selenium.common.exceptions import TimeoutException, InvalidElementStateExce
 from selenium.webdriver import ActionChains
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.wait import WebDriverWait
 
+from utils.adb_transport import AdbConnectionError, AdbError, get_transport
 from utils.config_loader import load_yaml_config
+from utils.display_settle import DISPLAY_SETTLE_TIMEOUT, DisplaySettleDetector
+from utils.driver_memo import bump_screen_epoch, get_driver_memo, memo_current_activity, memo_window_size
+from utils.driver_script import DriverScript
+from utils.list_rows import ListRowIndex
+from utils.log_events import EVENT_ACTIVITY_RESUMED, EVENT_TOAST, TOAST_LOOKBACK, LogEventSignal, LogEventWaiter, \
+    event_observed
+from utils.logcat_collector import get_logcat_collector
+from utils.screen_classifier import ScreenMatch, get_screen_classifier
+from utils.screenshot_service import get_screenshot_service
+from utils.trace_recorder import instrument_class
+from utils.ui_settle import UiSettleDetector
+from utils.ui_snapshot import SnapshotUnsupportedLocator, UiNode, get_cached_snapshot, invalidate_snapshot, \
+    store_snapshot
+from utils.wait_engine import DEFAULT_TIMEOUT, AdaptiveWait
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +49,26 @@ class BasePage:
         "css_selector": By.CSS_SELECTOR,
         "accessibility_id": AppiumBy.ACCESSIBILITY_ID,
     }
+    # 只读查询是否优先使用界面快照（一次 page_source 请求代替逐元素查询）
+    USE_UI_SNAPSHOT: ClassVar[bool] = True
+    # 快照最长复用时间（秒），防止界面自行刷新（如下载进度）后读到旧数据
+    SNAPSHOT_MAX_AGE: ClassVar[float] = 3.0
+    # 断言元素消失的默认等待时间（秒），不使用完整的页面超时
+    ABSENCE_TIMEOUT: ClassVar[float] = 3.0
+    # 批量点按后等待复选框变为选中的时间（秒），超时后对未选中的复选框补点一次
+    CHECK_CONFIRM_TIMEOUT: ClassVar[float] = 2.0
+    # Toast 入队日志中没有文本时，按预期文本查询界面的等待时间（秒）
+    TOAST_TEXT_TIMEOUT: ClassVar[float] = 2.0
+    # 界面识别：多个页面类共用同一定位器文件时，用必须存在/必须不存在的定位器键区分
+    SCREEN_REQUIRES: ClassVar[Tuple[str, ...]] = ()
+    SCREEN_EXCLUDES: ClassVar[Tuple[str, ...]] = ()
+    # 列表行定位器的属性名（如 root_layout）：翻页、返回的稳定检测只比较列表行，不对整个界面取哈希
+    LIST_ROW_PROPERTY: ClassVar[Optional[str]] = None
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # 页面方法计入时间线追踪（未在记录时只多一次判断）
+        instrument_class(cls)
     
     @classmethod
     def load_config(cls, config_path: Optional[str] = None) -> dict:
@@ -44,13 +79,7 @@ class BasePage:
         """
         final_path = config_path or cls.CONFIG_PATH
         if not final_path:
-            # 自动生成默认路径
-            class_name = cls.__name__
-            snake_case = ''.join(
-                ['_' + c.lower() if c.isupper() else c
-                 for c in class_name]
-            ).lstrip('_').replace('Page', '')
-            final_path = f"data/locators/{snake_case}.yaml"
+            final_path = cls.default_config_path()
             logger.info(f"自动生成配置路径: {final_path}")
         # 转换为绝对路径
         absolute_path = cls.resolve_config_path(final_path)
@@ -74,6 +103,15 @@ class BasePage:
             # 返回空字典避免后续操作失败
             return {}
     
+    @classmethod
+    def default_config_path(cls) -> str:
+        """按类名生成默认定位器文件路径（HomePage -> data/locators/home_page.yaml）"""
+        snake_case = ''.join(
+            ['_' + c.lower() if c.isupper() else c
+             for c in cls.__name__]
+        ).lstrip('_').replace('Page', '')
+        return f"data/locators/{snake_case}.yaml"
+    
     @classmethod
     def resolve_config_path(cls, path: str) -> str:
         """解析配置文件路径为绝对路径"""
@@ -84,7 +122,7 @@ class BasePage:
         # 基于项目根目录解析
         return str((cls.BASE_DIR / path).resolve())
     
-    def __init__(self, driver, platform=None, timeout=10, long_press_duration=2.0, device_id=None):
+    def __init__(self, driver, platform=None, timeout=None, long_press_duration=2.0, device_id=None):
         """
         :param driver: web drive实例（网盘）
         :param platform: 平台类型（android/ios）
@@ -99,16 +137,17 @@ class BasePage:
             "platformName", "android"
         ).lower()
         self.timeout = timeout or device_config.get(
-            "timeout", 10
+            "timeout", DEFAULT_TIMEOUT
         )
         self.long_press_duration = long_press_duration or device_config.get(
             "long_press_duration", 2.0
         )
         self.device_id = device_id or driver.capabilities.get('udid')
         logger.info(f"初始化页面: {self.__class__.__name__} | 平台: {self.platform}")
-        self.windows_width = self.driver.get_window_size()['width']
+        window_size = memo_window_size(self.driver)
+        self.windows_width = window_size['width']
         logger.info(f"当前设备窗口尺寸X为：{self.windows_width}")
-        self.windows_height = self.driver.get_window_size()['height']
+        self.windows_height = window_size['height']
         logger.info(f"当前设备窗口尺寸Y为：{self.windows_height}")
     
     def _execute_adb(self, command):
@@ -118,6 +157,16 @@ class BasePage:
         
         logger.debug(f"执行ADB命令: {full_cmd}")
         
+        try:
+            # 通过 adb server 直连执行，避免每条命令启动 adb 进程
+            return get_transport(self.device_id).shell(command)
+        except AdbConnectionError as e:
+            logger.warning(f"adb server 连接失败，改用 adb 子进程: {e}")
+        except AdbError as e:
+            error_msg = f"ADB命令失败: {e}"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg) from e
+        
         try:
             result = subprocess.run(
                 full_cmd,
@@ -138,6 +187,7 @@ class BasePage:
         for attempt in range(retries):
             try:
                 # 尝试直接使用ADB命令
+                self.invalidate_ui_snapshot()
                 self._execute_adb("input keyevent KEYCODE_BACK")
                 logger.info("✅ 使用ADB点击返回键")
                 return self
@@ -225,16 +275,19 @@ class BasePage:
         locator_type, locator_value = locator
         try:
             if condition == 'visible':
-                element = WebDriverWait(self.driver, timeout).until(
-                    EC.visibility_of_element_located(locator)
+                element = self._wait(timeout).until(
+                    EC.visibility_of_element_located(locator),
+                    f"等待元素{condition}: {locator}"
                 )
             elif condition == 'present':
-                element = WebDriverWait(self.driver, timeout).until(
-                    EC.presence_of_element_located(locator)
+                element = self._wait(timeout).until(
+                    EC.presence_of_element_located(locator),
+                    f"等待元素{condition}: {locator}"
                 )
             elif condition == 'clickable':
-                element = WebDriverWait(self.driver, timeout).until(
-                    EC.element_to_be_clickable(locator)
+                element = self._wait(timeout).until(
+                    EC.element_to_be_clickable(locator),
+                    f"等待元素{condition}: {locator}"
                 )
             else:
                 raise ValueError(f"不支持等待条件：{condition}")
@@ -249,11 +302,154 @@ class BasePage:
             # 关键修改：抛出原始异常
             raise
     
+    def _wait(self, timeout=None):
+        """
+        创建自适应轮询等待（记录耗时）
+        :param timeout: 超时时间，默认使用页面超时
+        :return: AdaptiveWait对象，用法与 WebDriverWait 一致
+        """
+        return AdaptiveWait(self.driver, self.timeout if timeout is None else timeout)
+    
     def get_window_size(self):
         """获取窗口尺寸大小"""
-        if not hasattr(self, '_window_size') or not self._window_size:
-            self._window_size = self.driver.get_window_size()
-        return self._window_size
+        return memo_window_size(self.driver)
+    
+    def get_ui_snapshot(self, refresh=False):
+        """
+        获取当前界面快照（单次 page_source 请求），在下一次界面操作前复用
+        :param refresh: 是否强制重新抓取
+        :return: UiSnapshot对象
+        """
+        return get_cached_snapshot(self.driver, refresh=refresh, max_age=self.SNAPSHOT_MAX_AGE)
+    
+    def invalidate_ui_snapshot(self, action=True):
+        """
+        使界面快照及界面级查询缓存失效（点击、输入、返回、手势等会改变界面的操作前调用）
+        :param action: 是否为操作开始，操作完成后再次失效时传 False
+        """
+        invalidate_snapshot(self.driver)
+        bump_screen_epoch(self.driver, action)
+    
+    def begin_settle(self, page_indicator_locator=None, row_locator=None, check_activity=False):
+        """
+        在操作前记录界面状态，操作后配合 wait_for_settle 使用（代替固定 sleep）
+        :param page_indicator_locator: 可选，页码指示器定位器
+        :param row_locator: 可选，列表行定位器
+        :param check_activity: 是否比较当前 Activity
+        :return: 稳定检测令牌
+        """
+        detector = UiSettleDetector(self.driver, page_indicator_locator, row_locator, check_activity)
+        return detector, detector.probe()
+    
+    def wait_for_settle(self, token, timeout=None, description=""):
+        """
+        等待操作生效且界面稳定，返回时立即记录稳定耗时
+        :param token: begin_settle 返回的令牌
+        :param timeout: 超时时间，默认使用页面超时
+        :param description: 日志描述
+        :return: 稳定返回 True，超时返回 False
+        """
+        detector, before = token
+        settled = detector.wait(before, self.timeout if timeout is None else timeout, description=description)
+        # 最后一次探测的快照就是稳定后的界面，直接作为当前快照复用
+        self.invalidate_ui_snapshot(action=False)
+        store_snapshot(self.driver, detector.snapshot)
+        return settled
+    
+    def wait_for_display_settle(self, timeout=DISPLAY_SETTLE_TIMEOUT):
+        """
+        等待墨水屏刷新完成（截图前、新打开界面上点按前调用）
+        :param timeout: 超时时间（秒）
+        :return: 刷新耗时（秒），超时或检测失败返回 None
+        """
+        return DisplaySettleDetector(self.driver, self.device_id).wait(timeout)
+    
+    def find_in_snapshot(self, locator, condition='present', refresh=False):
+        """
+        在界面快照中查找元素
+        :param locator: 定位器元组 (By, value)
+        :param condition: 过滤条件（present/visible/clickable）
+        :param refresh: 是否强制重新抓取快照
+        :return: UiNode列表；快照关闭或定位器不受支持时返回 None，调用方应回退为实时查询
+        """
+        if not self.USE_UI_SNAPSHOT:
+            return None
+        try:
+            nodes = self.get_ui_snapshot(refresh).find_all(locator)
+        except SnapshotUnsupportedLocator as e:
+            logger.debug(f"{e}，回退为实时查询")
+            return None
+        except Exception as e:
+            logger.warning(f"界面快照查询失败，回退为实时查询: {e}")
+            return None
+        if condition == 'visible':
+            nodes = [node for node in nodes if node.displayed]
+        elif condition == 'clickable':
+            nodes = [node for node in nodes if node.displayed and node.enabled]
+        return nodes
+    
+    def is_element_absent(self, locator, condition='visible', refresh=True):
+        """
+        立即检查元素是否不存在（不等待）：优先使用界面快照，快照不支持时使用实时查询
+        :param locator: 定位器元组 (By, value)
+        :param condition: visible-不存在或不可见即视为消失；present-节点不存在才视为消失
+        :param refresh: 是否重新抓取快照
+        :return: 元素不存在返回 True
+        """
+        nodes = self.find_in_snapshot(locator, condition, refresh=refresh)
+        if nodes is not None:
+            return not nodes
+        elements = self.driver.find_elements(*locator)
+        if condition == 'visible':
+            elements = [element for element in elements if element.is_displayed()]
+        return not elements
+    
+    def wait_for_element_absent(self, locator, timeout=None, condition='visible'):
+        """
+        断言元素消失：已消失时立即返回，否则在较短的超时内等待其消失
+        :param locator: 定位器元组 (By, value)
+        :param timeout: 超时时间，默认使用 ABSENCE_TIMEOUT
+        :param condition: visible-不可见即视为消失；present-从界面移除才视为消失
+        :return: 元素已消失返回 True，超时仍存在返回 False
+        """
+        timeout = self.ABSENCE_TIMEOUT if timeout is None else timeout
+        try:
+            if self.is_element_absent(locator, condition):
+                logger.debug(f"元素不存在: {locator}")
+                return True
+            if condition == 'visible':
+                expected = EC.invisibility_of_element_located(locator)
+            elif condition == 'present':
+                def expected(driver):
+                    return not driver.find_elements(*locator)
+            else:
+                raise ValueError(f"不支持等待条件：{condition}")
+            self._wait(timeout).until(expected, f"等待元素消失: {locator}")
+            logger.debug(f"元素已消失: {locator}")
+            return True
+        except TimeoutException:
+            logger.warning(f"元素在 {timeout}s 内未消失: {locator}")
+            return False
+    
+    def new_driver_script(self, name):
+        """
+        创建批量脚本（多个步骤合并为一次 execute_driver 请求）
+        :param name: 脚本名称（用于日志）
+        :return: DriverScript对象
+        """
+        return DriverScript(name, timeout=self.timeout)
+    
+    def run_driver_script(self, script):
+        """
+        执行批量脚本，服务端不支持 execute_driver 时自动逐步执行
+        :param script: DriverScript对象
+        :return: 结果字典
+        """
+        self.invalidate_ui_snapshot()
+        try:
+            return script.run(self.driver)
+        finally:
+            self.invalidate_ui_snapshot(action=False)
     
     def find_by_text_element(self, text, context_locator=None, timeout=None):
         """
@@ -269,7 +465,7 @@ class BasePage:
                 return element
             else:
                 # 在整个页面查找文本
-                text = WebDriverWait(self.driver, timeout).until(
+                text = self._wait(timeout).until(
                     EC.text_to_be_present_in_element((By.TAG_NAME, "body"), text),
                     message=f"文本 '{text}' 未在页面中找到"
                 )
@@ -278,10 +474,13 @@ class BasePage:
             # 可在此处添加失败截图等操作
             raise AssertionError(f"断言失败: 文本 '{text}' 不存在")
     
-    def click(self, locator, condition='clickable', timeout=None):
-        # 点击元素
+    def click(self, locator, condition='clickable', timeout=None, settle_display=False):
+        # 点击元素（settle_display=True 时先等待新打开的界面刷新完成）
         element = self.wait_for_element(locator, timeout, condition)
+        if settle_display:
+            self.wait_for_display_settle()
         try:
+            self.invalidate_ui_snapshot()
             element.click()
             logger.info(f"点击元素：{locator}")
             return self
@@ -293,6 +492,7 @@ class BasePage:
         # 输入文本
         element = self.wait_for_element(locator, timeout, condition)
         try:
+            self.invalidate_ui_snapshot()
             element.clear()
             element.send_keys(text)
             logger.info(f"输入文本到 {locator}：'{text}'")
@@ -348,6 +548,7 @@ class BasePage:
     def click_by_locator_index(self, locator, index=0, timeout=None):
         """通过定位器和索引定位元素进行点击"""
         element = self.find_by_locator_index(locator, index, timeout)
+        self.invalidate_ui_snapshot()
         element.click()
         logger.info(f"点击元素：{locator} [索引： {index}]")
     
@@ -365,6 +566,7 @@ class BasePage:
         """通过文本点击元素"""
         element = self.find_by_text(text, match, timeout)
         try:
+            self.invalidate_ui_snapshot()
             element.click()
             logger.info(f"点击文本元素: '{text}' (匹配模式: {match})")
             return True
@@ -426,13 +628,13 @@ class BasePage:
     
     def take_screenshot(self, name):
         """
-        截取屏幕截图并保存
+        截取屏幕截图，由截图服务在后台保存（原图 + 灰度缩略图）
         :param name: 截图名称
-        :return: 截图文件路径
+        :return: 截图文件路径（文件异步写入）
         """
         try:
             # 确保截图目录存在
-            screenshot_dir = os.path.join(os.getcwd(), "screenshots")
+            screenshot_dir = os.path.join(self.BASE_DIR, "reports", "screenshots")
             if not os.path.exists(screenshot_dir):
                 os.makedirs(screenshot_dir)
             
@@ -440,9 +642,10 @@ class BasePage:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             screenshot_path = os.path.join(screenshot_dir, f"{name}_{timestamp}.png")
             
-            # 截屏
-            self.driver.save_screenshot(screenshot_path)
-            logger.info(f"截图已保存: {screenshot_path}")
+            # 等待屏幕刷新完成后截屏，避免截到残影
+            self.wait_for_display_settle()
+            get_screenshot_service().capture(self.driver, screenshot_path, stream=self.device_id or "default")
+            logger.info(f"截图已提交: {screenshot_path}")
             
             return screenshot_path
         
@@ -471,6 +674,7 @@ class BasePage:
                 .pause(duration)
                 .release()
             )
+            self.invalidate_ui_snapshot()
             actions.perform()
             logger.info(f"成功长按元素: {locator} ({duration}秒)")
             return True
@@ -481,10 +685,93 @@ class BasePage:
             logger.error(f"长按操作异常: {locator} | {str(e)}")
             raise
     
-    def wait_for_toast(self, message: str) -> bool:
+    def wait_for_event_or_ui(self, kind, ui_query, timeout=None, since=None, predicate=None, description=""):
+        """
+        等待设备端日志事件（logcat 采集），以界面查询作为回退
+        本次运行中该事件出现过时只等待事件；否则照常轮询界面，事件到达时立即结束轮询
+        :param kind: 事件类型（见 utils.log_events）
+        :param ui_query: 界面查询函数 query(driver)，成功时返回非空值
+        :param timeout: 超时时间，默认使用页面超时
+        :param since: 可选，补查该时间（time.time()）之后已采集的日志
+        :param predicate: 可选，事件过滤条件
+        :param description: 日志描述
+        :return: (LogEvent 或 None, 界面查询结果或 None)
+        """
+        timeout = self.timeout if timeout is None else timeout
+        collector = get_logcat_collector(self.device_id, start=False)
+        if not collector.running:
+            try:
+                return None, self._wait(timeout).until(ui_query, description)
+            except TimeoutException:
+                return None, None
+        
+        start = time.time()
+        with LogEventWaiter(collector, kind, predicate, since) as waiter:
+            if event_observed(kind):
+                event = waiter.wait(timeout)
+                result = None if event is not None else self._query_once(ui_query)
+            else:
+                try:
+                    result = AdaptiveWait(self.driver, timeout, wake_event=waiter.ready).until(
+                        lambda driver: waiter.event is not None or ui_query(driver), description)
+                except TimeoutException:
+                    result = None
+                event = waiter.event
+        if event is not None:
+            logger.info(f"设备端事件 {kind}: {description} | 距等待开始 {event.timestamp - start:+.3f}s")
+            return event, None
+        return None, result if result is not True else None
+    
+    @contextmanager
+    def log_event_signal(self, kind):
+        """
+        在上下文内监听设备端日志事件，每次出现时设置返回的 threading.Event
+        :param kind: 事件类型
+        :return: threading.Event；未启动 logcat 采集时为 None
+        """
+        collector = get_logcat_collector(self.device_id, start=False)
+        if not collector.running:
+            yield None
+            return
+        with LogEventSignal(collector, kind) as signal:
+            yield signal.signal
+    
+    def _query_once(self, ui_query):
+        """执行一次界面查询（不等待），失败返回 None"""
+        try:
+            return ui_query(self.driver)
+        except (NoSuchElementException, StaleElementReferenceException):
+            return None
+    
+    def wait_for_activity(self, activity, timeout=None, since=None) -> bool:
+        """
+        等待 Activity 进入前台（优先使用 events 日志中的恢复事件）
+        :param activity: Activity 名称（完整类名或结尾部分）
+        :param timeout: 超时时间
+        :param since: 可选，补查该时间之后已采集的日志
+        :return: 是否进入前台
+        """
+        def query(driver):
+            # 轮询中每次只请求一次 current_activity
+            activity_name = memo_current_activity(driver, refresh=True)
+            return activity_name if activity_name.endswith(activity) else None
+        
+        event, current = self.wait_for_event_or_ui(
+            EVENT_ACTIVITY_RESUMED, query,
+            timeout, since, lambda e: (e.groups.get("activity") or "").endswith(activity), activity)
+        return event is not None or current is not None
+    
+    def _toast_since(self, since=None):
+        """补查 Toast 日志的起点：触发操作的开始时间（默认为最近一次界面操作），最早为 Toast 最长显示时间之前"""
+        if since is None:
+            since = get_driver_memo(self.driver).action_started_at
+        return max(since, time.time() - TOAST_LOOKBACK)
+    
+    def wait_for_toast(self, message: str, since: Optional[float] = None) -> bool:
         """
-        等待并验证 Toast 出现
+        等待并验证 Toast 出现（Android 优先使用 Toast 入队日志事件，耗时为事件实际到达时间）
         :param message: 预期包含的文本内容
+        :param since: 触发 Toast 的操作开始时间（time.time()），默认为最近一次界面操作的开始时间
         :return: 是否成功捕获
         """
         if self.platform == "android":
@@ -497,32 +784,54 @@ class BasePage:
             logger.error(f"Unsupported platform: {self.platform}")
             return False
         
-        try:
-            # 显式等待 + 存在性检查（非可见性）
-            element = WebDriverWait(self.driver, self.timeout).until(
-                EC.presence_of_element_located(locator)
-            )
-            actual_text = element.text
-            if message in actual_text:
-                logger.info(f"✅ Toast 验证成功 | 预期: '{message}' | 实际: '{actual_text}'")
-                return True
-            logger.warning(f"⚠️ Toast 文本不匹配 | 预期: '{message}' | 实际: '{actual_text}'")
-            return False
-        except TimeoutException:
+        def query(driver):
+            return driver.find_element(*locator).text
+        
+        if self.platform == "android":
+            event, actual_text = self.wait_for_event_or_ui(
+                EVENT_TOAST, query, since=self._toast_since(since),
+                predicate=lambda e: not e.text or message in e.text, description=f"Toast: {message}")
+            if event is not None and event.text:
+                actual_text = event.text
+            elif event is not None:
+                # 日志中没有 Toast 文本，无法确认是哪一条 Toast：按预期文本短暂查询界面
+                try:
+                    actual_text = self._wait(self.TOAST_TEXT_TIMEOUT).until(query, f"Toast: {message}")
+                except TimeoutException:
+                    actual_text = None
+        else:
+            try:
+                # 显式等待 + 存在性检查（非可见性）
+                actual_text = self._wait(self.timeout).until(query)
+            except TimeoutException:
+                actual_text = None
+        
+        if actual_text is None:
             logger.error(f"❌ Toast 等待超时 ({self.timeout}s) | 内容: '{message}'")
             return False
+        if message in actual_text:
+            logger.info(f"✅ Toast 验证成功 | 预期: '{message}' | 实际: '{actual_text}'")
+            return True
+        logger.warning(f"⚠️ Toast 文本不匹配 | 预期: '{message}' | 实际: '{actual_text}'")
+        return False
     
     def get_toast_text(self) -> Optional[str]:
         """
-        获取当前显示的 toast 文本
+        获取当前显示的 toast 文本（优先使用 Toast 入队日志事件）
         :return: toast 文本内容，未找到返回 None
         """
         try:
             # Android 原生 toast 处理
             toast_locator = (AppiumBy.XPATH, "//android.widget.Toast")
-            toast_element = WebDriverWait(self.driver, self.timeout).until(
-                EC.presence_of_element_located(toast_locator))
-            return toast_element.text
+            
+            def query(driver):
+                return driver.find_element(*toast_locator).text
+            
+            event, text = self.wait_for_event_or_ui(EVENT_TOAST, query, since=self._toast_since(),
+                                                    description="Toast")
+            if event is not None:
+                text = event.text or self._query_once(query)
+            return text
         except Exception as e:
             logger.error(f"异常信息：{e}")
     
@@ -553,7 +862,7 @@ class BasePage:
             timeout = self.timeout
         
         try:
-            wait = WebDriverWait(self.driver, timeout)
+            wait = self._wait(timeout)
             
             if condition == 'present':
                 return wait.until(
@@ -596,6 +905,13 @@ class BasePage:
         try:
             timeout = self.timeout
             if multiple:
+                # 优先从界面快照读取，一次请求取得所有元素属性
+                nodes = self.find_in_snapshot(locator, condition)
+                if nodes:
+                    values = [node.get_attribute(attribute) for node in nodes]
+                    logger.debug(f"快照读取 {len(values)} 个元素属性 [{attribute}]: {values}")
+                    return values
+                
                 # 获取多个元素模式
                 elements = self.wait_for_elements(
                     locator,
@@ -730,10 +1046,10 @@ class BasePage:
         mask_chars = {'•', '●', '*', '◦', '·', '▪', '♦'}
         return all(char in mask_chars for char in text)
     
-    def assert_toast(self, message):
+    def assert_toast(self, message, since=None):
         
-        """断言 Toast 出现，失败时抛出异常"""
-        if not self.wait_for_toast(message):
+        """断言 Toast 出现，失败时抛出异常（since 见 wait_for_toast）"""
+        if not self.wait_for_toast(message, since):
             raise AssertionError(f"Toast 未检测到: '{message}'")
     
     def assert_text_visible(self, text):
@@ -827,9 +1143,160 @@ class BasePage:
             # 关键修改：重新抛出异常
             raise
     
+    def _default_page_indicator(self):
+        """页面对象声明了 page_tv 时作为默认页码指示器"""
+        try:
+            return getattr(self, "page_tv", None)
+        except Exception as e:
+            logger.debug(f"当前页面没有页码指示器: {e}")
+            return None
+    
+    def _default_row_locator(self):
+        """页面声明了 LIST_ROW_PROPERTY 时作为默认列表行定位器"""
+        if not self.LIST_ROW_PROPERTY:
+            return None
+        try:
+            return getattr(self, self.LIST_ROW_PROPERTY)
+        except Exception as e:
+            logger.debug(f"当前页面没有列表行定位器: {e}")
+            return None
+    
+    def get_page_number_text(self, page_indicator_locator=None):
+        """
+        获取页码当前页、总页数（页码文本格式: 当前页/总页数）
+        :param page_indicator_locator: 页码指示器定位器，默认使用页面的 page_tv
+        :return: (当前页, 总页数)
+        """
+        if page_indicator_locator is None:
+            page_indicator_locator = self._default_page_indicator()
+        try:
+            # 同一界面纪元内复用页码，翻页确认后也会直接写入缓存；
+            # 列表可能自行刷新（如下载完成后重新分页），与快照一样超过 SNAPSHOT_MAX_AGE 后重新读取
+            return get_driver_memo(self.driver).get(
+                ("page_number", tuple(page_indicator_locator)),
+                lambda: self._parse_page_number(self.get_element_attribute(page_indicator_locator, "text")),
+                max_age=self.SNAPSHOT_MAX_AGE
+            )
+        except Exception as e:
+            logger.error(f"获取页码失败{e}")
+            raise
+    
+    @staticmethod
+    def _parse_page_number(page_text):
+        """解析页码文本 "当前页/总页数" """
+        current_page, all_pages = map(int, page_text.split('/'))
+        return current_page, all_pages
+    
+    def _page_signature(self, page_indicator_locator=None, timeout=0):
+        """
+        当前页的标识：有页码指示器时取页码文本，否则取整页 page_source
+        :param page_indicator_locator: 页码指示器定位器
+        :param timeout: 页码指示器尚未出现时的等待时间（秒）；在轮询中调用时为 0，只查询一次
+        :return: 页标识，未找到页码指示器返回 None
+        """
+        try:
+            if page_indicator_locator is None:
+                return self.driver.page_source
+            if timeout:
+                element = self.wait_for_element(page_indicator_locator, timeout, condition='present')
+                return element.text if element is not None else None
+            return self.driver.find_element(*page_indicator_locator).text
+        except (NoSuchElementException, StaleElementReferenceException):
+            return None
+    
+    def turn_page(self, next_button_locator, page_indicator_locator=None, timeout=None):
+        """
+        点击下一页，并通过页码指示器变化确认翻页完成（代替固定 sleep）
+        :param next_button_locator: 下一页按钮定位器
+        :param page_indicator_locator: 页码指示器定位器，默认使用页面的 page_tv
+        :param timeout: 等待翻页完成的超时时间
+        :return: 翻页成功返回 True
+        """
+        if page_indicator_locator is None:
+            page_indicator_locator = self._default_page_indicator()
+        if timeout is None:
+            timeout = self.timeout
+        before = self._page_signature(page_indicator_locator, timeout)
+        try:
+            self.click(next_button_locator)
+            self._wait(timeout).until(
+                lambda driver: self._page_signature(page_indicator_locator) not in (before, None)
+            )
+            # 点击之后、页面刷新之前可能有读取操作，确认翻页后再次使快照失效
+            self.invalidate_ui_snapshot(action=False)
+            if page_indicator_locator is not None:
+                page_text = self._page_signature(page_indicator_locator)
+                if page_text:
+                    # 翻页确认时已读到新页码，直接写入缓存供后续 get_page_number_text 使用
+                    get_driver_memo(self.driver).put(("page_number", tuple(page_indicator_locator)),
+                                                     self._parse_page_number(page_text))
+            logger.info("已翻到下一页")
+            return True
+        except TimeoutException:
+            logger.warning(f"翻页超时，页码未发生变化: {before!r}")
+            return False
+        except Exception as e:
+            logger.warning(f"翻页失败（可能是最后一页）: {e}")
+            return False
+    
+    def rewind_to_first_page(self, prev_button_locator, page_indicator_locator=None, current_page=None,
+                             timeout=None):
+        """
+        点击上一页直到回到第1页（每次通过页码变化确认）
+        :param prev_button_locator: 上一页按钮定位器
+        :param page_indicator_locator: 页码指示器定位器，默认使用页面的 page_tv
+        :param current_page: 当前页，None 时从页码指示器读取
+        :param timeout: 每次翻页的确认超时时间
+        :return: 回退后所在的页码
+        """
+        if current_page is None:
+            current_page, _ = self.get_page_number_text(page_indicator_locator)
+        while current_page > 1:
+            if not self.turn_page(prev_button_locator, page_indicator_locator, timeout):
+                logger.warning(f"无法从第{current_page}页回到上一页，停止回退")
+                break
+            current_page -= 1
+        return current_page
+    
+    def iter_list_pages(self, read_page, next_button_locator=None, page_indicator_locator=None,
+                        current_page=None, all_pages=None, turn_timeout=None, prev_button_locator=None):
+        """
+        逐页读取列表的生成器：每次产出一页数据，只有调用方继续迭代时才翻到下一页，
+        调用方找到目标后 break 即可提前结束，不会翻完剩余页面
+        
+        :param read_page: 读取当前页数据的函数（无参数）
+        :param next_button_locator: 下一页按钮定位器，None 表示只读取当前页
+        :param page_indicator_locator: 页码指示器定位器，默认使用页面的 page_tv
+        :param current_page: 当前页，None 时从页码指示器读取
+        :param all_pages: 总页数，None 时从页码指示器读取
+        :param turn_timeout: 每次翻页的确认超时时间
+        :param prev_button_locator: 上一页按钮定位器，提供时先回到第1页再读取（上次读取可能停在后面的页）
+        :return: 生成 (页码, 当前页数据)
+        """
+        if page_indicator_locator is None:
+            page_indicator_locator = self._default_page_indicator()
+        if current_page is None or all_pages is None:
+            if page_indicator_locator is not None:
+                current_page, all_pages = self.get_page_number_text(page_indicator_locator)
+            else:
+                current_page, all_pages = 1, 1
+        if prev_button_locator is not None and current_page > 1:
+            current_page = self.rewind_to_first_page(prev_button_locator, page_indicator_locator,
+                                                     current_page, turn_timeout)
+        logger.info(f"当前页: {current_page}, 总页数: {all_pages}")
+        
+        while True:
+            yield current_page, read_page()
+            if next_button_locator is None or current_page >= all_pages:
+                return
+            if not self.turn_page(next_button_locator, page_indicator_locator, turn_timeout):
+                logger.warning(f"无法翻到第{current_page + 1}页，停止分页读取")
+                return
+            current_page += 1
+    
     def get_paginated_data(self, page_indicator_locator, section, key, next_button_locator):
         """
-        通用分页数据获取方法，并在结束后恢复页面到初始状态
+        通用分页数据获取方法（读取所有页面）
 
         :param key: 数据键
         :param section: 数据部分
@@ -839,30 +1306,19 @@ class BasePage:
         """
         try:
             all_data = []
-            page_info = self.get_element_attribute(page_indicator_locator, "text")
-            current_page_str, separator, total_pages_str = page_info.partition('/')
-            current_page = int(current_page_str)
-            total_pages = int(total_pages_str)
-            logger.info(f"当前页: {current_page}, 总页数: {total_pages}")
-            
-            for page_num in range(current_page, total_pages + 1):
+            pages = self.iter_list_pages(
+                lambda: self.get_all_folder_texts(section, key),
+                next_button_locator,
+                page_indicator_locator
+            )
+            for page_num, page_data in pages:
                 logger.info(f"正在处理第 {page_num} 页")
                 
-                page_data = self.get_all_folder_texts(section, key)
-                
                 if page_data:
                     all_data.extend(page_data)
                     logger.info(f"第 {page_num} 页找到 {len(page_data)} 条数据")
                 else:
                     logger.warning(f"第 {page_num} 页没有找到数据")
-                
-                # 如果不是最后一页，点击下一页
-                if page_num < total_pages:
-                    self.click(next_button_locator)
-                    logger.info("已点击下一页")
-                    
-                    # 等待页面加载
-                    time.sleep(1)  # 根据实际情况调整等待时间
             
             logger.info(f"总共找到 {len(all_data)} 条数据")
             
@@ -871,18 +1327,32 @@ class BasePage:
             logger.error(f"获取分页数据时出错: {str(e)}")
             raise
     
-    def get_all_folder_texts(self, section, key):
+    def get_all_folder_texts(self, section, key, timeout=None):
         """
             获取页面中所有文件夹的文本内容
             :param section: 定位器配置部分
             :param key: 定位器键名
+            :param timeout: 列表尚未绘制时等待元素出现的超时时间，默认使用页面超时
             :return: 文本列表
         """
         try:
             locator = self.get_locator(section, key)
             logger.info(f"使用定位器: {locator}")
-            # 查找所有具有相同ID的文件夹元素
-            folders = self.driver.find_elements(*locator)
+            # 优先从界面快照读取
+            nodes = self.find_in_snapshot(locator)
+            folders = None
+            if nodes == []:
+                # 快照中暂无元素（列表可能尚未绘制），等待出现后重新抓取
+                folders = self.wait_for_elements(locator, timeout=timeout)
+                if folders:
+                    nodes = self.find_in_snapshot(locator, refresh=True)
+            if nodes:
+                texts = [node.text for node in nodes if node.text]
+                logger.info(f"快照提取的文件夹文本: {texts}")
+                return texts
+            if folders is None:
+                # 会话未开启隐式等待，实时查询前先等待元素出现
+                folders = self.wait_for_elements(locator, timeout=timeout)
             logger.info(f"找到 {len(folders)} 个文件夹元素")  # 提取每个文件夹的文本
             texts = []
             for folder in folders:
@@ -903,8 +1373,12 @@ class BasePage:
         """安全地导航返回，处理可能的异常"""
         for attempt in range(max_attempts):
             try:
+                # 返回可能离开当前 Activity，同时比较 Activity 与列表行
+                token = self.begin_settle(self._default_page_indicator(), self._default_row_locator(),
+                                          check_activity=True)
                 self.back()
-                time.sleep(1)  # 等待页面加载
+                # 等待返回生效（界面或 Activity 变化）且稳定
+                self.wait_for_settle(token, description="返回")
             except Exception as e:
                 logger.error(f"返回异常：{e}")
     
@@ -914,6 +1388,8 @@ class BasePage:
     
     def _navigate_to_next_page(self, next_button_locator, click_method, long_press_duration):
         """导航到下一页"""
+        # 应用内翻页不切换 Activity，只比较页码与列表行
+        token = self.begin_settle(self._default_page_indicator(), self._default_row_locator())
         if click_method == "click":
             self.click(next_button_locator)
         elif click_method == "long_press":
@@ -921,8 +1397,8 @@ class BasePage:
         
         logger.info(f"已{click_method}下一页")
         
-        # 等待页面加载
-        time.sleep(2)
+        # 等待页码或列表变化且界面稳定
+        self.wait_for_settle(token, description="翻页")
     
     def _all_targets_found(self, target_filenames, selected_count):
         """检查是否已找到所有目标文件"""
@@ -940,7 +1416,7 @@ class BasePage:
         try:
             # 如果传入的是定位器，先找到元素
             if isinstance(element_or_locator, tuple):
-                element = self.driver.find_element(*element_or_locator)
+                element = self.wait_for_element(element_or_locator, condition='present')
             else:
                 element = element_or_locator
             
@@ -957,6 +1433,7 @@ class BasePage:
             y = location['y'] + size['height'] // 2
             
             # 使用你的_tap_w3c_actions方法（如果支持长按）
+            self.invalidate_ui_snapshot()
             if hasattr(self, '_tap_w3c_actions'):
                 self._tap_w3c_actions(x, y, duration)
             else:
@@ -982,60 +1459,67 @@ class BasePage:
         # 如果已选择的数量等于目标文件数量，则认为已找到所有文件
         return selected_count >= len(target_filenames)
     
+    @staticmethod
+    def screen_classes(locator_name: str) -> List[Type["BasePage"]]:
+        """
+        使用指定定位器文件的页面类（仅 pages 包中的顶层页面类）
+        未覆盖 CONFIG_PATH 的类（定位器文件按其类名生成）排在前面
+        :param locator_name: 定位器文件名（不含扩展名）
+        :return: 页面类列表
+        """
+        classes, pending = [], list(BasePage.__subclasses__())
+        while pending:
+            page_class = pending.pop(0)
+            pending.extend(page_class.__subclasses__())
+            if not page_class.__module__.startswith("pages.") or "." in page_class.__qualname__:
+                continue
+            path = page_class.CONFIG_PATH or page_class.default_config_path()
+            if os.path.splitext(os.path.basename(path))[0] == locator_name and page_class not in classes:
+                classes.append(page_class)
+        return sorted(classes, key=lambda page_class: page_class.CONFIG_PATH is not None)
+    
+    def _resolve_screen_class(self, locator_name: Optional[str], match: ScreenMatch) -> Optional[Type["BasePage"]]:
+        if locator_name is None:
+            return None
+        keys = get_screen_classifier().signatures[locator_name].keys
+        for page_class in self.screen_classes(locator_name):
+            if all(keys.get(key) in match.ids for key in page_class.SCREEN_REQUIRES) \
+                    and not any(keys.get(key) in match.ids for key in page_class.SCREEN_EXCLUDES):
+                return page_class
+        return None
+    
+    def classify_screen_match(self, refresh=True) -> ScreenMatch:
+        """
+        对当前界面快照分类（单次 page_source 请求，重复出现的界面直接命中缓存）
+        :param refresh: 是否重新抓取快照
+        :return: ScreenMatch对象（定位器文件名级别的结果）
+        """
+        return get_screen_classifier().classify(self.get_ui_snapshot(refresh))
+    
+    def classify_screen(self, refresh=True) -> Tuple[Optional[Type["BasePage"]], Optional[Type["BasePage"]]]:
+        """
+        识别当前界面
+        :param refresh: 是否重新抓取快照
+        :return: (当前页面类, 弹窗页面类)，无法识别的部分为 None
+        """
+        match = self.classify_screen_match(refresh)
+        return self._resolve_screen_class(match.screen, match), self._resolve_screen_class(match.dialog, match)
+    
     def identify_popup_type_simple(self):
-        """简单识别弹窗类型"""
+        """
+        简单识别弹窗类型（基于界面分类，单次 page_source 请求）
+        :return: 弹窗描述
+        """
         try:
-            # 获取当前页面结构信息
-            page_source = self.driver.page_source.lower()
-            window_size = self.driver.get_window_size()
-            screen_width = window_size['width']
-            screen_height = window_size['height']
-            
-            # 尝试查找弹窗根元素
-            popup_selectors = [
-                "//*[contains(@class, 'dialog')]",
-                "//*[contains(@class, 'modal')]",
-                "//*[contains(@class, 'popup')]",
-                "//*[contains(@class, 'sheet')]",
-                "//*[contains(@class, 'bottom')]",
-                "//*[contains(@resource-id, 'dialog')]",
-                "//*[contains(@resource-id, 'modal')]",
-                "//*[contains(@resource-id, 'popup')]"
-            ]
-            
-            popup_element = None
-            for selector in popup_selectors:
-                try:
-                    element = self.driver.find_element_by_xpath(selector)
-                    if element.is_displayed():
-                        popup_element = element
-                        break
-                except:
-                    continue
-            
-            # 根据特征判断类型
-            if popup_element:
-                location = popup_element.location
-                size = popup_element.size
-                
-                # 检查位置特征
-                if location['y'] + size['height'] > screen_height * 0.7:
-                    return "底部弹窗 (Bottom Sheet)"
-                elif size['width'] > screen_width * 0.9 and size['height'] > screen_height * 0.9:
-                    return "全屏弹窗 (Full Screen)"
-                elif "dialog" in page_source or "alert" in page_source:
-                    return "对话框 (Dialog)"
-                elif "toast" in page_source:
-                    return "吐司提示 (Toast)"
-                else:
-                    return f"未知弹窗 (位置: {location}, 大小: {size})"
-            else:
-                # 如果没有找到明显的弹窗元素，检查页面变化
-                if "选择" in self.driver.page_source or "选项" in self.driver.page_source:
-                    return "选择菜单 (Option Menu)"
-                else:
-                    return "无可见弹窗或弹窗元素未识别"
-        
+            match = self.classify_screen_match()
+            if match.dialog:
+                dialog_class = self._resolve_screen_class(match.dialog, match)
+                return dialog_class.__name__ if dialog_class else match.dialog
+            # 未登记的弹窗：按资源 ID 命名特征判断
+            if any(keyword in resource_id.lower() for resource_id in match.ids
+                   for keyword in ("dialog", "modal", "popup", "sheet")):
+                return "对话框 (Dialog)"
+            return "无可见弹窗或弹窗元素未识别"
         except Exception as e:
             logger.error(f"识别弹窗类型失败: {e}")
             return f"识别错误: {str(e)}"
@@ -1067,6 +1551,7 @@ class BasePage:
             # 释放
             actions.w3c_actions.pointer_action.pointer_up()
             # 执行操作
+            self.invalidate_ui_snapshot()
             actions.perform()
         
         except Exception as e:
@@ -1078,13 +1563,114 @@ class BasePage:
         self._tap_w3c_actions(x, y, duration)
         logger.info(f"点击坐标：{x}，{y}")
     
+    def _tap_point(self, target):
+        """
+        将点按目标转换为屏幕坐标
+        :param target: UiNode / WebElement / (x, y) / (x1, y1, x2, y2)
+        :return: (x, y)
+        """
+        if isinstance(target, UiNode):
+            return target.center
+        if isinstance(target, (tuple, list)):
+            if len(target) == 2:
+                return int(target[0]), int(target[1])
+            if len(target) == 4:
+                x1, y1, x2, y2 = target
+                return (x1 + x2) // 2, (y1 + y2) // 2
+            raise ValueError(f"无法识别的坐标: {target}")
+        # WebElement：一次 rect 请求获取位置和尺寸
+        rect = target.rect
+        return rect['x'] + rect['width'] // 2, rect['y'] + rect['height'] // 2
+    
+    def tap_many(self, targets, duration=None, interval=0.05):
+        """
+        批量点按：所有目标合并为一个 W3C Actions 请求依次点按
+        :param targets: 目标列表，元素可以是 UiNode / WebElement / (x, y) / (x1, y1, x2, y2)
+        :param duration: 每次按下的持续时间（毫秒），None 表示单击
+        :param interval: 两次点按之间的间隔（秒）
+        :return: 点按次数
+        """
+        from selenium.webdriver.common.actions.action_builder import ActionBuilder
+        from selenium.webdriver.common.actions.pointer_input import PointerInput
+        from selenium.webdriver.common.actions.interaction import POINTER_TOUCH
+        
+        points = []
+        for target in targets:
+            point = self._tap_point(target)
+            if point is None:
+                logger.warning(f"目标没有坐标信息，跳过: {target}")
+                continue
+            points.append(point)
+        if not points:
+            return 0
+        
+        pointer_input = PointerInput(POINTER_TOUCH, "touch")
+        actions = ActionChains(self.driver)
+        actions.w3c_actions = ActionBuilder(self.driver, mouse=pointer_input)
+        pointer_action = actions.w3c_actions.pointer_action
+        for index, (x, y) in enumerate(points):
+            if index:
+                pointer_action.pause(interval)
+            pointer_action.move_to_location(x, y)
+            pointer_action.pointer_down()
+            pointer_action.pause(duration / 1000 if duration else 0.1)
+            pointer_action.pointer_up()
+        
+        self.invalidate_ui_snapshot()
+        actions.perform()
+        logger.info(f"批量点按 {len(points)} 个目标")
+        return len(points)
+    
+    def _unchecked_nodes(self, locator, nodes):
+        """重新抓取快照，返回 nodes 中仍未选中的节点（按坐标对应）；快照不可用时无法确认，返回空列表"""
+        current = self.find_in_snapshot(locator, refresh=True)
+        if current is None:
+            return []
+        states = {node.bounds: node.checked for node in current}
+        return [node for node in nodes if not states.get(node.bounds)]
+    
+    def confirm_checked_nodes(self, locator, nodes, timeout=None):
+        """
+        批量点按后确认复选框已选中：等待快照中全部变为选中，超时后对仍未选中的复选框补点一次再确认
+        :param locator: 复选框定位器
+        :param nodes: 点按前的复选框节点列表
+        :param timeout: 每轮等待的超时时间，默认 CHECK_CONFIRM_TIMEOUT
+        :return: 确认选中的节点列表（nodes 中的原对象）
+        """
+        if timeout is None:
+            timeout = self.CHECK_CONFIRM_TIMEOUT
+        unchecked = list(nodes)
+        for retap in (True, False):
+            try:
+                self._wait(timeout).until(
+                    lambda driver: not self._unchecked_nodes(locator, unchecked), f"复选框选中: {locator}")
+                unchecked = []
+            except TimeoutException:
+                unchecked = self._unchecked_nodes(locator, unchecked)
+            if not unchecked or not retap:
+                break
+            logger.warning(f"{len(unchecked)} 个复选框点按后未选中，补点一次")
+            self.tap_many(unchecked)
+        for node in unchecked:
+            logger.warning(f"点按后复选框未选中: {node}")
+        unchecked_ids = {id(node) for node in unchecked}
+        return [node for node in nodes if id(node) not in unchecked_ids]
+    
     def select_all_click(self, locator):
         """
-        全选当前页
+        全选当前页（优先使用快照坐标批量点按，一次请求完成）
         :param locator: 元素
-        :return: 全选个数
+        :return: 选中个数（批量点按时为确认选中的个数，逐个点击时为点击成功的个数）
         """
         try:
+            nodes = self.find_in_snapshot(locator, condition='clickable', refresh=True)
+            if nodes:
+                logger.info(f"找到 {len(nodes)} 个元素，批量点击...")
+                clicked_count = self.tap_many(nodes)
+                checked_count = len(self.confirm_checked_nodes(locator, nodes))
+                logger.info(f"批量点击 {clicked_count} 个元素，确认选中 {checked_count}/{len(nodes)} 个")
+                return checked_count
+            
             elements = self.wait_for_elements(
                 locator=locator,
                 condition='clickable'
@@ -1095,6 +1681,7 @@ class BasePage:
                 try:
                     # 确保元素可见和可点击
                     if element.is_displayed() and element.is_enabled():
+                        self.invalidate_ui_snapshot()
                         element.click()
                         clicked_count += 1
                         logger.debug(f"成功点击第 {index + 1} 个元素")
@@ -1109,9 +1696,57 @@ class BasePage:
             logger.error(error_msg)
             raise RuntimeError(error_msg)
     
+    def read_list_rows(self, root_layout_locator, file_name_locator, info_locator=None, checkbox_locator=None,
+                       timeout=None):
+        """
+        一次性读取当前页所有列表行（名称、信息、复选框状态、坐标），建立 名称->行 索引
+        :param root_layout_locator: 行定位器（如 rootListLayout）
+        :param file_name_locator: 行内文件名称定位器
+        :param info_locator: 可选，行内信息文本定位器
+        :param checkbox_locator: 可选，行内复选框定位器
+        :param timeout: 快照中没有任何行时，等待列表加载的超时时间
+        :return: ListRowIndex对象
+        """
+        nodes = self.find_in_snapshot(root_layout_locator)
+        file_items = None
+        if nodes == []:
+            # 快照中暂无列表行（可能仍在加载），等待出现后重新抓取
+            file_items = self.wait_for_elements(root_layout_locator, timeout=timeout)
+            if file_items:
+                nodes = self.find_in_snapshot(root_layout_locator, refresh=True)
+        if nodes:
+            try:
+                return ListRowIndex.from_nodes(nodes, root_layout_locator, file_name_locator,
+                                               info_locator, checkbox_locator)
+            except SnapshotUnsupportedLocator as e:
+                logger.debug(f"{e}，回退为实时查询")
+        if file_items is None:
+            # 会话未开启隐式等待，实时查询前先等待列表行出现
+            file_items = self.wait_for_elements(root_layout_locator, timeout=timeout)
+        return ListRowIndex.from_elements(file_items, root_layout_locator, file_name_locator)
+    
+    def tap_row_target(self, row, target_locator, duration=None):
+        """
+        点击（或长按）行内目标：快照行按坐标点按，实时行直接操作元素
+        :param row: ListRow对象
+        :param target_locator: 行内目标定位器，与行定位器相同时操作整行
+        :param duration: 长按持续时间（毫秒），None 表示单击
+        """
+        target = row.child(target_locator)
+        if target is None:
+            raise NoSuchElementException(f"行 {row.name} 中未找到目标元素: {target_locator}")
+        self.invalidate_ui_snapshot()
+        if isinstance(target, UiNode):
+            x, y = target.center
+            self._tap_w3c_actions(x, y, duration)
+        elif duration:
+            ActionChains(self.driver).click_and_hold(target).pause(duration / 1000).release().perform()
+        else:
+            target.click()
+    
     def click_based_on_the_file_name(self, root_layout_locator, file_name_locator, checkbox_locator, filenames,
                                      current_page: int, all_pages: int,
-                                     next_page_locator=None):
+                                     next_page_locator=None, page_indicator_locator=None):
         """
         根据文件名称进行点击元素
         :param root_layout_locator: 父定位器
@@ -1121,59 +1756,75 @@ class BasePage:
         :param current_page: 当前页
         :param all_pages: 所有页
         :param next_page_locator: 下一页按钮定位器
+        :param page_indicator_locator: 页码指示器定位器，默认使用页面的 page_tv
         :return: 点击个数
         """
+        if isinstance(filenames, str):
+            filenames = [filenames]
         success_count = 0
-        remaining_filenames = filenames.copy()  # 记录未找到的文件名，避免重复查找
+        remaining_filenames = list(filenames)  # 记录未找到的文件名，避免重复查找
+        unconfirmed_filenames = set()  # 批量点按后未确认选中的文件名
+        # 点击整行（进入文件夹）会离开当前页面，之后的坐标不再有效
+        leaves_page = tuple(checkbox_locator) == tuple(root_layout_locator)
         
         try:
-            while remaining_filenames and current_page <= all_pages:
-                # 1. 获取当前页的所有文件项
-                file_items = self.driver.find_elements(*root_layout_locator)
-                logger.info(f"第{current_page}页共有{len(file_items)}个文件项")
+            pages = self.iter_list_pages(
+                lambda: self.read_list_rows(root_layout_locator, file_name_locator),
+                next_page_locator,
+                page_indicator_locator,
+                current_page,
+                all_pages
+            )
+            for page_num, row_index in pages:
+                logger.info(f"第{page_num}页共有{len(row_index)}个文件项")
                 
-                # 2. 遍历当前页的文件项，查找剩余目标文件
+                # 按名称直接查找剩余目标文件
+                batch = []  # 快照行的复选框，稍后合并为一次批量点按
                 for target_filename in list(remaining_filenames):  # 用list避免遍历中修改列表报错
-                    found = False
-                    for item in file_items:
-                        try:
-                            name_element = item.find_element(*file_name_locator)
-                            current_filename = name_element.text.strip()  # 去除空格，避免匹配误差
-                            if current_filename == target_filename:
-                                # 找到目标文件，点击复选框
-                                checkbox_element = item.find_element(*checkbox_locator)
-                                checkbox_element.click()
-                                logger.info(f"第{current_page}页：成功点击文件: {target_filename}")
-                                success_count += 1
-                                remaining_filenames.remove(target_filename)  # 从剩余列表中移除
-                                found = True
-                                break  # 跳出内层循环，继续下一个目标文件
-                        except Exception as e:
-                            logger.debug(f"处理第{current_page}页文件项时出错: {e}")
-                            continue
-                    
-                    if not found:
-                        logger.debug(f"第{current_page}页未找到文件: {target_filename}")
-                
-                # 3. 如果还有未找到的文件，且有下一页，执行翻页
-                if remaining_filenames and next_page_locator:
+                    row = row_index.get(target_filename)
+                    if row is None:
+                        logger.debug(f"第{page_num}页未找到文件: {target_filename}")
+                        continue
                     try:
-                        # 点击下一页
-                        next_page_btn = self.driver.find_element(*next_page_locator)
-                        next_page_btn.click()
-                        logger.info(f"翻到第{current_page + 1}页")
-                        current_page += 1
-                        # 等待新页面加载完成（根据实际页面调整等待时间或条件）
-                        self.driver.implicitly_wait(2)  # 简单等待，推荐用WebDriverWait显式等待
+                        target = row.child(checkbox_locator)
+                        if isinstance(target, UiNode) and not leaves_page:
+                            batch.append((target_filename, target))
+                            continue
+                        self.tap_row_target(row, checkbox_locator)
+                        logger.info(f"第{page_num}页：成功点击文件: {target_filename}")
+                        success_count += 1
+                        remaining_filenames.remove(target_filename)  # 从剩余列表中移除
                     except Exception as e:
-                        logger.warning(f"无法翻到第{current_page + 1}页（可能是最后一页）: {e}")
-                        break  # 翻页失败，退出循环
-                else:
-                    break  # 无下一页或已找到所有文件，退出循环
+                        logger.debug(f"处理第{page_num}页文件项时出错: {e}")
+                        continue
+                    if leaves_page:
+                        break
+                
+                if batch:
+                    self.tap_many([node for _, node in batch])
+                    confirmed = self.confirm_checked_nodes(checkbox_locator, [node for _, node in batch])
+                    confirmed_ids = {id(node) for node in confirmed}
+                    for target_filename, node in batch:
+                        if id(node) in confirmed_ids:
+                            logger.info(f"第{page_num}页：成功点击文件: {target_filename}")
+                            remaining_filenames.remove(target_filename)
+                        else:
+                            # 保留在剩余列表中，最终作为未成功的文件报告
+                            logger.warning(f"第{page_num}页：点击后未确认选中文件: {target_filename}")
+                            unconfirmed_filenames.add(target_filename)
+                    success_count += len(confirmed)
+                    logger.debug(f"第{page_num}页批量点击 {len(batch)} 个文件，确认选中 {len(confirmed)} 个")
+                
+                # 已找到所有文件（或已离开列表页），不再翻页
+                if not remaining_filenames or (leaves_page and success_count):
+                    break
             
-            # 4. 处理未找到的文件
+            # 处理未找到的文件
             for filename in remaining_filenames:
-                logger.warning(f"所有页面均未找到文件: {filename}")
+                if filename in unconfirmed_filenames:
+                    logger.warning(f"文件点击后未能确认选中: {filename}")
+                else:
+                    logger.warning(f"所有页面均未找到文件: {filename}")
             
             logger.info(f"总成功点击了 {success_count} 个文件")
             return success_count
@@ -1184,7 +1835,8 @@ class BasePage:
     
     def long_press_based_on_the_file_name(self, root_layout_locator, file_name_locator, target_locator, filenames,
                                           current_page: int, all_pages: int,
-                                          long_press_duration=2000, next_page_locator=None):
+                                          long_press_duration=2000, next_page_locator=None,
+                                          page_indicator_locator=None):
         """
         根据多个文件名长按对应的元素（支持分页查找）
 
@@ -1196,67 +1848,47 @@ class BasePage:
         :param all_pages: 总页数（最大翻页上限）
         :param long_press_duration: 长按持续时间（毫秒），默认2000ms
         :param next_page_locator: 下一页按钮定位器（无分页可省略）
+        :param page_indicator_locator: 页码指示器定位器，默认使用页面的 page_tv
         :return: 成功长按的文件数量
         """
+        if isinstance(filenames, str):
+            filenames = [filenames]
         success_count = 0
-        remaining_filenames = filenames.copy()  # 记录未找到的文件名，避免重复查找
-        actions = ActionChains(self.driver)  # 初始化动作链（复用，提高效率）
+        remaining_filenames = list(filenames)  # 记录未找到的文件名，避免重复查找
         
         try:
-            while remaining_filenames and current_page <= all_pages:
-                # 1. 获取当前页的所有文件项
-                file_items = self.driver.find_elements(*root_layout_locator)
-                logger.info(f"第{current_page}页共有{len(file_items)}个文件项")
+            pages = self.iter_list_pages(
+                lambda: self.read_list_rows(root_layout_locator, file_name_locator),
+                next_page_locator,
+                page_indicator_locator,
+                current_page,
+                all_pages
+            )
+            for page_num, row_index in pages:
+                logger.info(f"第{page_num}页共有{len(row_index)}个文件项")
                 
-                # 2. 遍历当前页的文件项，查找剩余目标文件
+                # 按名称直接查找剩余目标文件
                 for target_filename in list(remaining_filenames):  # 用list避免遍历中修改列表报错
-                    found = False
-                    for item in file_items:
-                        try:
-                            # 获取当前文件项的文件名
-                            name_element = item.find_element(*file_name_locator)
-                            current_filename = name_element.text.strip()  # 去除空格，提高匹配精度
-                            
-                            if current_filename == target_filename:
-                                logger.info(
-                                    f"对比文件名：目标={target_filename} | 页面实际={current_filename},对比文件名：目标；类型={type(target_filename)} | 页面实际={type(current_filename)}")
-                                # 找到目标文件，执行长按操作
-                                target_element = item.find_element(*target_locator)
-                                actions.click_and_hold(target_element) \
-                                    .pause(long_press_duration / 1000) \
-                                    .release() \
-                                    .perform()
-                                
-                                logger.info(
-                                    f"第{current_page}页：成功长按文件: {target_filename}，持续时间: {long_press_duration}ms")
-                                success_count += 1
-                                remaining_filenames.remove(target_filename)  # 从剩余列表移除
-                                found = True
-                                break  # 跳出内层循环，继续下一个目标文件
-                        except Exception as e:
-                            logger.error(f"处理第{current_page}页文件项时出错: {e}")
-                            continue
-                    
-                    if not found:
-                        logger.error(f"第{current_page}页未找到文件: {target_filename}")
-                
-                # 3. 若还有未找到的文件，且有下一页，执行翻页
-                if remaining_filenames and next_page_locator:
+                    row = row_index.get(target_filename)
+                    if row is None:
+                        logger.error(f"第{page_num}页未找到文件: {target_filename}")
+                        continue
                     try:
-                        # 点击下一页按钮
-                        next_page_btn = self.driver.find_element(*next_page_locator)
-                        next_page_btn.click()
-                        logger.info(f"翻到第{current_page + 1}页")
-                        current_page += 1
-                        # 等待新页面加载（推荐用WebDriverWait显式等待，这里简化为隐式等待）
-                        self.driver.implicitly_wait(2)
+                        # 找到目标文件，执行长按操作
+                        self.tap_row_target(row, target_locator, duration=long_press_duration)
+                        logger.info(
+                            f"第{page_num}页：成功长按文件: {target_filename}，持续时间: {long_press_duration}ms")
+                        success_count += 1
+                        remaining_filenames.remove(target_filename)  # 从剩余列表移除
                     except Exception as e:
-                        logger.warning(f"无法翻到第{current_page + 1}页（可能是最后一页）: {e}")
-                        break  # 翻页失败，退出循环
-                else:
-                    break  # 无下一页或已找到所有文件，退出循环
+                        logger.error(f"处理第{page_num}页文件项时出错: {e}")
+                        continue
+                
+                # 已找到所有文件，不再翻页
+                if not remaining_filenames:
+                    break
             
-            # 4. 处理未找到的文件
+            # 处理未找到的文件
             for filename in remaining_filenames:
                 logger.warning(f"所有页面均未找到文件: {filename}")
             
@@ -1268,7 +1900,8 @@ class BasePage:
             return success_count
     
     def get_file_attributes(self, root_layout_locator, file_name_locator, attribute_locator, filenames,
-                            current_page: int, all_pages: int, attribute, next_page_locator=None):
+                            current_page: int, all_pages: int, attribute, next_page_locator=None,
+                            page_indicator_locator=None):
         """
         根据文件名列表获取对应文件的属性（支持分页查找）
         :param root_layout_locator: 父容器定位器（元组，如("xpath", "//div[@class='file-list']")）
@@ -1279,6 +1912,7 @@ class BasePage:
         :param all_pages: 最大翻页上限（int，如5）
         :param attribute: 要获取的属性名（如"text"、"resourceId"）
         :param next_page_locator: 下一页按钮定位器（元组，如("xpath", "//button[text()='下一页']")）
+        :param page_indicator_locator: 页码指示器定位器，默认使用页面的 page_tv
         :return: 属性值列表（若输入单个文件名，返回长度为1的列表；未找到返回空列表）
         """
         # 支持单个文件名输入（自动转为列表处理）
@@ -1297,84 +1931,46 @@ class BasePage:
                 if strategy not in supported_strategies:
                     raise ValueError(f"不支持的定位器策略: '{strategy}'，支持的策略：{supported_strategies}")
             
-            # 2. 分页查找文件并获取属性
-            while remaining_filenames and current_page <= all_pages:
-                # 显式等待当前页文件列表加载完成（替代隐式等待，更可靠）
-                try:
-                    WebDriverWait(self.driver, 10).until(
-                        EC.presence_of_all_elements_located(root_layout_locator)
-                    )
-                except TimeoutException:
-                    logger.warning(f"第{current_page}页文件列表加载超时，跳过当前页")
-                    current_page += 1
+            # 2. 分页查找文件并获取属性（找齐后不再翻页）
+            pages = self.iter_list_pages(
+                lambda: self.read_list_rows(root_layout_locator, file_name_locator, timeout=10),
+                next_page_locator,
+                page_indicator_locator,
+                current_page,
+                all_pages
+            )
+            for page_num, row_index in pages:
+                if not len(row_index):
+                    logger.warning(f"第{page_num}页文件列表加载超时，跳过当前页")
                     continue
+                logger.info(f"第{page_num}页共有{len(row_index)}个文件项")
                 
-                # 获取当前页所有文件项
-                file_items = self.driver.find_elements(*root_layout_locator)
-                logger.info(f"第{current_page}页共有{len(file_items)}个文件项")
-                
-                # 遍历当前页文件项，匹配目标文件名
+                # 按名称直接匹配目标文件
                 for target_filename in list(remaining_filenames):
-                    found = False
-                    for item in file_items:
-                        try:
-                            # 查找当前文件项的文件名元素
-                            name_element = item.find_element(*file_name_locator)
-                            current_filename = name_element.text.strip()
-                            
-                            if current_filename == target_filename:
-                                # 找到目标文件，获取其属性元素的属性值
-                                try:
-                                    # 显式等待属性元素可见
-                                    attr_element = WebDriverWait(item, 5).until(
-                                        EC.visibility_of_element_located(attribute_locator)
-                                    )
-                                    attribute_value = attr_element.get_attribute(attribute)
-                                    # 处理文本属性的空白（如" 2025-11-04 09:19:46 " → "2025-11-04 09:19:46"）
-                                    if attribute == "text" and attribute_value:
-                                        attribute_value = attribute_value.strip()
-                                    attribute_results.append(attribute_value)
-                                    logger.info(
-                                        f"第{current_page}页：成功获取文件[{target_filename}]的属性 → {attribute_value}"
-                                    )
-                                    remaining_filenames.remove(target_filename)
-                                    found = True
-                                    break  # 跳出当前文件项循环，继续下一个文件名
-                                except (TimeoutException, NoSuchElementException) as attr_e:
-                                    logger.error(
-                                        f"文件[{target_filename}]的属性元素查找失败：{attr_e}，定位器：{attribute_locator}"
-                                    )
-                                    # 属性获取失败但文件已找到，不再重复查找
-                                    remaining_filenames.remove(target_filename)
-                                    found = True
-                                    break
-                        except NoSuchElementException:
-                            logger.debug(f"文件项中未找到文件名元素（定位器：{file_name_locator}），跳过当前项")
-                            continue
-                        except Exception as e:
-                            logger.debug(f"处理第{current_page}页文件项时出错：{e}，继续下一项")
-                            continue
-                    
-                    if not found:
-                        logger.debug(f"第{current_page}页未找到文件：{target_filename}")
-                
-                # 3. 翻页逻辑（若还有未找到的文件）
-                if remaining_filenames and next_page_locator:
+                    row = row_index.get(target_filename)
+                    if row is None:
+                        logger.debug(f"第{page_num}页未找到文件：{target_filename}")
+                        continue
                     try:
-                        # 显式等待下一页按钮可点击
-                        next_page_btn = WebDriverWait(self.driver, 5).until(
-                            EC.element_to_be_clickable(next_page_locator)
-                        )
-                        next_page_btn.click()
-                        logger.info(f"翻到第{current_page + 1}页")
-                        current_page += 1
-                    except (TimeoutException, NoSuchElementException) as e:
-                        logger.warning(f"无法翻到第{current_page + 1}页（可能是最后一页）：{e}")
-                        break  # 翻页失败，终止循环
-                else:
-                    break  # 无下一页或已找到所有文件，终止循环
+                        attribute_value = row.attribute(attribute_locator, attribute)
+                    except Exception as e:
+                        logger.debug(f"处理第{page_num}页文件项时出错：{e}")
+                        attribute_value = None
+                    # 属性获取失败但文件已找到，不再重复查找
+                    remaining_filenames.remove(target_filename)
+                    if attribute_value is None:
+                        logger.error(f"文件[{target_filename}]的属性元素查找失败，定位器：{attribute_locator}")
+                        continue
+                    # 处理文本属性的空白（如" 2025-11-04 09:19:46 " → "2025-11-04 09:19:46"）
+                    if attribute == "text":
+                        attribute_value = attribute_value.strip()
+                    attribute_results.append(attribute_value)
+                    logger.info(f"第{page_num}页：成功获取文件[{target_filename}]的属性 → {attribute_value}")
+                
+                if not remaining_filenames:
+                    break
             
-            # 4. 记录未找到的文件
+            # 3. 记录未找到的文件
             for filename in remaining_filenames:
                 logger.warning(f"所有页面（共{all_pages}页）均未找到文件：{filename}")
             
@@ -1395,33 +1991,23 @@ class BasePage:
         根据多个文件名获取对应的复选框状态
         :return: 字典格式 {文件名: 选中状态}
         """
+        if isinstance(filenames, str):
+            filenames = [filenames]
         status_dict = {}
         try:
-            file_items = self.driver.find_elements(*root_layout_locator)
-            logger.info(f"共有{len(file_items)}个文件项")
+            # 一次读取当前页所有文件项，按名称直接查找
+            row_index = self.read_list_rows(root_layout_locator, file_name_locator, checkbox_locator=checkbox_locator)
+            logger.info(f"共有{len(row_index)}个文件项")
             
             for target_filename in filenames:
-                found = False
-                for item in file_items:
-                    try:
-                        name_element = item.find_element(*file_name_locator)
-                        current_filename = name_element.text
-                        
-                        if current_filename == target_filename:
-                            checkbox_element = item.find_element(*checkbox_locator)
-                            # 获取选中状态
-                            status = checkbox_element.get_attribute(attribute)
-                            status_dict[target_filename] = status
-                            found = True
-                            logger.info(f"文件 {target_filename} 状态: {status}")
-                            break
-                    except Exception as e:
-                        logger.debug(f"处理文件项时出错: {e}")
-                        continue
-                
-                if not found:
+                row = row_index.get(target_filename)
+                status = row.attribute(checkbox_locator, attribute) if row is not None else None
+                if status is None:
                     logger.warning(f"未找到文件: {target_filename}")
                     status_dict[target_filename] = "未找到"
+                else:
+                    status_dict[target_filename] = status
+                    logger.info(f"文件 {target_filename} 状态: {status}")
             
             return status_dict
         
@@ -1438,6 +2024,16 @@ class BasePage:
         :return: 子元素文本列表（如 ['文本1', '文本2']），无数据时返回空列表
         """
         try:
+            # 优先从界面快照读取父元素及其子元素
+            parents = self.find_in_snapshot(parent_locator, condition='visible')
+            if parents:
+                try:
+                    child_texts = [node.text for node in parents[0].find_all(child_locator)]
+                    logger.info(f"快照获取 {len(child_texts)} 个子元素文本")
+                    return child_texts
+                except SnapshotUnsupportedLocator as e:
+                    logger.debug(f"{e}，回退为实时查询")
+            
             # 1. 等待父元素出现（可见或存在，根据实际场景选择）
             logger.info(f"等待父元素出现：{parent_locator}")
             parent_element = self.wait_for_element(parent_locator)
@@ -1469,3 +2065,6 @@ class BasePage:
         except Exception as e:
             logger.error(f"获取子元素文本失败：{str(e)}", exc_info=True)
             return []
+
+
+instrument_class(BasePage)
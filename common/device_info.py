@@ -1,10 +1,16 @@
 import logging
+import os
+import re
+import threading
 from typing import Dict, Optional
 
 from utils.adb_helper import ADBHelper
 
 logger = logging.getLogger(__name__)
 
+VERSION_NAME_PATTERN = re.compile(r'versionName=(\S+)')
+VERSION_CODE_PATTERN = re.compile(r'versionCode=(\d+)')
+
 
 class DeviceInfoManager:
     """设备信息管理器"""
@@ -37,6 +43,27 @@ class DeviceInfoManager:
         logger.warning("未找到硬件版本信息")
         return "Unknown"
     
+    def get_app_version(self, package: str) -> str:
+        """
+        获取应用版本号
+        :param package: 应用包名
+        :return: versionName-versionCode，读取失败返回 "Unknown"
+        """
+        key = f'app_version:{package}'
+        if key in self._cache:
+            return self._cache[key]
+        try:
+            output = self.adb_helper.execute_command(["shell", "dumpsys", "package", package])
+        except Exception as e:
+            logger.warning(f"获取应用版本失败: {package} | {e}")
+            return "Unknown"
+        name = VERSION_NAME_PATTERN.search(output)
+        code = VERSION_CODE_PATTERN.search(output)
+        if name is None and code is None:
+            return "Unknown"
+        self._cache[key] = f"{name.group(1) if name else 'unknown'}-{code.group(1) if code else '0'}"
+        return self._cache[key]
+    
     def get_comprehensive_device_info(self) -> Dict[str, str]:
         """获取完整的设备信息"""
         if 'comprehensive_info' in self._cache:
@@ -55,18 +82,31 @@ class DeviceInfoManager:
         return device_info
 
 
-# 创建全局实例（单例模式）
-_device_manager: Optional[DeviceInfoManager] = None
+# 按设备序列号缓存实例（多设备并行时各设备的信息互不覆盖）
+_device_managers: Dict[Optional[str], DeviceInfoManager] = {}
+_device_managers_lock = threading.Lock()
 
 
 def get_device_manager(device_id: Optional[str] = None) -> DeviceInfoManager:
-    """获取设备管理器实例（单例）"""
-    global _device_manager
-    if _device_manager is None:
-        _device_manager = DeviceInfoManager(device_id)
-    return _device_manager
+    """
+    获取设备对应的设备管理器实例（每台设备一个）
+    :param device_id: 设备序列号，None 表示 ANDROID_SERIAL 指定的设备或唯一连接的设备
+    :return: DeviceInfoManager对象
+    """
+    device_id = device_id or os.environ.get("ANDROID_SERIAL") or None
+    with _device_managers_lock:
+        manager = _device_managers.get(device_id)
+        if manager is None:
+            manager = DeviceInfoManager(device_id)
+            _device_managers[device_id] = manager
+        return manager
 
 
 def get_hardware_version(device_id: Optional[str] = None) -> str:
     """快速获取硬件版本号（便捷函数）"""
     return get_device_manager(device_id).get_hardware_version()
+
+
+def get_app_version(package: str, device_id: Optional[str] = None) -> str:
+    """快速获取应用版本号（便捷函数）"""
+    return get_device_manager(device_id).get_app_version(package)
@@ -1,13 +1,12 @@
 import logging
 import os
-import subprocess
+import time
+import uuid
 from datetime import datetime
-from io import BytesIO
 from typing import List, Callable
 
 import allure
 import pytest
-from PIL import Image
 from _pytest.fixtures import FixtureRequest
 from appium import webdriver
 from loguru import logger
@@ -22,18 +21,37 @@ from pages.nut_cloud_page.document_home_page import DocumentHomePage
 from pages.nut_cloud_page.file_page import FilePage
 from pages.nut_cloud_page.home_page import HomePage
 from pages.nut_cloud_page.nut_login_page import NutLoginPage
+from services.navigation_service import DEFAULT_FOLDER_PATH, ScreenRouter
+from utils.adb_transport import get_transport
+from utils.app_checkpoint import AppCheckpoint, checkpoint_enabled
 from utils.app_switcher import AppSwitcher
+from utils.artifact_store import get_artifact_store
+from utils.command_metrics import get_command_metrics, get_round_trip_counter, instrument_driver
+from utils.device_pool import DevicePoolError, acquire_device, discover_devices
+from utils.display_settle import DisplaySettleDetector
 # 从配置模块导入
 from utils.driver import init_driver
-from utils.test_data_loader import load_test_data
+from utils.driver_memo import log_memo_stats
+from utils.download_monitor import pop_test_monitors
+from utils.duration_history import current_versions, get_duration_history, history_enabled
+from utils.logcat_collector import get_logcat_collector, stop_logcat_collectors
+from utils.screen_recorder import SegmentedScreenRecorder, recording_enabled, shutdown_transcode_pool
+from utils.screenshot_service import get_screenshot_service, shutdown_screenshot_service
+from utils.trace_recorder import ATTACH_MODES, DEFAULT_ATTACH_MODE, TRACE_DIR, get_trace_recorder
 
 # 获取项目根目录
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-folder_list = load_test_data("enter_folder_list.json")
 # 全局配置
 SCREENSHOT_DIR = os.path.join(BASE_DIR, "reports", "screenshots")
+VIDEO_DIR = os.path.join(BASE_DIR, "reports", "videos")
+LOGCAT_DIR = os.path.join(BASE_DIR, "reports", "logcat")
+DOWNLOAD_TIMELINE_DIR = os.path.join(BASE_DIR, "reports", "downloads")
+# 已登录、已绑定坚果云的应用状态存档名称
+LOGGED_IN_CHECKPOINT = "logged_in"
 ALLURE_RESULTS_DIR = os.path.join(BASE_DIR, "allure-results")
 MAX_RECORDINGS = 100  # 最大录制文件数
+SCREENSHOT_ATTACH_TIMEOUT = 30  # 等待后台截图写入后附加到报告的最长时间（秒）
+VIDEO_ATTACH_TIMEOUT = 120  # 等待后台录屏转码后附加到报告的最长时间（秒）
 GLOBAL_LOG_DIR = os.path.join(BASE_DIR, "logs", "pytest_runs")
 # 初始化日志
 logger = logging.getLogger(__name__)
@@ -58,13 +76,15 @@ def pytest_configure(config):
     """配置测试环境"""
     # 生成带时间戳的日志文件名
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    log_file_name = f"pytest_run_{timestamp}.log"
+    # 并行执行时每个工作进程一个日志文件
+    worker_id = os.environ.get("PYTEST_XDIST_WORKER")
+    log_file_name = f"pytest_run_{timestamp}_{worker_id}.log" if worker_id else f"pytest_run_{timestamp}.log"
     log_file_path = os.path.join(GLOBAL_LOG_DIR, log_file_name)
     # 强制日志文件为绝对路径（避免pytest内部处理相对路径）
     log_file_path = os.path.abspath(log_file_path)
     config.option.log_file = log_file_path
     # 确保所有目录存在（覆盖所有可能的目录）
-    for dir_path in [SCREENSHOT_DIR, ALLURE_RESULTS_DIR, GLOBAL_LOG_DIR]:
+    for dir_path in [SCREENSHOT_DIR, VIDEO_DIR, LOGCAT_DIR, ALLURE_RESULTS_DIR, GLOBAL_LOG_DIR]:
         os.makedirs(dir_path, exist_ok=True)
         # 再次验证目录是否存在（调试用）
         if not os.path.exists(dir_path):
@@ -84,9 +104,87 @@ def pytest_configure(config):
     config.option.allure_report_dir = ALLURE_RESULTS_DIR
     # 清理旧文件（可选，现在针对的是全局日志目录）
     cleanup_old_files(GLOBAL_LOG_DIR, ['.log'], MAX_RECORDINGS)
-    cleanup_old_files(SCREENSHOT_DIR, ['.png'], MAX_RECORDINGS)
+    # 截图、录屏、页面源码存放在产物仓库中，按仓库索引淘汰（同时删除报告目录中的链接）
+    get_artifact_store().enforce()
     
     logger.info(f"本次测试运行日志将保存至: {log_file_path}")
+    # 同一次运行的各工作进程共用运行 ID（工作进程继承主进程的环境变量）
+    os.environ.setdefault("DURATION_RUN_ID", uuid.uuid4().hex)
+    config.duration_run_id = os.environ["DURATION_RUN_ID"]
+    lease_device(config)
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("sharding", "按历史耗时分片")
+    group.addoption("--shard-count", type=int, default=0, help="分片总数（如设备或 CI 任务数）")
+    group.addoption("--shard-index", type=int, default=0, help="本次执行的分片序号（从 0 开始）")
+    parser.addoption("--trace-attach", choices=ATTACH_MODES, default=DEFAULT_ATTACH_MODE,
+                     help="保存时间线追踪并附加到报告的用例：failed / always / never")
+
+
+def pytest_collection_modifyitems(config, items):
+    """
+    按历史耗时均衡分片：
+    --shard-count/--shard-index 只执行指定分片；
+    pytest -n auto --dist loadgroup 时按工作进程数分组，每个工作进程执行一组耗时相近的用例
+    """
+    shard_count = config.getoption("--shard-count")
+    if shard_count > 1:
+        shards = get_duration_history().balanced_shards([item.nodeid for item in items], shard_count)
+        selected = set(shards[config.getoption("--shard-index") % shard_count])
+        deselected = [item for item in items if item.nodeid not in selected]
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+            items[:] = [item for item in items if item.nodeid in selected]
+        return
+    worker_count = getattr(config, "workerinput", {}).get("workercount", 0)
+    if worker_count > 1 and config.getoption("dist", default="no") == "loadgroup":
+        shards = get_duration_history().balanced_shards([item.nodeid for item in items], worker_count)
+        groups = {node_id: index for index, shard in enumerate(shards) for node_id in shard}
+        for item in items:
+            item.add_marker(pytest.mark.xdist_group(f"shard{groups[item.nodeid]}"))
+
+
+def is_xdist_controller(config) -> bool:
+    """pytest-xdist 主进程（只分发用例，不连接设备）"""
+    return not hasattr(config, "workerinput") and bool(config.getoption("numprocesses", default=None))
+
+
+def lease_device(config):
+    """
+    为当前进程租用一台设备：设置 ANDROID_SERIAL，使本进程内未指定序列号的 adb 调用都访问该设备
+    pytest -n auto 时每台设备一个工作进程（见 pytest_xdist_auto_num_workers）
+    """
+    config.device_lease = None
+    if is_xdist_controller(config):
+        return
+    worker_id = os.environ.get("PYTEST_XDIST_WORKER", "gw0")
+    worker_index = int(worker_id[2:]) if worker_id[2:].isdigit() else 0
+    try:
+        lease = acquire_device(config.getoption("--device-id", default=None), worker_index)
+    except DevicePoolError as e:
+        logger.warning(f"未租用设备，使用配置中的设备: {e}")
+        return
+    os.environ["ANDROID_SERIAL"] = lease.serial
+    config.device_lease = lease
+
+
+def get_session_device_id(config):
+    """当前进程租用的设备序列号（未租用时为 --device-id 参数）"""
+    lease = getattr(config, "device_lease", None)
+    return lease.serial if lease is not None else config.getoption("--device-id", default=None)
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_xdist_auto_num_workers(config):
+    """pytest -n auto：每台设备一个工作进程"""
+    return max(len(discover_devices()), 1)
+
+
+def pytest_unconfigure(config):
+    lease = getattr(config, "device_lease", None)
+    if lease is not None:
+        lease.release()
 
 
 def cleanup_old_files(directory, extensions, max_files):
@@ -116,15 +214,141 @@ def cleanup_old_files(directory, extensions, max_files):
         logger.error(f"清理文件时发生错误: {e}")
 
 
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtest_setup(item):
+    """记录用例开始时间，用于截取设备日志片段"""
+    item.start_time = time.time()
+    item.round_trip_mark = get_round_trip_counter().snapshot()
+    item.phase_durations = {}
+    get_command_metrics().begin_test(item.nodeid)
+    get_trace_recorder().begin_test(item.nodeid)
+    pop_test_monitors()
+
+
+def track_phase(item, report):
+    """记录本阶段耗时与往返次数（driver 命令 + adb 交互）"""
+    if not hasattr(item, 'round_trip_mark'):
+        return
+    now = get_round_trip_counter().snapshot()
+    round_trips, item.round_trip_mark = (now - item.round_trip_mark).total, now
+    item.phase_durations[report.when] = (report.duration, round_trips, report.outcome)
+    if report.when == "teardown":
+        get_command_metrics().end_test()
+
+
+def attach_trace(item):
+    """
+    teardown 结束后保存用例的时间线追踪（Chrome / Perfetto trace JSON）并附加到报告
+    --trace-attach failed 时只保存失败用例
+    """
+    events = get_trace_recorder().end_test()
+    mode = item.config.getoption("--trace-attach")
+    if not events or mode == "never" or (mode == "failed" and not getattr(item, "recording_failed", False)):
+        return
+    test_name = item.nodeid.replace("::", "_").replace("/", "_").replace(".", "_")[:100]
+    trace_path = os.path.join(TRACE_DIR, f"{test_name}.json")
+    digest = get_trace_recorder().write(events, trace_path)
+    # 下载附件后用 chrome://tracing 或 ui.perfetto.dev 打开
+    get_artifact_store().attach(digest, f"时间线追踪: {item.name}", allure.attachment_type.JSON)
+    logger.info(f"时间线追踪已保存: {trace_path}（{len(events)} 个区间）")
+
+
+def check_round_trip_budget(item, report):
+    """
+    往返次数预算：@pytest.mark.round_trip_budget(n) 的用例在 call 阶段往返超过 n 次时判定失败，
+    用于发现逐行查找元素之类的往返次数回归
+    """
+    marker = item.get_closest_marker("round_trip_budget")
+    if marker is None or report.when != "call" or not report.passed or "call" not in item.phase_durations:
+        return
+    budget = marker.args[0] if marker.args else marker.kwargs["max_round_trips"]
+    round_trips = item.phase_durations["call"][1]
+    if round_trips > budget:
+        stats = get_command_metrics().test_stats(item.nodeid)
+        report.outcome = "failed"
+        report.longrepr = (f"往返次数超出预算: {round_trips} > {budget}（driver 命令 {stats.count} 条，"
+                           f"最多的命令 {stats.commands.most_common(3)}）")
+        item.phase_durations["call"] = (report.duration, round_trips, report.outcome)
+
+
+def record_phase_duration(item, report):
+    """teardown 结束后将各阶段耗时写入耗时历史"""
+    if report.when != "teardown" or not getattr(item, 'phase_durations', None):
+        return
+    config = item.config
+    if not hasattr(config, "duration_versions"):
+        config.duration_versions = current_versions(get_session_device_id(config))
+    hardware, app_version = config.duration_versions
+    outcomes = [outcome for _, _, outcome in item.phase_durations.values()]
+    total_outcome = "failed" if "failed" in outcomes else "skipped" if "skipped" in outcomes else "passed"
+    history = get_duration_history()
+    for phase, (duration, round_trips, outcome) in item.phase_durations.items():
+        history.add(config.duration_run_id, item.nodeid, hardware, app_version, phase, duration, round_trips, outcome)
+    history.add(config.duration_run_id, item.nodeid, hardware, app_version, "total",
+                sum(duration for duration, _, _ in item.phase_durations.values()),
+                sum(round_trips for _, round_trips, _ in item.phase_durations.values()), total_outcome)
+
+
+def attach_failure_screenshots(item):
+    """等待后台截图写入完成，将原图作为 PNG 附件附加到Allure报告"""
+    for ticket, name in getattr(item, "failure_screenshots", []):
+        if not ticket.wait(SCREENSHOT_ATTACH_TIMEOUT) or ticket.digest is None:
+            logger.error(f"截图写入失败或超时（{SCREENSHOT_ATTACH_TIMEOUT}s），无法附加到报告: {ticket.path}")
+            continue
+        get_artifact_store().attach(ticket.digest, name, allure.attachment_type.PNG)
+    item.failure_screenshots = []
+
+
+def attach_download_timelines(item):
+    """失败用例：导出用例中下载监控的时间线（每个文件的状态、进度与速率）并附加到报告"""
+    monitors = pop_test_monitors()
+    if not monitors or not getattr(item, "recording_failed", False):
+        return
+    store = get_artifact_store()
+    test_name = item.nodeid.replace("::", "_").replace("/", "_").replace(".", "_")[:100]
+    for index, monitor in enumerate(monitors):
+        path = monitor.export(os.path.join(DOWNLOAD_TIMELINE_DIR, f"{test_name}_{index}.json"))
+        store.attach(store.put_file(path), f"下载时间线: {item.name}", allure.attachment_type.JSON)
+
+
+def attach_logcat_slice(item, report):
+    """截取用例开始至今的设备日志，存入产物仓库并附加到报告"""
+    collector = get_logcat_collector(get_session_device_id(item.config), start=False)
+    if not collector.running or not hasattr(item, 'start_time'):
+        return
+    text = collector.slice_text(item.start_time)
+    if not text:
+        return
+    test_name = item.nodeid.replace("::", "_").replace("/", "_").replace(".", "_")[:100]
+    log_path = os.path.join(LOGCAT_DIR, f"FAIL_{report.when.upper()}_{test_name}.log")
+    store = get_artifact_store()
+    digest = store.put_bytes(text.encode("utf-8"), ".log", link_to=log_path)
+    store.attach(digest, f"{report.when.capitalize()}阶段设备日志: {item.name}", allure.attachment_type.TEXT)
+    logger.info(f"设备日志片段已保存: {log_path}（{text.count(chr(10)) + 1} 行）")
+
+
 @pytest.hookimpl(tryfirst=True, hookwrapper=True)
 def pytest_runtest_makereport(item, call):
     """处理测试报告生成"""
     # 获取测试结果
     outcome = yield
     report = outcome.get_result()
+    track_phase(item, report)
+    check_round_trip_budget(item, report)
+    if history_enabled():
+        try:
+            record_phase_duration(item, report)
+        except Exception as e:
+            logger.error(f"记录用例耗时失败: {e}")
     
     # 只在测试失败时处理（包括setup, call, teardown阶段）
     if report.failed:
+        # 标记失败，录屏 fixture 结束时据此保留录屏
+        item.recording_failed = True
+        try:
+            attach_logcat_slice(item, report)
+        except Exception as e:
+            logger.error(f"保存设备日志失败: {e}", exc_info=True)
         # 查找driver实例 - 从多个地方查找
         driver = None
         
@@ -154,68 +378,66 @@ def pytest_runtest_makereport(item, call):
                 screenshot_name = f"FAIL_{report.when.upper()}_{test_name}_{timestamp}.png"
                 screenshot_path = os.path.join(SCREENSHOT_DIR, screenshot_name)
                 
-                # 保存截图
-                driver.save_screenshot(screenshot_path)
-                logger.info(f"测试失败截图已保存: {screenshot_name}")
+                # 等待屏幕刷新完成后截图，编码与写盘由截图服务在后台完成
+                DisplaySettleDetector(driver, driver.capabilities.get('udid')).wait()
+                ticket = get_screenshot_service().capture(driver, screenshot_path,
+                                                          stream=driver.capabilities.get('udid') or "default")
+                logger.info(f"测试失败截图已提交: {screenshot_name}")
+                
+                # 保存页面源码（相同界面只存一份）
+                page_source_path = os.path.join(SCREENSHOT_DIR, screenshot_name.replace(".png", ".xml"))
+                store = get_artifact_store()
+                page_source_digest = store.put_bytes(driver.page_source.encode("utf-8"), ".xml",
+                                                     link_to=page_source_path)
+                store.attach(page_source_digest, f"{report.when.capitalize()}阶段页面源码: {item.name}",
+                             allure.attachment_type.XML)
                 
-                # 附加到Allure报告
-                allure.attach.file(
-                    screenshot_path,
-                    name=f"{report.when.capitalize()}阶段失败截图: {item.name}",
-                    attachment_type=allure.attachment_type.PNG
-                )
+                # 截图在后台写入，teardown 阶段写入完成后再附加到Allure报告
+                item.failure_screenshots = getattr(item, "failure_screenshots", []) + [
+                    (ticket, f"{report.when.capitalize()}阶段失败截图: {item.name}")
+                ]
                 
                 # 为pytest-html报告准备数据
                 if hasattr(report, "extra"):
                     # 获取HTML报告插件
                     html = item.config.pluginmanager.getplugin("html")
                     if html:
-                        # 添加缩略图
-                        try:
-                            with open(screenshot_path, "rb") as f:
-                                img = Image.open(f)
-                                img.thumbnail((400, 400))  # 创建缩略图
-                                img_bytes = BytesIO()
-                                img.save(img_bytes, format='PNG')
-                                img_bytes = img_bytes.getvalue()
-                            
-                            # 创建相对路径用于HTML报告
-                            if hasattr(item.config.option, 'htmlpath') and item.config.option.htmlpath:
-                                rel_path = os.path.relpath(screenshot_path,
-                                                           os.path.dirname(item.config.option.htmlpath))
-                            else:
-                                # 如果没有设置 htmlpath，使用绝对路径或默认路径
-                                rel_path = screenshot_path
-                            # 添加到报告extra
-                            report.extra = getattr(report, "extra", []) + [
-                                html.extras.image(img_bytes, "缩略图"),
-                                html.extras.html(f'<div><a href="{rel_path}" target="_blank">'
-                                                 f'<img src="{rel_path}" width="400"></a></div>')
-                            ]
-                        except Exception as e:
-                            logger.error(f"处理截图缩略图失败: {e}", exc_info=True)
+                        # 创建相对路径用于HTML报告
+                        if hasattr(item.config.option, 'htmlpath') and item.config.option.htmlpath:
+                            report_dir = os.path.dirname(item.config.option.htmlpath)
+                            rel_path = os.path.relpath(ticket.path, report_dir)
+                            rel_thumbnail = os.path.relpath(ticket.thumbnail_path, report_dir)
+                        else:
+                            # 如果没有设置 htmlpath，使用绝对路径
+                            rel_path, rel_thumbnail = ticket.path, ticket.thumbnail_path
+                        # 添加到报告extra：缩略图按需加载，点击查看原图
+                        report.extra = getattr(report, "extra", []) + [
+                            html.extras.html(f'<div><a href="{rel_path}" target="_blank">'
+                                             f'<img src="{rel_thumbnail}" loading="lazy"></a></div>')
+                        ]
             except Exception as e:
                 logger.error(f"截图保存失败: {e}", exc_info=True)
         else:
             logger.warning(f"未找到可用的driver实例，无法为失败测试截图: {item.nodeid}")
     
-    # 处理录制的视频 - 无论测试是否失败都附加视频
-    if hasattr(item, 'video_path') and os.path.exists(item.video_path):
+    # 处理录制的视频 - 只有失败用例保留录屏，在teardown阶段等待后台转码完成后附加
+    if report.when == "teardown" and hasattr(item, 'video_path'):
         try:
             # 附加到Allure报告
-            allure.attach.file(
-                item.video_path,
-                name=f"{report.when.capitalize()}阶段录屏: {item.name}",
-                attachment_type=allure.attachment_type.MP4
-            )
-            logger.info(f"已将录屏附加到Allure报告: {os.path.basename(item.video_path)}")
+            digest = item.video_future.result(timeout=VIDEO_ATTACH_TIMEOUT)
+            if get_artifact_store().attach(digest, f"失败录屏: {item.name}", allure.attachment_type.MP4):
+                logger.info(f"已将录屏附加到Allure报告: {os.path.basename(item.video_path)}")
             
             # 为pytest-html报告添加视频链接
-            if hasattr(report, "extra") and report.when == "call":
+            if hasattr(report, "extra"):
                 html = item.config.pluginmanager.getplugin("html")
                 if html:
                     # 创建相对路径
-                    rel_video_path = os.path.relpath(item.video_path, os.path.dirname(item.config.option.htmlpath))
+                    if hasattr(item.config.option, 'htmlpath') and item.config.option.htmlpath:
+                        rel_video_path = os.path.relpath(item.video_path,
+                                                         os.path.dirname(item.config.option.htmlpath))
+                    else:
+                        rel_video_path = item.video_path
                     
                     # 添加视频链接
                     report.extra = getattr(report, "extra", []) + [
@@ -224,6 +446,20 @@ def pytest_runtest_makereport(item, call):
                     ]
         except Exception as e:
             logger.error(f"附加录屏到报告失败: {e}", exc_info=True)
+    
+    if report.when == "teardown":
+        try:
+            attach_failure_screenshots(item)
+        except Exception as e:
+            logger.error(f"附加失败截图到报告失败: {e}", exc_info=True)
+        try:
+            attach_trace(item)
+        except Exception as e:
+            logger.error(f"保存时间线追踪失败: {e}", exc_info=True)
+        try:
+            attach_download_timelines(item)
+        except Exception as e:
+            logger.error(f"保存下载时间线失败: {e}", exc_info=True)
 
 
 def pytest_html_report_title(report):
@@ -243,48 +479,65 @@ def pytest_html_results_summary(prefix, summary, postfix):
 # 添加session级别的teardown
 def pytest_sessionfinish(session, exitstatus):
     """测试会话结束时执行"""
+    # 等待后台截图与录屏转码全部完成
+    shutdown_screenshot_service()
+    shutdown_transcode_pool()
+    stop_logcat_collectors()
+    worker_id = os.environ.get("PYTEST_XDIST_WORKER")
+    if not is_xdist_controller(session.config):
+        get_command_metrics().write_report(os.path.join(
+            BASE_DIR, "reports", f"command_metrics_{worker_id}.json" if worker_id else "command_metrics.json"))
+    if history_enabled():
+        report_duration_history(session.config)
+    store = get_artifact_store()
+    store.enforce()
+    logger.info(f"产物仓库统计: {store.stats()}")
     logger.info("=" * 50)
     logger.info(f"测试会话结束状态: {exitstatus}")
     logger.info("=" * 50)
 
 
+def report_duration_history(config):
+    """写入本进程的用例耗时；主进程（所有工作进程结束后）检测变慢并生成趋势页"""
+    history = get_duration_history()
+    history.flush()
+    if hasattr(config, "workerinput"):
+        return
+    try:
+        regressions = history.detect_regressions(config.duration_run_id)
+        for regression in regressions:
+            logger.warning(f"用例耗时显著变慢: {regression.node_id} [{regression.phase}] "
+                           f"{regression.duration:.2f}s，基线 {regression.baseline:.2f}s"
+                           f"（{regression.samples} 次，z={regression.score:.1f}）")
+        logger.info(f"用例耗时趋势页: {history.render_trend_page(regressions=regressions)}")
+    except Exception as e:
+        logger.error(f"生成耗时趋势失败: {e}")
+
+
 def clean_database(device_id=None):
     """清理数据库文件，如果文件不存在则记录日志"""
     db_path = "/storage/emulated/0/hwsys/database/clouds.db"
-    adb_prefix = f"adb -s {device_id}" if device_id else "adb"
     
-    # 1. 检查文件是否存在
-    check_cmd = f"{adb_prefix} shell ls {db_path}"
-    check_result = subprocess.run(
-        check_cmd,
-        shell=True,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True
-    )
+    # 检查与删除合并为一次 adb 交互（通过 adb server 直连，不启动 adb 进程）
+    check_result, del_result = get_transport(device_id).run_batch([
+        f"ls {db_path}",
+        f"[ -e {db_path} ] && rm -f {db_path}"
+    ])
     
-    # 2. 根据存在性执行不同操作
-    if check_result.returncode == 0:
-        # 文件存在 - 执行删除
-        del_cmd = f"{adb_prefix} shell rm -f {db_path}"
-        del_result = subprocess.run(
-            del_cmd,
-            shell=True,
-            capture_output=True,
-            text=True
-        )
-        
-        if del_result.returncode == 0:
+    # 根据存在性执行不同操作
+    if check_result.exit_code == 0:
+        # 文件存在 - 已执行删除
+        if del_result.exit_code == 0:
             logger.info(f"✅ 成功删除数据库文件: {db_path}")
         else:
-            logger.error(f"❌ 删除数据库文件失败: {del_result.stderr.strip()}")
-            pytest.fail(f"数据库文件删除失败: {del_result.stderr.strip()}")
+            logger.error(f"❌ 删除数据库文件失败: {del_result.output}")
+            pytest.fail(f"数据库文件删除失败: {del_result.output}")
     else:
         # 文件不存在 - 记录信息日志
         logger.info(f"ℹ️ 数据库文件不存在，无需删除: {db_path}")
         # 检查错误是否是"文件不存在"（避免漏报其他错误）
-        if "No such file or directory" not in check_result.stderr:
-            logger.warning(f"⚠️ 文件检查异常: {check_result.stderr.strip()}")
+        if "No such file or directory" not in check_result.output:
+            logger.warning(f"⚠️ 文件检查异常: {check_result.output}")
 
 
 class CleanupManager:
@@ -323,21 +576,65 @@ def cleanup_manager():
     manager.execute_cleanup()  # 注意：这个方法现在只执行注册的清理，不处理默认清理
 
 
+@pytest.fixture(scope="session", autouse=True)
+def logcat_collector(request):
+    """后台采集设备日志，失败用例在报告中附加对应时间段的日志"""
+    collector = get_logcat_collector(get_session_device_id(request.config))
+    yield collector
+    collector.stop()
+
+
+@pytest.fixture(scope="function", autouse=True)
+def screen_recording(request):
+    """分段录屏：用例通过时丢弃，失败时拼接最近的分段并在后台转码"""
+    if not recording_enabled():
+        yield None
+        return
+    recorder = SegmentedScreenRecorder(get_session_device_id(request.config))
+    try:
+        recorder.start()
+    except Exception as e:
+        logger.warning(f"启动录屏失败: {e}")
+        yield None
+        return
+    yield recorder
+    failed = getattr(request.node, "recording_failed", False)
+    test_name = request.node.nodeid.replace("::", "_").replace("/", "_").replace(".", "_")[:100]
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    video_path = os.path.join(VIDEO_DIR, f"FAIL_{test_name}_{timestamp}.mp4")
+    try:
+        video_future = recorder.finish(failed, video_path)
+        if video_future is not None:
+            request.node.video_path = video_path
+            request.node.video_future = video_future
+    except Exception as e:
+        logger.error(f"保存录屏失败: {e}", exc_info=True)
+
+
 @pytest.fixture(scope="session")
 def app_driver(request):
     # 获取命令行参数
-    device_id = request.config.getoption("--device-id", default=None)
+    device_id = get_session_device_id(request.config)
     app_package = request.config.getoption("--app-package", default="com.example.app")
     app_activity = request.config.getoption("--app-activity", default=".MainActivity")
     
     # 执行智能清理，下方注释打开后每一次都会执行清空数据库操作
     # clean_database(device_id)
     """创建并返回Appium driver"""
-    driver = init_driver()
+    lease = request.config.device_lease
+    driver = init_driver(lease.slot, lease.ensure_server()) if lease is not None else init_driver()
+    instrument_driver(driver)
     yield driver
+    log_memo_stats(driver)
     driver.quit()
 
 
+@pytest.fixture(scope="session")
+def screen_router(app_driver):
+    """界面路由：识别当前界面并按最短路径导航到目标界面"""
+    return ScreenRouter(app_driver)
+
+
 @pytest.fixture(scope="function")
 def app_switcher(app_driver):
     """应用切换工具类的 fixture"""
@@ -364,10 +661,28 @@ def nut_cloud_logged(setup):
 
 
 @pytest.fixture(scope="session")
-def logged_in_driver(nut_cloud_logged, app_driver):
-    """Session 范围的已登录 driver"""
+def app_checkpoint(app_driver):
+    """应用状态存档（设备不支持或已关闭时为 None）"""
+    if not checkpoint_enabled():
+        return None
+    checkpoint = AppCheckpoint(app_driver.capabilities.get("udid"))
+    return checkpoint if checkpoint.supported else None
+
+
+@pytest.fixture(scope="session")
+def logged_in_driver(app_driver, app_checkpoint, screen_router, request: FixtureRequest):
+    """Session 范围的已登录 driver：优先恢复已登录存档，没有存档时走界面登录并保存存档"""
+    if app_checkpoint is not None and app_checkpoint.restore(LOGGED_IN_CHECKPOINT):
+        # 应用已重启，界面快照与界面级缓存失效
+        screen_router.page(HomePage).invalidate_ui_snapshot()
+        yield app_driver
+        return
+    request.getfixturevalue("nut_cloud_logged")
     login_page = NutLoginPage(app_driver)
     login_page.login_successful()
+    if app_checkpoint is not None:
+        app_checkpoint.save(LOGGED_IN_CHECKPOINT)
+        screen_router.page(HomePage).invalidate_ui_snapshot()
     yield app_driver
 
 
@@ -471,9 +786,8 @@ def nut_cloud_login(setup, cleanup_manager):
 
 
 @pytest.fixture(scope="session")
-def click_nut_cloud(app_driver):
-    home_page = HomePage(app_driver)
-    home_page.click_cloud()
+def click_nut_cloud(app_driver, screen_router):
+    screen_router.go_to(DocumentHomePage)
     yield app_driver
 
 
@@ -491,21 +805,20 @@ def enter_nut_cloud_home(app_driver, click_nut_cloud, cleanup_manager):
 
 
 @pytest.fixture(scope="package")
-def enter_folder_page_parametrized(app_driver, click_nut_cloud):
+def enter_folder_page_parametrized(app_driver, click_nut_cloud, screen_router):
     """参数化的进入文件夹页面fixture"""
-    enter_nut_cloud_home = DocumentHomePage(app_driver)
-    enter_nut_cloud_home.enter_file_page(folder_list[0]["filenames"])
-    enter_nut_cloud_home.enter_file_page(folder_list[1]["filenames"])
-    yield enter_nut_cloud_home
+    screen_router.go_to(FilePage, folder_path=DEFAULT_FOLDER_PATH)
+    yield screen_router.page(DocumentHomePage)
 
 
 @pytest.fixture(scope="function")
-def enter_folder_page(app_driver, enter_folder_page_parametrized, cleanup_manager):
+def enter_folder_page(app_driver, enter_folder_page_parametrized, screen_router, cleanup_manager):
     """参数化的进入文件夹页面fixture"""
     file_page = FilePage(enter_folder_page_parametrized.driver)
     file_page.register_cleanup = cleanup_manager.register_cleanup
     file_page.set_skip_default_cleanup = cleanup_manager.set_skip_default_cleanup
-    # 进入文件夹
+    # 进入文件夹（上一个用例的默认清理会返回上一级，已在目标文件夹时不做任何操作）
+    screen_router.go_to(FilePage, folder_path=DEFAULT_FOLDER_PATH)
     
     yield file_page
     if not cleanup_manager.skip_default_cleanup:
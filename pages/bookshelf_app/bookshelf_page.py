@@ -110,17 +110,7 @@ class BookshelfPage(BasePage):
     
     def get_bookshelf_number_text(self):
         """获取书架当前页/总页"""
-        try:
-            page_text = self.get_element_attribute(
-                self.progress_tv,
-                "text"
-            )
-            
-            current_page, all_pages = map(int, page_text.split('/'))
-            return current_page, all_pages
-        except Exception as e:
-            logger.error(f"获取书架页码失败{e}")
-            raise
+        return self.get_page_number_text(self.progress_tv)
     
     def click_bookshelf_folder(self, folder_name):
         """根据文件名点击书架文件夹"""
@@ -131,9 +121,10 @@ class BookshelfPage(BasePage):
                 self.tv_group_name,
                 self.layout,
                 folder_name,
-                all_pages,
                 current_page,
-                self.next_btn
+                all_pages,
+                self.next_btn,
+                self.progress_tv
             )
             logger.info(f"点击：{folder_name}文件夹成功")
         except Exception as e:
@@ -3,18 +3,19 @@ import logging
 from appium.webdriver.webdriver import WebDriver as AppiumDriver
 
 from base.base_page import BasePage
-from common.device_info import DeviceInfoManager
+from common.device_info import get_hardware_version
 from locators.document_home_locators import DocumentHomeLocators
 from utils.loactor_validator import LocatorValidator
 
 locators = DocumentHomeLocators()
 locator_validator = LocatorValidator()
 logger = logging.getLogger(__name__)
-device_info_manager = DeviceInfoManager()
-hardware_version = str(device_info_manager.get_hardware_version())
 
 
 class DocumentHomePage(BasePage):
+    # 网盘根目录显示网盘账户标志，与文件夹页区分
+    SCREEN_REQUIRES = ("tv_account",)
+    LIST_ROW_PROPERTY = "root_layout"
     
     def __init__(self, driver: AppiumDriver):
         super().__init__(driver=driver)
@@ -561,6 +562,31 @@ class DocumentHomePage(BasePage):
             logger.error(f"进入文件夹失败：{e}")
         return success
     
+    def enter_folder_path(self, folder_names):
+        """
+        依次进入多级文件夹（合并为一次服务端脚本）；
+        文件夹不在当前页时脚本失败，回退为逐级分页查找进入
+        :param folder_names: 文件夹名称列表，如 ["一级", "二级"]
+        :return: T/F
+        """
+        if isinstance(folder_names, str):
+            folder_names = [folder_names]
+        script = self.new_driver_script(f"进入文件夹：{'/'.join(folder_names)}")
+        for folder_name in folder_names:
+            script.click_text(self.file_grid_tv_id, folder_name)
+            # 页码在点击前就存在，以文件夹标题变为点击的名称确认已进入
+            script.wait_for_text(self.name_file_tv, folder_name)
+        try:
+            self.run_driver_script(script)
+            logger.info(f"进入文件夹：{folder_names}成功")
+            return True
+        except Exception as e:
+            logger.warning(f"批量进入文件夹失败，逐级查找进入：{e}")
+        # 脚本可能已进入部分层级，从当前所在文件夹继续
+        current_folder = self.get_folder_detail_page_name() if len(folder_names) > 1 else None
+        start = folder_names.index(current_folder) + 1 if current_folder in folder_names else 0
+        return all(self.enter_file_page(folder_name) for folder_name in folder_names[start:])
+    
     def get_folder_detail_page_name(self):
         try:
             name_text = self.get_element_attribute(
@@ -632,19 +658,6 @@ class DocumentHomePage(BasePage):
             logger.error(f"验证复选框点击状态失败: {e}")
             return False
     
-    def get_page_number_text(self):
-        try:
-            page_text = self.get_element_attribute(
-                self.page_tv,
-                "text"
-            )
-            
-            current_page, all_pages = map(int, page_text.split('/'))
-            return current_page, all_pages
-        except Exception as e:
-            logger.error(f"获取页码失败{e}")
-            raise
-    
     class MorePopWindow(BasePage):
         CONFIG_PATH = "data/locators/document_home_page.yaml"
         
@@ -698,6 +711,8 @@ class DocumentHomePage(BasePage):
             :return self:
             """
             try:
+                # 按当前会话的设备读取硬件版本（多设备并行时各设备坐标不同）
+                hardware_version = get_hardware_version(self.device_id)
                 if hardware_version in coordinates_data:
                     config = coordinates_data[hardware_version]
                     self.click_through_coordinates(
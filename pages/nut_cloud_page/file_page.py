@@ -1,8 +1,8 @@
 import logging
 
 from base.base_page import BasePage
+from common.device_info import get_hardware_version
 from locators.document_home_locators import DocumentHomeLocators
-from pages.nut_cloud_page.document_home_page import hardware_version
 from utils.loactor_validator import LocatorValidator
 
 logger = logging.getLogger(__name__)
@@ -12,6 +12,9 @@ locators = DocumentHomeLocators()
 
 class FilePage(BasePage):
     CONFIG_PATH = "data/locators/document_home_page.yaml"
+    # 文件夹内不显示网盘账户标志
+    SCREEN_EXCLUDES = ("tv_account",)
+    LIST_ROW_PROPERTY = "root_layout"
     
     def __init__(self, driver):
         super().__init__(driver)
@@ -281,6 +284,8 @@ class FilePage(BasePage):
             :return self:
             """
             try:
+                # 按当前会话的设备读取硬件版本（多设备并行时各设备坐标不同）
+                hardware_version = get_hardware_version(self.device_id)
                 if hardware_version in coordinates_data:
                     config = coordinates_data[hardware_version]
                     self.click_through_coordinates(
@@ -98,17 +98,7 @@ class SearchCopyPage(BasePage):
     
     def get_copy_page_number_text(self):
         """获取页码当前页、总页数"""
-        try:
-            page_text = self.get_element_attribute(
-                self.page_tv,
-                "text"
-            )
-            
-            current_page, all_pages = map(int, page_text.split('/'))
-            return current_page, all_pages
-        except Exception as e:
-            logger.error(f"获取页码失败{e}")
-            raise
+        return self.get_page_number_text(self.page_tv)
     
     def enter_copy_page_folder_name(self, folder_name):
         """根据文件夹名称勾选文件"""
@@ -1,13 +1,13 @@
 import logging
 import re
+import time
 
 from base.base_page import BasePage
 from locators.bookshelf_page_locators import BookshelfPageLocators
 from locators.search_page_locators import SearchPageLocators
-from pages.nut_cloud_page.document_home_page import DocumentHomePage
-from pages.nut_cloud_page.home_page import HomePage
+from utils.download_monitor import DEFAULT_MONITOR_TIMEOUT, DownloadMonitor
 from utils.loactor_validator import LocatorValidator
-from utils.test_data_loader import load_test_data
+from utils.log_events import EVENT_DOWNLOAD_COMPLETE
 
 logger = logging.getLogger(__name__)
 locator_validator = LocatorValidator()
@@ -16,6 +16,8 @@ bookshelf_locators = BookshelfPageLocators()
 
 
 class SearchPage(BasePage):
+    LIST_ROW_PROPERTY = "root_list_layout"
+    
     def __init__(self, driver):
         super().__init__(driver)
         # 验证必需的定位器配置
@@ -300,20 +302,6 @@ class SearchPage(BasePage):
             next_button_locator=self.next_page
         )
     
-    def get_page_number_text(self):
-        """获取页码当前页、总页数"""
-        try:
-            page_text = self.get_element_attribute(
-                self.page_tv,
-                "text"
-            )
-            
-            current_page, all_pages = map(int, page_text.split('/'))
-            return current_page, all_pages
-        except Exception as e:
-            logger.error(f"获取页码失败{e}")
-            raise
-    
     def click_search_file_name(self, filenames):
         """根据文件名称进行勾选文件"""
         try:
@@ -415,11 +403,11 @@ class SearchPage(BasePage):
     def verify_cancel_but_not_success(self):
         """验证取消按钮不存在成功"""
         try:
-            cancel_but = self.wait_for_element(
+            cancel_but_absent = self.wait_for_element_absent(
                 self.search_select_ed_tv
             )
             logger.info(f"验证取消按钮不存在成功")
-            return cancel_but is None
+            return cancel_but_absent
         except Exception as e:
             logger.error(f"取消按钮存在：{e}")
             return False
@@ -607,10 +595,9 @@ class SearchPage(BasePage):
     def verify_file_name_None(self):
         """验证长按关闭后无法定位到名称"""
         try:
-            file_name = self.wait_for_element(
+            return self.wait_for_element_absent(
                 self.name_file_tv
             )
-            return file_name is None
         except Exception as e:
             logger.error(f"定位文件名称异常：{e}")
             return False
@@ -887,68 +874,110 @@ class SearchPage(BasePage):
             logger.info(f"下载列表文件获取失败")
             raise e
     
-    def get_current_download_progress(self, filenames):
-        """获取当前下载进度值"""
-        try:
-            current_page, all_pages = self.get_page_number_text()
-            # 字典，key=文件名，value=进度
-            progress_dict = {}
-            # 正则解析表达式，提取数字
-            progress_pattern = re.compile(r'(\d+)%')
-            while True:
-                # 获取原始进度列表（如 ['下载中43%', '下载中1%', '重试']）
-                raw_progress_list = self.get_file_attributes(
-                    self.root_list_layout,
-                    self.janDdTitleNameTv,
-                    self.jan_dd_status_tv,
-                    filenames,
-                    current_page,
-                    all_pages,
-                    "text",
-                    self.next_page
-                )
-                logger.debug(f"原始进度列表：{raw_progress_list}, 文件名列表：{filenames}")  # if download_progress<100:
-                for filename, raw_progress in zip(filenames, raw_progress_list):
-                    # 初始化当前文件进度
-                    progress_value = None
-                    # 下载中状态
-                    if "下载中" in raw_progress:
-                        # 提取数字部分（如 '下载中43%' → 43）
-                        match = progress_pattern.search(raw_progress)
-                        if match:
-                            progress_value = int(match.group(1))
-                            # 处理「重试」状态
-                    elif "重试" in raw_progress:
-                        progress_value = "重试"  # 用字符串标记重试状态
-                    
-                    # 处理「已完成」状态（如果有）
-                    elif "打开" in raw_progress:
-                        progress_value = 100
-                    progress_dict[filename] = progress_value
-                logger.debug(f"解析后的进度字典：{progress_dict}")
-                for filename, progress in progress_dict.items():
-                    if isinstance(progress, int):
-                        if progress < 100:
-                            logger.info(f"文件{filename}下载中，进度：{progress}%")
-                        elif progress == 100:
-                            logger.info(f"文件{filename}下载完成")
-                        elif progress == "重试":
-                            logger.warning(f"文件{filename}需要重试下载")
-                all_processed = all(
-                    p in [100, "重试"] for p in progress_dict.values()
-                )
-                if all_processed:
-                    break
+    def _read_transfer_rows(self):
+        return self.read_list_rows(self.root_list_layout, self.janDdTitleNameTv, info_locator=self.jan_dd_status_tv)
+    
+    def _collect_download_statuses(self, row_index, page_num, statuses, pending, row_pages):
+        """从一页列表行中取出目标文件的状态，并记录文件所在页"""
+        for filename in list(pending):
+            row = row_index.get(filename)
+            if row is None:
+                continue
+            statuses[filename] = row.info if row.info is not None else row.attribute(self.jan_dd_status_tv, "text")
+            row_pages[filename] = page_num
+            pending.discard(filename)
+    
+    def read_download_statuses(self, filenames, row_pages=None):
+        """
+        读取传输列表中文件的下载状态（先回到第1页，找齐目标文件后不再翻页）
+        :param filenames: 文件名列表
+        :param row_pages: 可选，{文件名: 所在页}，读取时更新，供 sample_download_statuses 使用
+        :return: {文件名: 状态文本}，如 {"a.pdf": "下载中43%"}，未找到的文件不包含在内
+        """
+        # 下载进度会自行刷新，每次读取都重新抓取界面快照
+        self.invalidate_ui_snapshot()
+        statuses = {}
+        pending = set(filenames)
+        row_pages = {} if row_pages is None else row_pages
+        pages = self.iter_list_pages(self._read_transfer_rows, self.next_page, prev_button_locator=self.pre_page)
+        for page_num, row_index in pages:
+            self._collect_download_statuses(row_index, page_num, statuses, pending, row_pages)
+            if not pending:
+                break
+        return statuses
+    
+    def sample_download_statuses(self, filenames, row_pages):
+        """
+        下载监控的单次采样：只重新读取当前页，目标文件不在当前页时翻到其上次出现的页；
+        有文件从未出现过（或已不在上次出现的页）时才回到第1页完整扫描
+        :param filenames: 未完成的文件名列表
+        :param row_pages: {文件名: 所在页}，在多次采样之间保留
+        :return: {文件名: 状态文本}
+        """
+        if any(filename not in row_pages for filename in filenames):
+            return self.read_download_statuses(filenames, row_pages)
+        self.invalidate_ui_snapshot()
+        statuses = {}
+        pending = set(filenames)
+        page_indicator = self._default_page_indicator()
+        current_page = self.get_page_number_text(page_indicator)[0] if page_indicator is not None else 1
+        while True:
+            self._collect_download_statuses(self._read_transfer_rows(), current_page, statuses, pending, row_pages)
+            # 上次在当前页的文件已不在该页（列表重新排序），下次采样完整扫描
+            for filename in [name for name in pending if row_pages[name] == current_page]:
+                del row_pages[filename]
+                pending.discard(filename)
+            if not pending:
+                return statuses
+            target = min({row_pages[name] for name in pending}, key=lambda page: abs(page - current_page))
+            button, step = (self.next_page, 1) if target > current_page else (self.pre_page, -1)
+            while current_page != target:
+                if not self.turn_page(button):
+                    logger.warning(f"无法从第{current_page}页翻到第{current_page + step}页，本次采样结束")
+                    return statuses
+                current_page += step
+    
+    def get_current_download_progress(self, filenames, timeout=DEFAULT_MONITOR_TIMEOUT):
+        """
+        监控下载进度直到所有文件下载完成或需要重试（用例失败时时间线附加到报告）
+        :param filenames: 文件名列表
+        :param timeout: 最长监控时间（秒）
+        :return: {文件名: 进度}，完成为100，重试为"重试"，下载中为百分比
+        """
+        if isinstance(filenames, str):
+            filenames = [filenames]
+        try:
+            # 只在第一次采样时回到第1页扫描，之后只读取目标文件所在的页
+            row_pages = {}
+            # 设备日志中出现下载完成事件时立即采样，不必等到下一个采样间隔
+            with self.log_event_signal(EVENT_DOWNLOAD_COMPLETE) as download_event:
+                monitor = DownloadMonitor(lambda: self.sample_download_statuses(monitor.pending(), row_pages),
+                                          filenames, timeout, wake_event=download_event)
+                progress_dict = monitor.run()
+            self.download_monitor = monitor
+            logger.debug(f"解析后的进度字典：{progress_dict}")
             return progress_dict
         except Exception as e:
-            logger.error(f"")
+            logger.error(f"获取下载进度失败：{e}")
             raise e
     
     def restore_drive_application_status(self, drive):
-        folder_list = load_test_data("enter_folder_list.json")
-        home_page = HomePage(drive)
-        home_page.click_cloud()
-        enter_nut_cloud_home = DocumentHomePage(home_page.driver)
-        enter_nut_cloud_home.enter_file_page(folder_list[0]["filenames"])
-        enter_nut_cloud_home.enter_file_page(folder_list[1]["filenames"])
+        """
+        打开传输列表：优先使用 intent 入口，不可用时导航回测试文件夹再点击传输列表按钮
+        两种方式的耗时都记录在导航耗时文件中
+        """
+        # 导航服务依赖本页面类，在此处导入
+        from pages.nut_cloud_page.file_page import FilePage
+        from services.deep_link_service import DeepLinkLauncher
+        from services.navigation_service import DEFAULT_FOLDER_PATH, ScreenRouter
+        router = ScreenRouter(drive)
+        launcher = DeepLinkLauncher(self)
+        if launcher.open("transfer_list"):
+            router.graph.record("intent:transfer_list", launcher.last_latency)
+            router.graph.save()
+            return
+        start = time.monotonic()
+        router.go_to(FilePage, folder_path=DEFAULT_FOLDER_PATH)
         self.click_transmission_list_btn()
+        router.graph.record("ui:transfer_list", time.monotonic() - start)
+        router.graph.save()
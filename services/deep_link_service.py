@@ -0,0 +1,165 @@
+import logging
+import os
+import shlex
+import time
+from typing import Dict, NamedTuple, Optional, Sequence, Set, Type
+from urllib.parse import quote
+
+from base.base_page import BasePage
+from pages.nut_cloud_page.document_home_page import DocumentHomePage
+from pages.nut_cloud_page.file_page import FilePage
+from pages.nut_cloud_page.home_page import HomePage
+from utils.adb_transport import AdbError, get_transport
+from utils.config_loader import load_yaml_config
+
+logger = logging.getLogger(__name__)
+
+config_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../config/config.yaml'))
+_config = load_yaml_config(config_path)
+deep_link_config = _config.get('deep_links') or {}
+APP_PACKAGE = (_config.get('device') or {}).get('appPackage')
+
+# 入口名称 -> (页面类, 定位器文件名)；传输列表没有页面类，按定位器文件名校验落点
+ROUTE_SCREENS: Dict[str, tuple] = {
+    "home": (HomePage, "home_page"),
+    "cloud_root": (DocumentHomePage, "document_home_page"),
+    "folder": (FilePage, "document_home_page"),
+    "transfer_list": (None, "download_list_page"),
+}
+# am start -W 等待启动完成的超时时间（秒）
+LAUNCH_TIMEOUT = 15
+
+# 本次运行中落点不符或启动失败的入口，不再使用
+_failed_routes: Set[str] = set()
+
+
+class DeepLinkRoute(NamedTuple):
+    """网盘应用界面的 intent 入口"""
+    name: str
+    screen: Optional[Type[BasePage]]
+    locator_name: str
+    activity: Optional[str] = None
+    uri: Optional[str] = None
+    action: Optional[str] = None
+    flags: Optional[int] = None
+    extras: Optional[Dict[str, str]] = None
+    
+    @property
+    def available(self) -> bool:
+        return self.name not in _failed_routes
+    
+    def command(self, folder_path: Optional[Sequence[str]] = None) -> str:
+        """
+        生成 am start 命令
+        :param folder_path: 文件夹路径（替换 uri 中的 {path}）
+        :return: shell 命令
+        """
+        parts = ["am", "start", "-W"]
+        if self.uri:
+            path = quote("/".join(folder_path or []))
+            parts += ["-a", self.action or "android.intent.action.VIEW", "-d", self.uri.format(path=path)]
+            if APP_PACKAGE:
+                parts += ["-p", APP_PACKAGE]
+        elif self.action:
+            parts += ["-a", self.action]
+        if self.activity:
+            activity = self.activity if "/" in self.activity else f"{APP_PACKAGE}/{self.activity}"
+            parts += ["-n", activity]
+        if self.flags is not None:
+            parts += ["-f", str(self.flags)]
+        for key, value in (self.extras or {}).items():
+            parts += ["--es", key, str(value)]
+        return " ".join(shlex.quote(part) for part in parts)
+
+
+def load_deep_link_routes() -> Dict[str, DeepLinkRoute]:
+    """读取 config.yaml 中已配置（activity 或 uri）的入口"""
+    routes = {}
+    for name, (screen, locator_name) in ROUTE_SCREENS.items():
+        settings = deep_link_config.get(name) or {}
+        if not settings.get('activity') and not settings.get('uri'):
+            continue
+        routes[name] = DeepLinkRoute(
+            name, screen, locator_name,
+            activity=settings.get('activity'),
+            uri=settings.get('uri'),
+            action=settings.get('action'),
+            flags=settings.get('flags'),
+            extras=settings.get('extras'),
+        )
+    return routes
+
+
+DEEP_LINK_ROUTES: Dict[str, DeepLinkRoute] = load_deep_link_routes()
+
+
+def mark_route_failed(name: str, reason: str):
+    """入口落点不符或启动失败：本次运行不再使用，回退为界面导航"""
+    if name not in _failed_routes:
+        _failed_routes.add(name)
+        logger.warning(f"intent 入口 {name} 不可用，回退为界面导航: {reason}")
+
+
+def get_route(name: str) -> Optional[DeepLinkRoute]:
+    """获取可用的入口，未配置或已失效返回 None"""
+    route = DEEP_LINK_ROUTES.get(name)
+    return route if route is not None and route.available else None
+
+
+class DeepLinkLauncher:
+    """通过 adb am start 直接打开网盘应用界面（代替多次点击的界面路径）"""
+    
+    def __init__(self, page: BasePage):
+        """
+        :param page: 任一页面对象（使用其 driver 与设备序列号）
+        """
+        self.page = page
+        self.transport = get_transport(page.device_id)
+        # 最近一次 open() 的耗时（启动加界面稳定，秒）
+        self.last_latency: Optional[float] = None
+    
+    def launch(self, route: DeepLinkRoute, folder_path: Optional[Sequence[str]] = None) -> float:
+        """
+        启动入口（不校验落点）
+        :param route: 入口
+        :param folder_path: 文件夹路径
+        :return: 启动耗时（秒）
+        """
+        start = time.monotonic()
+        command = route.command(folder_path)
+        try:
+            output = self.transport.run(command, timeout=LAUNCH_TIMEOUT).output
+        except AdbError as e:
+            mark_route_failed(route.name, str(e))
+            raise
+        finally:
+            # 前台界面已变化，界面快照与界面级缓存失效
+            self.page.invalidate_ui_snapshot()
+        if "Error" in output:
+            mark_route_failed(route.name, output)
+            raise AdbError(f"intent 启动失败: {command} | {output}")
+        return time.monotonic() - start
+    
+    def open(self, name: str, folder_path: Optional[Sequence[str]] = None) -> bool:
+        """
+        启动入口并按界面分类校验落点
+        :param name: 入口名称
+        :param folder_path: 文件夹路径
+        :return: 到达预期界面返回 True；入口未配置、已失效或落点不符返回 False
+        """
+        route = get_route(name)
+        if route is None:
+            return False
+        token = self.page.begin_settle(check_activity=True)
+        start = time.monotonic()
+        try:
+            self.launch(route, folder_path)
+        except AdbError:
+            return False
+        self.page.wait_for_settle(token, description=f"intent {name}")
+        self.last_latency = time.monotonic() - start
+        if self.page.classify_screen_match(refresh=False).screen != route.locator_name:
+            mark_route_failed(name, "落点与预期界面不符")
+            return False
+        logger.info(f"intent 入口 {name} 到达 {route.locator_name}，耗时 {self.last_latency:.2f}s")
+        return True
@@ -21,15 +21,15 @@ class LogoutServices(BasePage):
         return self.get_locator(locators.PAGE_SECTION, locators.BIND_CLOUD)
     
     def logout_from_anywhere(self):
-        current_page = self.page_detector.detect_current_page()
+        current_page, dialog = self.classify_screen()
         
-        if current_page == 'HomePage':
+        if current_page is HomePage and dialog is None:
             self._logout_from_home()
         else:
             self._universal_logout()
     
     def _logout_from_home(self):
-        HomePage.long_press_cloud()
+        HomePage(self.driver).long_press_cloud_success()
     
     def _universal_logout(self):
         pass
@@ -0,0 +1,342 @@
+import heapq
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from itertools import count
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Set, Type
+
+from base.base_page import BasePage
+from pages.bookshelf_app.bookshelf_page import BookshelfPage
+from pages.nut_cloud_page.account_information_page import AccountInformationPage
+from pages.nut_cloud_page.details_page import DetailsPage
+from pages.nut_cloud_page.document_home_page import DocumentHomePage
+from pages.nut_cloud_page.file_page import FilePage
+from pages.nut_cloud_page.home_page import HomePage
+from pages.nut_cloud_page.search_copy_page import SearchCopyPage
+from pages.nut_cloud_page.search_page import SearchPage
+from services.deep_link_service import DEEP_LINK_ROUTES, DeepLinkLauncher, get_route, mark_route_failed
+from utils.app_switcher import AppSwitcher
+from utils.file_lock import exclusive_file_lock
+from utils.test_data_loader import load_test_data
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# 实测边耗时持久化文件（跨运行累积，首次运行使用默认估计值）
+COSTS_PATH = os.path.join(BASE_DIR, 'reports', 'navigation_costs.json')
+# 实测耗时的指数移动平均系数
+COST_ALPHA = 0.3
+# 单次导航最多执行的步数（含无法识别界面时的返回）
+MAX_STEPS = 8
+# 每一步操作后等待界面稳定的超时时间（秒）
+STEP_SETTLE_TIMEOUT = 5
+# 默认进入的文件夹路径（与 enter_folder_list.json 一致）
+DEFAULT_FOLDER_PATH = [name for item in load_test_data("enter_folder_list.json") for name in item["filenames"]]
+
+
+class NavigationError(RuntimeError):
+    """无法到达目标界面"""
+
+
+class ScreenEdge(NamedTuple):
+    """
+    界面之间的一条导航边
+    source 为 None 表示可从任意网盘界面出发（如 adb 切换应用、intent 入口）
+    action(router, **params) 执行跳转操作
+    route 为 intent 入口名称：落点不符时本次运行不再使用该边
+    """
+    source: Optional[Type[BasePage]]
+    target: Type[BasePage]
+    name: str
+    action: Callable
+    default_cost: float
+    route: Optional[str] = None
+    
+    @property
+    def key(self) -> str:
+        source = self.source.__name__ if self.source else "*"
+        return f"{source}->{self.target.__name__}:{self.name}"
+
+
+def _enter_folder(router: "ScreenRouter", folder_path: Optional[Sequence[str]] = None, **_):
+    if not router.page(DocumentHomePage).enter_folder_path(list(folder_path or DEFAULT_FOLDER_PATH)):
+        raise NavigationError(f"进入文件夹失败：{folder_path or DEFAULT_FOLDER_PATH}")
+
+
+def _intent_edge(route_name: str, target: Type[BasePage]) -> ScreenEdge:
+    def action(router: "ScreenRouter", folder_path: Optional[Sequence[str]] = None, **_):
+        route = DEEP_LINK_ROUTES[route_name]
+        DeepLinkLauncher(router.page(HomePage)).launch(route, folder_path or DEFAULT_FOLDER_PATH)
+    
+    return ScreenEdge(None, target, f"intent_{route_name}", action, 2.0, route=route_name)
+
+
+# 默认耗时为估计值（秒），运行中按实测值更新
+SCREEN_EDGES: List[ScreenEdge] = [
+    ScreenEdge(HomePage, DocumentHomePage, "click_cloud",
+               lambda router, **_: router.page(HomePage).click_cloud(), 3.0),
+    ScreenEdge(HomePage, DetailsPage, "long_press_cloud_success",
+               lambda router, **_: router.page(HomePage).long_press_cloud_success(), 4.0),
+    ScreenEdge(DocumentHomePage, HomePage, "click_return_button",
+               lambda router, **_: router.page(DocumentHomePage).click_return_button(), 3.0),
+    ScreenEdge(DocumentHomePage, SearchPage, "click_search_button",
+               lambda router, **_: router.page(DocumentHomePage).click_search_button(), 2.5),
+    ScreenEdge(DocumentHomePage, FilePage, "enter_folder_path", _enter_folder, 5.0),
+    ScreenEdge(FilePage, DocumentHomePage, "navigate_back",
+               lambda router, **_: router.page(FilePage).navigate_back(1), 3.0),
+    ScreenEdge(FilePage, SearchPage, "click_search_button",
+               lambda router, **_: router.page(FilePage).click_search_button(), 2.5),
+    # 搜索页返回到进入搜索前的界面，两条边共用同一操作，实际到达的界面以识别结果为准
+    ScreenEdge(SearchPage, DocumentHomePage, "click_search_return",
+               lambda router, **_: router.page(SearchPage).click_search_return(), 2.5),
+    ScreenEdge(SearchPage, FilePage, "click_search_return",
+               lambda router, **_: router.page(SearchPage).click_search_return(), 2.5),
+    ScreenEdge(SearchCopyPage, SearchPage, "click_copy_cancel_button",
+               lambda router, **_: router.page(SearchCopyPage).click_copy_cancel_button(), 2.0),
+    ScreenEdge(DetailsPage, HomePage, "click_close_button",
+               lambda router, **_: router.page(DetailsPage).click_close_button(), 2.0),
+    ScreenEdge(DetailsPage, AccountInformationPage, "navigate_to_account_information",
+               lambda router, **_: router.page(DetailsPage).navigate_to_account_information(), 3.0),
+    ScreenEdge(AccountInformationPage, HomePage, "click_return_button",
+               lambda router, **_: router.page(AccountInformationPage).click_return_button(), 3.0),
+    ScreenEdge(None, BookshelfPage, "switch_bookshelf_app",
+               lambda router, **_: router.app_switcher.switch_bookshelf_app(), 4.0),
+    # 切回网盘应用后停留在切换前的网盘界面，以识别结果为准
+    ScreenEdge(BookshelfPage, HomePage, "switch_hv_drive_app",
+               lambda router, **_: router.app_switcher.switch_hv_drive_app(), 4.0),
+] + [
+    # config.yaml 中已配置的 intent 入口：与界面路径一起参与最短路径计算
+    _intent_edge(route.name, route.screen) for route in DEEP_LINK_ROUTES.values() if route.screen is not None
+]
+
+
+class NavigationGraph:
+    """
+    界面导航图：节点为页面类，边为跳转操作，边权为实测耗时（指数移动平均，跨运行持久化）
+    多个工作进程共用耗时文件：各进程只记录本次的实测值，写入时在文件锁内应用到文件中的最新值
+    """
+    
+    def __init__(self, edges: Sequence[ScreenEdge] = SCREEN_EDGES, costs_path: Optional[str] = COSTS_PATH):
+        self.edges = list(edges)
+        self.costs_path = costs_path
+        # 尚未写入文件的实测耗时 {边名称: [耗时]}
+        self._pending: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        self.costs: Dict[str, float] = self._load_costs()
+    
+    def _load_costs(self) -> Dict[str, float]:
+        if not self.costs_path or not os.path.exists(self.costs_path):
+            return {}
+        try:
+            with open(self.costs_path, "r", encoding="utf-8") as file:
+                return {key: float(value) for key, value in json.load(file).items()}
+        except (OSError, ValueError) as e:
+            logger.error(f"导航耗时记录读取失败，使用默认值: {e}")
+            return {}
+    
+    @staticmethod
+    def _apply(costs: Dict[str, float], key: str, seconds: float):
+        previous = costs.get(key)
+        costs[key] = seconds if previous is None else previous + COST_ALPHA * (seconds - previous)
+    
+    def save(self):
+        """将本进程的实测耗时应用到文件中的最新值后写入（其他工作进程的记录不会被覆盖）"""
+        with self._lock:
+            if not self._pending or not self.costs_path:
+                return
+            try:
+                with exclusive_file_lock(f"{self.costs_path}.lock"):
+                    costs = self._load_costs()
+                    for key, samples in self._pending.items():
+                        for seconds in samples:
+                            self._apply(costs, key, seconds)
+                    fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(self.costs_path))
+                    try:
+                        with os.fdopen(fd, "w", encoding="utf-8") as file:
+                            json.dump(costs, file, ensure_ascii=False, indent=2)
+                        os.replace(temp_path, self.costs_path)
+                    except BaseException:
+                        if os.path.exists(temp_path):
+                            os.remove(temp_path)
+                        raise
+            except OSError as e:
+                # 写入失败不影响导航，保留本次记录下次再写
+                logger.error(f"导航耗时记录写入失败: {e}")
+                return
+            self.costs = costs
+            self._pending = {}
+    
+    def cost(self, edge: ScreenEdge) -> float:
+        return self.costs.get(edge.key, edge.default_cost)
+    
+    def record_cost(self, edge: ScreenEdge, seconds: float):
+        """
+        记录一次实测耗时
+        :param edge: 导航边
+        :param seconds: 操作加界面稳定的耗时（秒）
+        """
+        self.record(edge.key, seconds)
+    
+    def record(self, key: str, seconds: float):
+        """按名称记录实测耗时（图外的操作，如打开传输列表的 intent 入口与界面路径）"""
+        with self._lock:
+            self._apply(self.costs, key, seconds)
+            self._pending.setdefault(key, []).append(seconds)
+    
+    @property
+    def screens(self) -> Set[Type[BasePage]]:
+        return {edge.target for edge in self.edges} | {edge.source for edge in self.edges if edge.source}
+    
+    def outgoing(self, source: Type[BasePage], include_routes: bool = True) -> List[ScreenEdge]:
+        return [edge for edge in self.edges
+                if (edge.source is source or (edge.source is None and edge.target is not source))
+                and (edge.route is None or (include_routes and get_route(edge.route) is not None))]
+    
+    def shortest_path(self, source: Type[BasePage], target: Type[BasePage],
+                      leave: bool = False, include_routes: bool = True) -> Optional[List[ScreenEdge]]:
+        """
+        按边权计算最短路径（Dijkstra）
+        :param source: 当前界面
+        :param target: 目标界面
+        :param leave: 已在目标界面但状态不符（如文件夹不同）时为 True，路径至少包含一条边
+        :param include_routes: 是否使用 intent 入口
+        :return: 导航边列表；不可达返回 None
+        """
+        if source is target and not leave:
+            return []
+        tie = count()
+        best: Dict[Type[BasePage], float] = {}
+        heap = []
+        if leave:
+            for edge in self.outgoing(source, include_routes):
+                heapq.heappush(heap, (self.cost(edge), next(tie), edge.target, [edge]))
+        else:
+            heap.append((0.0, next(tie), source, []))
+        while heap:
+            distance, _, screen, path = heapq.heappop(heap)
+            if screen is target:
+                return path
+            if screen in best and best[screen] <= distance:
+                continue
+            best[screen] = distance
+            for edge in self.outgoing(screen, include_routes):
+                heapq.heappush(heap, (distance + self.cost(edge), next(tie), edge.target, path + [edge]))
+        return None
+
+
+_graph: Optional[NavigationGraph] = None
+_graph_lock = threading.Lock()
+
+
+def get_navigation_graph() -> NavigationGraph:
+    """获取进程内共享的导航图（实测耗时在所有设备间共享）"""
+    global _graph
+    with _graph_lock:
+        if _graph is None:
+            _graph = NavigationGraph()
+        return _graph
+
+
+class ScreenRouter:
+    """
+    界面路由：识别当前界面，沿最短路径执行跳转，每一步后重新识别并重新规划
+    （返回类操作的实际落点取决于来路，按识别结果继续即可）
+    """
+    
+    def __init__(self, driver, graph: Optional[NavigationGraph] = None):
+        self.driver = driver
+        self.graph = graph or get_navigation_graph()
+        self._pages: Dict[Type[BasePage], BasePage] = {}
+        self._app_switcher: Optional[AppSwitcher] = None
+    
+    def page(self, screen: Type[BasePage]) -> BasePage:
+        """获取页面实例（每个页面类只创建一次）"""
+        if screen not in self._pages:
+            self._pages[screen] = screen(self.driver)
+        return self._pages[screen]
+    
+    @property
+    def app_switcher(self) -> AppSwitcher:
+        if self._app_switcher is None:
+            self._app_switcher = AppSwitcher(self.driver)
+        return self._app_switcher
+    
+    def detect(self, refresh: bool = True) -> Optional[Type[BasePage]]:
+        """
+        识别当前界面（单份界面快照分类，弹窗优先）
+        :param refresh: 是否重新抓取快照；跳转后已等待界面稳定时可直接复用稳定快照
+        :return: 页面类，无法识别返回 None
+        """
+        screen, dialog = self.page(HomePage).classify_screen(refresh)
+        # 图中没有的界面或弹窗（如排序弹窗）视为无法识别，由调用方返回一步
+        current = dialog or screen
+        return current if current in self.graph.screens else None
+    
+    def _at_destination(self, screen: Type[BasePage], folder_path: Optional[Sequence[str]] = None, **_) -> bool:
+        """目标界面带状态时（文件夹页的所在文件夹）额外校验"""
+        if screen is not FilePage or not folder_path:
+            return True
+        return self.page(DocumentHomePage).get_folder_detail_page_name() == folder_path[-1]
+    
+    def _traverse(self, edge: ScreenEdge, params: dict) -> Optional[Type[BasePage]]:
+        page = self.page(edge.source or HomePage)
+        token = page.begin_settle(check_activity=True)
+        start = time.monotonic()
+        try:
+            edge.action(self, **params)
+        except NavigationError:
+            raise
+        except Exception as e:
+            logger.error(f"导航操作失败 {edge.key}: {e}")
+            raise NavigationError(f"导航操作失败 {edge.key}: {e}") from e
+        page.wait_for_settle(token, timeout=STEP_SETTLE_TIMEOUT, description=f"导航 {edge.key}")
+        elapsed = time.monotonic() - start
+        arrived = self.detect(refresh=False)
+        if arrived is edge.target:
+            self.graph.record_cost(edge, elapsed)
+        elif edge.route:
+            mark_route_failed(edge.route, f"到达 {arrived.__name__ if arrived else '未知界面'}")
+        logger.info(f"导航 {edge.key}: 到达 {arrived.__name__ if arrived else '未知界面'}，耗时 {elapsed:.2f}s")
+        return arrived
+    
+    def _log_route_saving(self, edge: ScreenEdge, source: Type[BasePage]):
+        """intent 入口与其代替的界面路径耗时对比"""
+        ui_path = self.graph.shortest_path(source, edge.target, include_routes=False)
+        if ui_path:
+            ui_cost = sum(self.graph.cost(ui_edge) for ui_edge in ui_path)
+            logger.info(f"intent 入口 {edge.route}: {self.graph.cost(edge):.2f}s，"
+                        f"界面路径 {' -> '.join(ui_edge.name for ui_edge in ui_path)}: {ui_cost:.2f}s")
+    
+    def go_to(self, target: Type[BasePage], **params) -> BasePage:
+        """
+        导航到目标界面
+        :param target: 目标页面类
+        :param params: 跳转参数（如 folder_path=["一级", "二级"]）
+        :return: 目标页面实例
+        """
+        current = self.detect()
+        try:
+            for _ in range(MAX_STEPS):
+                if current is None:
+                    # 无法识别的界面（传输列表、临时弹窗等）：返回一步后重新识别
+                    logger.info("当前界面无法识别，返回上一级")
+                    self.page(HomePage).navigate_back(1)
+                    current = self.detect()
+                    continue
+                arrived = current is target and self._at_destination(target, **params)
+                if arrived:
+                    logger.info(f"已位于 {target.__name__}")
+                    return self.page(target)
+                path = self.graph.shortest_path(current, target, leave=current is target)
+                if path is None:
+                    raise NavigationError(f"{current.__name__} 无法到达 {target.__name__}")
+                logger.debug(f"导航路径: {' -> '.join(edge.key for edge in path)}")
+                source, current = current, self._traverse(path[0], params)
+                if path[0].route and current is target:
+                    self._log_route_saving(path[0], source)
+        finally:
+            self.graph.save()
+        raise NavigationError(f"{MAX_STEPS} 步内未到达 {target.__name__}")
@@ -2,18 +2,14 @@ import logging
 
 import pytest
 
-from pages.nut_cloud_page.document_home_page import DocumentHomePage
 from pages.nut_cloud_page.search_page import SearchPage
 
 logger = logging.getLogger(__name__)
 
 
 @pytest.fixture(scope="package")
-def enter_search_flow(app_driver, enter_folder_page_parametrized):
-    document_home_page = DocumentHomePage(app_driver)
-    search_page = SearchPage(document_home_page.driver)
-    document_home_page.click_search_button()
-    yield search_page
+def enter_search_flow(app_driver, enter_folder_page_parametrized, screen_router):
+    yield screen_router.go_to(SearchPage)
 
 
 @pytest.fixture(scope="function")
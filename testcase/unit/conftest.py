@@ -0,0 +1,12 @@
+import pytest
+
+
+# 单元测试不连接设备：覆盖根目录 conftest 中的设备日志采集与录屏自动 fixture
+@pytest.fixture(scope="session", autouse=True)
+def logcat_collector():
+    yield None
+
+
+@pytest.fixture(scope="function", autouse=True)
+def screen_recording():
+    yield None
@@ -0,0 +1,133 @@
+import re
+import socket
+import threading
+
+import pytest
+
+from utils.adb_transport import AdbError, AdbTransport
+
+SERIAL = "emulator-5554"
+MARKER_PATTERN = re.compile(r'echo (__ADB_RC_\w+__)\$__rc')
+
+
+class FakeAdbServer:
+    """
+    最小的 adb server：按协议应答 host:devices、host:transport:*、shell:*
+    shell 输出模拟设备端终端（CRLF 换行），按命令返回预设的输出与退出码
+    """
+    
+    def __init__(self, devices="", shell_results=None, failures=None):
+        self.devices = devices
+        self.shell_results = shell_results or {}
+        self.failures = failures or {}
+        self.requests = []
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.bind(("127.0.0.1", 0))
+        self._server.listen()
+        self.port = self._server.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+    
+    def close(self):
+        self._server.close()
+    
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            with conn:
+                self._handle(conn)
+    
+    @staticmethod
+    def _recv_exact(conn, size):
+        data = b""
+        while len(data) < size:
+            chunk = conn.recv(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+    
+    @staticmethod
+    def _frame(payload: str) -> bytes:
+        data = payload.encode("utf-8")
+        return f"{len(data):04x}".encode("ascii") + data
+    
+    def _handle(self, conn):
+        while True:
+            header = self._recv_exact(conn, 4)
+            if header is None:
+                return
+            request = self._recv_exact(conn, int(header, 16)).decode("utf-8")
+            self.requests.append(request)
+            if request in self.failures:
+                conn.sendall(b"FAIL" + self._frame(self.failures[request]))
+                return
+            if request == "host:devices":
+                conn.sendall(b"OKAY" + self._frame(self.devices))
+                return
+            if request.startswith("host:transport"):
+                conn.sendall(b"OKAY")
+                continue
+            if request.startswith("shell:"):
+                conn.sendall(b"OKAY" + self._shell_output(request[len("shell:"):]).encode("utf-8"))
+                return
+            conn.sendall(b"FAIL" + self._frame(f"unknown request: {request}"))
+            return
+    
+    def _shell_output(self, script: str) -> str:
+        marker = MARKER_PATTERN.search(script).group(1)
+        # run_batch 生成的脚本为 "命令\n__rc=$?; echo; echo 标记$__rc" 交替排列
+        commands = script.split("\n")[0::2]
+        output = ""
+        for command in commands:
+            text, exit_code = self.shell_results.get(command, ("", 0))
+            output += (f"{text}\r\n" if text else "") + f"\r\n{marker}{exit_code}\r\n"
+        return output
+
+
+@pytest.fixture
+def fake_server():
+    servers = []
+    
+    def start(**kwargs):
+        server = FakeAdbServer(**kwargs)
+        servers.append(server)
+        return server, AdbTransport(SERIAL, port=server.port, timeout=5)
+    
+    yield start
+    for server in servers:
+        server.close()
+
+
+def test_run_batch_parses_output_and_exit_codes(fake_server):
+    server, transport = fake_server(shell_results={
+        "ls /sdcard": ("Download\r\nMusic", 0),
+        "cat /missing": ("cat: /missing: No such file or directory", 1),
+        "true": ("", 0),
+    })
+    results = transport.run_batch(["ls /sdcard", "cat /missing", "true"])
+    assert [result.exit_code for result in results] == [0, 1, 0]
+    assert results[0].output == "Download\nMusic"
+    assert results[1].output == "cat: /missing: No such file or directory"
+    assert results[2].output == ""
+    assert server.requests[0] == f"host:transport:{SERIAL}"
+    assert server.requests[1].startswith("shell:ls /sdcard\n")
+
+
+def test_shell_raises_on_nonzero_exit_code(fake_server):
+    _, transport = fake_server(shell_results={"false": ("", 1)})
+    with pytest.raises(AdbError, match="退出码 1"):
+        transport.shell("false")
+
+
+def test_fail_response_raises_with_server_message(fake_server):
+    _, transport = fake_server(failures={f"host:transport:{SERIAL}": f"device '{SERIAL}' not found"})
+    with pytest.raises(AdbError, match="not found"):
+        transport.run("true")
+
+
+def test_devices_lists_only_online_devices(fake_server):
+    _, transport = fake_server(devices=f"{SERIAL}\tdevice\nR58M123\toffline\n192.168.1.5:5555\tdevice\n")
+    assert transport.devices() == [SERIAL, "192.168.1.5:5555"]
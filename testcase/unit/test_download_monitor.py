@@ -0,0 +1,61 @@
+import pytest
+
+from utils.download_monitor import STATE_DONE, STATE_DOWNLOADING, STATE_RETRY, STATE_UNKNOWN, DownloadMonitor, \
+    DownloadSample, FileTimeline, parse_download_status
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("下载中43%", (STATE_DOWNLOADING, 43)),
+    ("下载中 100%", (STATE_DOWNLOADING, 100)),
+    ("下载中", (STATE_DOWNLOADING, None)),
+    ("重试", (STATE_RETRY, None)),
+    ("打开", (STATE_DONE, 100)),
+    ("等待中", (STATE_UNKNOWN, None)),
+    ("", (STATE_UNKNOWN, None)),
+    (None, (STATE_UNKNOWN, None)),
+])
+def test_parse_download_status(text, expected):
+    assert parse_download_status(text) == expected
+
+
+def test_timeline_records_only_changes_and_estimates_eta():
+    timeline = FileTimeline("a.pdf")
+    assert timeline.add(DownloadSample(0.0, STATE_DOWNLOADING, 10, "下载中10%"))
+    assert not timeline.add(DownloadSample(1.0, STATE_DOWNLOADING, 10, "下载中10%"))
+    assert timeline.add(DownloadSample(4.0, STATE_DOWNLOADING, 30, "下载中30%"))
+    assert timeline.rate() == pytest.approx(5.0)
+    assert timeline.eta() == pytest.approx(14.0)
+    assert not timeline.terminal
+    timeline.add(DownloadSample(6.0, STATE_DONE, 100, "打开"))
+    assert timeline.terminal and timeline.eta() == 0.0
+    assert timeline.progress_value() == 100
+
+
+def test_retry_is_terminal():
+    timeline = FileTimeline("a.pdf")
+    timeline.add(DownloadSample(0.0, STATE_RETRY, None, "重试"))
+    assert timeline.terminal
+    assert timeline.progress_value() == STATE_RETRY
+
+
+def test_sample_skips_files_missing_from_read():
+    reads = iter([
+        {"a.pdf": "下载中10%", "b.pdf": "下载中50%"},
+        # b.pdf 不在本次读取到的页中：不应记为未知状态
+        {"a.pdf": "下载中20%"},
+        {"a.pdf": "打开", "b.pdf": "打开"},
+    ])
+    monitor = DownloadMonitor(lambda: next(reads), ["a.pdf", "b.pdf"])
+    for _ in range(3):
+        monitor.sample()
+    states = [sample.state for sample in monitor.timelines["b.pdf"].samples]
+    assert states == [STATE_DOWNLOADING, STATE_DONE]
+    assert monitor.all_terminal
+    assert monitor.progress_dict() == {"a.pdf": 100, "b.pdf": 100}
+
+
+def test_next_interval_backs_off_without_changes():
+    monitor = DownloadMonitor(dict, ["a.pdf"], min_interval=0.5, max_interval=5.0)
+    assert monitor.next_interval(True, 4.0) == 0.5
+    assert monitor.next_interval(False, 1.0) == 1.5
+    assert monitor.next_interval(False, 4.0) == 5.0
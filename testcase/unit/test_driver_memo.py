@@ -0,0 +1,65 @@
+from utils import driver_memo
+from utils.driver_memo import SESSION_SCOPE, DriverMemo
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+    
+    def __call__(self):
+        return self.now
+
+
+def counter():
+    calls = []
+    
+    def compute():
+        calls.append(len(calls))
+        return len(calls)
+    return calls, compute
+
+
+def test_screen_cache_cleared_by_new_epoch():
+    memo = DriverMemo()
+    calls, compute = counter()
+    assert memo.get("page_number", compute) == 1
+    assert memo.get("page_number", compute) == 1
+    memo.bump_epoch()
+    assert memo.get("page_number", compute) == 2
+    assert memo.stats() == {"page_number": {"hits": 1, "misses": 2}}
+
+
+def test_max_age_expires_entry_within_epoch(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(driver_memo.time, "monotonic", clock)
+    memo = DriverMemo()
+    calls, compute = counter()
+    memo.put(("page_number", "page_tv"), (1, 3))
+    clock.now += 2.0
+    assert memo.get(("page_number", "page_tv"), compute, max_age=3.0) == (1, 3)
+    clock.now += 2.0
+    # 写入后超过 max_age：重新查询
+    assert memo.get(("page_number", "page_tv"), compute, max_age=3.0) == 1
+    # 不指定 max_age 时同一纪元内一直复用
+    clock.now += 60.0
+    assert memo.get(("page_number", "page_tv"), compute) == 1
+    assert len(calls) == 1
+
+
+def test_session_cache_survives_epoch():
+    memo = DriverMemo()
+    calls, compute = counter()
+    memo.get("window_size", compute, SESSION_SCOPE)
+    memo.bump_epoch()
+    assert memo.get("window_size", compute, SESSION_SCOPE) == 1
+    assert len(calls) == 1
+
+
+def test_refresh_requeries_and_updates_cache():
+    memo = DriverMemo()
+    calls, compute = counter()
+    memo.get("current_activity", compute)
+    assert memo.get("current_activity", compute, refresh=True) == 2
+    # 刷新后的值供同一纪元内的其他查询复用
+    assert memo.get("current_activity", compute) == 2
+    assert len(calls) == 2
@@ -0,0 +1,60 @@
+import pytest
+
+from utils.duration_history import MIN_SPREAD, DurationHistory, robust_score
+
+
+def test_robust_score_ignores_single_outlier():
+    median, score = robust_score(12.0, [10.0, 10.5, 9.5, 10.0, 60.0])
+    assert median == 10.0
+    # MAD = 0.5，离散度 = 1.4826 * 0.5
+    assert score == pytest.approx(2.0 / (1.4826 * 0.5))
+
+
+def test_robust_score_uses_min_spread_for_constant_baseline():
+    median, score = robust_score(10.1, [10.0] * 5)
+    assert median == 10.0
+    assert score == pytest.approx(0.1 / MIN_SPREAD)
+
+
+@pytest.fixture
+def history(tmp_path):
+    return DurationHistory(str(tmp_path / "history.sqlite3"))
+
+
+def add_runs(history, durations, runs=3):
+    for run in range(runs):
+        for node_id, duration in durations.items():
+            history.add(f"run{run}", node_id, "hw1", "1.0", "total", duration)
+    history.flush()
+
+
+def test_balanced_shards_spreads_expected_durations(history):
+    add_runs(history, {"t::a": 100.0, "t::b": 60.0, "t::c": 50.0, "t::d": 40.0, "t::e": 10.0})
+    shards = history.balanced_shards(["t::a", "t::b", "t::c", "t::d", "t::e"], 2)
+    # 最长处理时间优先: a -> 0, b -> 1, c -> 1, d -> 0, e -> 1
+    assert shards == [["t::a", "t::d"], ["t::b", "t::c", "t::e"]]
+
+
+def test_balanced_shards_weights_new_tests_by_known_median(history):
+    add_runs(history, {"t::slow": 90.0, "t::fast": 10.0})
+    node_ids = ["t::new", "t::fast", "t::slow"]
+    shards = history.balanced_shards(node_ids, 2)
+    # 新用例按已知耗时中位数 50s 计: slow -> 0, new -> 1, fast -> 1；分片内保持输入顺序
+    assert shards == [["t::slow"], ["t::new", "t::fast"]]
+
+
+def test_balanced_shards_without_history_uses_default_duration(history):
+    assert history.expected_durations() == {}
+    shards = history.balanced_shards(["t::a", "t::b", "t::c"], 3)
+    assert shards == [["t::a"], ["t::b"], ["t::c"]]
+
+
+def test_expected_durations_only_count_passed_totals(history):
+    history.add("run0", "t::a", "hw1", "1.0", "total", 10.0)
+    history.add("run1", "t::a", "hw1", "1.0", "total", 20.0)
+    history.add("run2", "t::a", "hw1", "1.0", "total", 90.0, outcome="failed")
+    history.add("run2", "t::a", "hw1", "1.0", "call", 80.0)
+    history.add("run3", "t::a", "hw2", "1.0", "total", 40.0)
+    history.flush()
+    assert history.expected_durations("hw1") == {"t::a": 15.0}
+    assert history.expected_durations() == {"t::a": 20.0}
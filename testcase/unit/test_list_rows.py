@@ -0,0 +1,65 @@
+import pytest
+
+# ListRowIndex 依赖 UiSnapshot（使用 appium 的定位器类型），未安装 appium 时跳过
+pytest.importorskip("appium")
+
+from appium.webdriver.common.appiumby import AppiumBy  # noqa: E402
+
+from utils.list_rows import ListRowIndex  # noqa: E402
+from utils.ui_snapshot import UiSnapshot  # noqa: E402
+
+ROW = (AppiumBy.ID, "row")
+NAME = (AppiumBy.ID, "name")
+STATUS = (AppiumBy.ID, "status")
+CHECK = (AppiumBy.ID, "check")
+
+
+def row(name=None, status=None, checked=None, displayed="true"):
+    children = ""
+    if name is not None:
+        children += f'<android.widget.TextView resource-id="com.demo:id/name" text=" {name} "/>'
+    if status is not None:
+        children += f'<android.widget.TextView resource-id="com.demo:id/status" text="{status}"/>'
+    if checked is not None:
+        children += f'<android.widget.CheckBox resource-id="com.demo:id/check" checked="{checked}"/>'
+    return (f'<android.widget.LinearLayout resource-id="com.demo:id/row" displayed="{displayed}" '
+            f'bounds="[0,0][1080,200]">{children}</android.widget.LinearLayout>')
+
+
+def build_index(*rows, **kwargs):
+    snapshot = UiSnapshot(f'<hierarchy><android.widget.FrameLayout>{"".join(rows)}</android.widget.FrameLayout>'
+                          f'</hierarchy>')
+    return ListRowIndex.from_nodes(snapshot.find_all(ROW), ROW, NAME, **kwargs)
+
+
+def test_rows_are_indexed_by_stripped_name():
+    index = build_index(row("a.pdf"), row("b.pdf"))
+    assert index.names == ["a.pdf", "b.pdf"]
+    assert "b.pdf" in index and " b.pdf " in index
+    assert index.get("a.pdf ").index == 0
+    assert index.get("c.pdf") is None
+    assert len(index) == 2
+
+
+def test_hidden_rows_and_rows_without_name_are_skipped():
+    index = build_index(row("a.pdf"), row("hidden.pdf", displayed="false"), row(status="打开"), row("b.pdf"))
+    assert index.names == ["a.pdf", "b.pdf"]
+    # 行号为在列表中的位置，跳过的行不重新编号
+    assert [item.index for item in index] == [0, 3]
+
+
+def test_duplicate_names_keep_first_row():
+    index = build_index(row("a.pdf", status="下载中10%"), row("a.pdf", status="打开"), info_locator=STATUS)
+    assert len(index) == 2
+    assert index.get("a.pdf").info == "下载中10%"
+
+
+def test_info_and_checkbox_are_read_from_snapshot():
+    index = build_index(row("a.pdf", status="打开", checked="true"), row("b.pdf"),
+                        info_locator=STATUS, checkbox_locator=CHECK)
+    first, second = index.get("a.pdf"), index.get("b.pdf")
+    assert (first.info, first.checked) == ("打开", True)
+    assert (second.info, second.checked) == (None, None)
+    assert first.attribute(STATUS, "text") == "打开"
+    assert first.child(ROW) is first.node
+    assert first.center == (540, 100)
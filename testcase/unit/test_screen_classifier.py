@@ -0,0 +1,75 @@
+from typing import FrozenSet, NamedTuple, Optional
+
+from utils.screen_classifier import ScreenClassifier, ScreenSignature
+
+PACKAGE = "com.demo"
+
+
+class Snapshot(NamedTuple):
+    """分类只用到快照的包名与资源 ID 集合"""
+    package: Optional[str]
+    resource_ids: FrozenSet[str]
+
+
+def ids(*names):
+    return frozenset(f"{PACKAGE}:id/{name}" for name in names)
+
+
+def signature(name, *resource_names, package=PACKAGE):
+    resource_ids = frozenset(f"{package}:id/{resource_name}" for resource_name in resource_names)
+    return ScreenSignature(name, package, resource_ids, {})
+
+
+def classifier(**kwargs):
+    signatures = {
+        "home_page": signature("home_page", "title", "file_grid", "page_tv"),
+        "search_page": signature("search_page", "title", "search_et", "page_tv"),
+        "details_page": signature("details_page", "title", "details_name"),
+        "other_app_page": signature("other_app_page", "file_grid", package="com.other"),
+    }
+    return ScreenClassifier(signatures, dialogs=frozenset({"details_page"}), **kwargs)
+
+
+def test_shared_ids_are_weighted_down():
+    screen_classifier = classifier()
+    # title 出现在 3 个文件中，page_tv 出现在 2 个文件中，file_grid 在两个包中各出现一次
+    assert screen_classifier.weights[f"{PACKAGE}:id/title"] == 1 / 3
+    assert screen_classifier.weights[f"{PACKAGE}:id/page_tv"] == 1 / 2
+    assert screen_classifier.weights[f"{PACKAGE}:id/file_grid"] == 1.0
+
+
+def test_classifies_screen_by_unique_ids():
+    match = classifier().classify(Snapshot(PACKAGE, ids("title", "search_et", "page_tv", "list_item")))
+    assert (match.screen, match.dialog) == ("search_page", None)
+    # 未出现在任何定位器文件中的资源 ID 不参与指纹
+    assert match.ids == ids("title", "search_et", "page_tv")
+
+
+def test_dialog_requires_a_unique_id():
+    screen_classifier = classifier()
+    with_dialog = screen_classifier.classify(Snapshot(PACKAGE, ids("title", "file_grid", "details_name")))
+    assert (with_dialog.screen, with_dialog.dialog) == ("home_page", "details_page")
+    # 只有共用的标题时不判定为弹窗
+    without_dialog = screen_classifier.classify(Snapshot(PACKAGE, ids("title", "file_grid", "page_tv")))
+    assert (without_dialog.screen, without_dialog.dialog) == ("home_page", None)
+
+
+def test_below_min_score_is_unknown():
+    match = classifier().classify(Snapshot(PACKAGE, ids("title")))
+    assert (match.screen, match.dialog) == (None, None)
+
+
+def test_other_package_signatures_are_ignored():
+    match = classifier().classify(Snapshot("com.other", frozenset({"com.other:id/file_grid"})))
+    assert match.screen == "other_app_page"
+
+
+def test_same_fingerprint_uses_cache():
+    screen_classifier = classifier(cache_size=1)
+    first = screen_classifier.classify(Snapshot(PACKAGE, ids("title", "file_grid")))
+    again = screen_classifier.classify(Snapshot(PACKAGE, ids("file_grid", "title", "unknown_id")))
+    assert again is first
+    assert (screen_classifier.hits, screen_classifier.misses) == (1, 1)
+    screen_classifier.classify(Snapshot(PACKAGE, ids("search_et")))
+    screen_classifier.classify(Snapshot(PACKAGE, ids("title", "file_grid")))
+    assert screen_classifier.misses == 3
@@ -0,0 +1,107 @@
+import pytest
+
+# UiSnapshot 使用 appium 的定位器类型，未安装 appium 时跳过
+pytest.importorskip("appium")
+
+from appium.webdriver.common.appiumby import AppiumBy  # noqa: E402
+
+from utils.ui_snapshot import SnapshotUnsupportedLocator, UiSnapshot  # noqa: E402
+
+PAGE_SOURCE = """<?xml version="1.0" encoding="UTF-8"?>
+<hierarchy rotation="0">
+  <android.widget.FrameLayout class="android.widget.FrameLayout" package="com.demo" bounds="[0,0][1080,1920]">
+    <android.widget.TextView class="android.widget.TextView" resource-id="com.demo:id/page_tv" text="1/3"
+        bounds="[0,1800][200,1900]"/>
+    <android.widget.LinearLayout class="android.widget.LinearLayout" resource-id="com.demo:id/row"
+        bounds="[0,0][1080,200]">
+      <android.widget.TextView class="android.widget.TextView" resource-id="com.demo:id/name" text="报告.pdf"
+          bounds="[100,50][500,150]"/>
+      <android.widget.CheckBox class="android.widget.CheckBox" resource-id="com.demo:id/check" checked="true"
+          bounds="[900,50][1000,150]"/>
+    </android.widget.LinearLayout>
+    <android.widget.LinearLayout class="android.widget.LinearLayout" resource-id="com.demo:id/row"
+        bounds="[0,200][1080,400]">
+      <android.widget.TextView class="android.widget.TextView" resource-id="com.demo:id/name" text="报告副本.pdf"
+          bounds="[100,250][500,350]"/>
+      <android.widget.CheckBox class="android.widget.CheckBox" resource-id="com.demo:id/check" checked="false"
+          bounds="[900,250][1000,350]"/>
+    </android.widget.LinearLayout>
+  </android.widget.FrameLayout>
+</hierarchy>
+"""
+
+
+@pytest.fixture
+def snapshot():
+    return UiSnapshot(PAGE_SOURCE)
+
+
+def texts(nodes):
+    return [node.text for node in nodes]
+
+
+def test_id_without_package_matches_suffix(snapshot):
+    assert texts(snapshot.find_all((AppiumBy.ID, "name"))) == ["报告.pdf", "报告副本.pdf"]
+    assert texts(snapshot.find_all((AppiumBy.ID, "com.demo:id/name"))) == ["报告.pdf", "报告副本.pdf"]
+    assert snapshot.find((AppiumBy.ID, "missing")) is None
+
+
+def test_subtree_search_excludes_root(snapshot):
+    rows = snapshot.find_all((AppiumBy.ID, "row"))
+    assert texts(rows[1].find_all((AppiumBy.ID, "name"))) == ["报告副本.pdf"]
+    assert rows[0].find((AppiumBy.ID, "row")) is None
+    assert rows[0].find((AppiumBy.ID, "check")).checked
+    assert rows[0].find((AppiumBy.ID, "name")).parent.resource_id == "com.demo:id/row"
+
+
+def test_node_geometry_and_attributes(snapshot):
+    name = snapshot.find((AppiumBy.ID, "name"))
+    assert name.bounds == (100, 50, 500, 150)
+    assert name.center == (300, 100)
+    assert name.get_attribute("resourceId") == "com.demo:id/name"
+    assert name.displayed and name.enabled
+    assert snapshot.package == "com.demo"
+
+
+@pytest.mark.parametrize("xpath, expected", [
+    ("//android.widget.TextView[@text='报告.pdf']", ["报告.pdf"]),
+    ("//*[contains(@text, '副本')]", ["报告副本.pdf"]),
+    ("//android.widget.TextView[@resource-id='com.demo:id/name' and contains(@text, '.pdf')]",
+     ["报告.pdf", "报告副本.pdf"]),
+    ("//android.widget.TextView[@resource-id='com.demo:id/name'][contains(@text, '副本')]", ["报告副本.pdf"]),
+    ("(//android.widget.TextView[@resource-id='com.demo:id/name'])[2]", ["报告副本.pdf"]),
+    ("(//android.widget.TextView[@resource-id='com.demo:id/name'])[3]", []),
+    ("//android.widget.TextView[@text=\"1/3\"]", ["1/3"]),
+])
+def test_simple_xpath_subset(snapshot, xpath, expected):
+    assert texts(snapshot._find_by_simple_xpath(xpath, None)) == expected
+
+
+@pytest.mark.parametrize("xpath", [
+    "//android.widget.LinearLayout/android.widget.TextView",
+    "//*[starts-with(@text, '报告')]",
+    "//*[@text='a' or @text='b']",
+])
+def test_simple_xpath_rejects_unsupported_expressions(snapshot, xpath):
+    with pytest.raises(SnapshotUnsupportedLocator):
+        snapshot._find_by_simple_xpath(xpath, None)
+
+
+def test_simple_xpath_within_subtree(snapshot):
+    row = snapshot.find_all((AppiumBy.ID, "row"))[1]
+    nodes = snapshot._find_by_simple_xpath("//*[@resource-id='com.demo:id/check']", row)
+    assert [node.checked for node in nodes] == [False]
+
+
+def test_ui_selector_text_locators(snapshot):
+    by_text = (AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().text("报告.pdf")')
+    assert texts(snapshot.find_all(by_text)) == ["报告.pdf"]
+    assert texts(snapshot.find_all(
+        (AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().textContains("报告").instance(1)'))) == ["报告副本.pdf"]
+    with pytest.raises(SnapshotUnsupportedLocator):
+        snapshot.find_all((AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().description("x")'))
+
+
+def test_content_hash_tracks_visible_changes(snapshot):
+    assert UiSnapshot(PAGE_SOURCE).content_hash() == snapshot.content_hash()
+    assert UiSnapshot(PAGE_SOURCE.replace("1/3", "2/3")).content_hash() != snapshot.content_hash()
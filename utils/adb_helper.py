@@ -2,6 +2,8 @@ import logging
 import subprocess
 from typing import Optional, List
 
+from utils.adb_transport import AdbConnectionError, get_transport
+
 logger = logging.getLogger(__name__)
 
 
@@ -20,7 +22,16 @@ class ADBHelper:
         return base_cmd
     
     def execute_command(self, command: List[str], timeout: int = 30) -> str:
-        """执行ADB命令"""
+        """执行ADB命令（shell 命令直接发送给 adb server，其余命令使用 adb 子进程）"""
+        if command and command[0] == "shell":
+            try:
+                # 与 adb 客户端一致：shell 之后的参数以空格拼接后交给设备端 sh 执行
+                return get_transport(self.device_id).shell(" ".join(command[1:]), timeout=timeout)
+            except AdbConnectionError as e:
+                logger.warning(f"adb server 连接失败，改用 adb 子进程: {e}")
+            except Exception as e:
+                logger.error(f"命令执行失败: {e}")
+                raise
         try:
             full_cmd = self._build_adb_command(command)
             logger.debug(f"执行命令: {' '.join(full_cmd)}")
@@ -0,0 +1,281 @@
+import logging
+import os
+import socket
+import subprocess
+import threading
+import time
+import uuid
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from utils.command_metrics import get_round_trip_counter
+from utils.trace_recorder import get_trace_recorder
+
+logger = logging.getLogger(__name__)
+
+# adb server 地址（与 adb 客户端一致，支持 ANDROID_ADB_SERVER_PORT 环境变量）
+ADB_SERVER_HOST = os.environ.get("ANDROID_ADB_SERVER_HOST", "127.0.0.1")
+ADB_SERVER_PORT = int(os.environ.get("ANDROID_ADB_SERVER_PORT", 5037))
+# 单条 shell 命令的默认超时（秒）
+DEFAULT_SHELL_TIMEOUT = 30
+# 同一设备允许的最大并发连接数
+MAX_CONNECTIONS_PER_DEVICE = 4
+# 连接失败时的重试次数
+CONNECT_RETRIES = 2
+
+
+class AdbError(RuntimeError):
+    """adb 命令执行失败"""
+
+
+class AdbConnectionError(AdbError):
+    """无法连接 adb server（调用方可回退为 adb 子进程）"""
+
+
+class AdbResult(NamedTuple):
+    """单条 shell 命令的执行结果"""
+    command: str
+    output: str
+    exit_code: int
+
+
+class AdbTransport:
+    """
+    直接与 adb server 通信的传输层：不再为每条命令启动 adb 子进程
+    协议: 4位十六进制长度 + 请求 -> OKAY / FAIL + 4位十六进制长度 + 错误信息
+    每条命令（或一批命令）使用一个到本机 adb server 的短连接，
+    退出码通过命令末尾追加的标记行获取
+    """
+    
+    def __init__(self, serial: Optional[str] = None, host: str = ADB_SERVER_HOST, port: int = ADB_SERVER_PORT,
+                 timeout: float = DEFAULT_SHELL_TIMEOUT, max_connections: int = MAX_CONNECTIONS_PER_DEVICE):
+        self.serial = serial
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._server_started = False
+    
+    def __repr__(self):
+        return f"AdbTransport({self.serial or 'any'}@{self.host}:{self.port})"
+    
+    # ---------- 协议层 ----------
+    
+    @staticmethod
+    def _send(sock: socket.socket, payload: str):
+        data = payload.encode("utf-8")
+        sock.sendall(f"{len(data):04x}".encode("ascii") + data)
+    
+    @staticmethod
+    def _recv_exact(sock: socket.socket, size: int) -> bytes:
+        chunks = []
+        while size:
+            chunk = sock.recv(size)
+            if not chunk:
+                raise AdbConnectionError("adb server 意外关闭连接")
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+    
+    def _read_status(self, sock: socket.socket, request: str):
+        status = self._recv_exact(sock, 4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            length = int(self._recv_exact(sock, 4), 16)
+            message = self._recv_exact(sock, length).decode("utf-8", errors="replace")
+            raise AdbError(f"adb 请求失败 [{request}]: {message}")
+        raise AdbError(f"adb 协议错误 [{request}]: {status!r}")
+    
+    def _connect(self, timeout: float) -> socket.socket:
+        last_error = None
+        for attempt in range(CONNECT_RETRIES + 1):
+            try:
+                return socket.create_connection((self.host, self.port), timeout=timeout)
+            except OSError as e:
+                last_error = e
+                logger.debug(f"连接 adb server 失败（第{attempt + 1}次）: {e}")
+                # 首次连接被拒绝时尝试启动本机 adb server
+                if not self._server_started and self.host in ("127.0.0.1", "localhost"):
+                    self._start_server()
+                else:
+                    time.sleep(0.2 * (attempt + 1))
+        raise AdbConnectionError(f"无法连接 adb server {self.host}:{self.port}: {last_error}")
+    
+    def _start_server(self):
+        self._server_started = True
+        try:
+            subprocess.run(["adb", "start-server"], capture_output=True, timeout=10)
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.debug(f"启动 adb server 失败: {e}")
+    
+    def _open_service(self, service: str, timeout: float) -> socket.socket:
+        """切换到目标设备并打开服务，返回已就绪的连接"""
+        sock = self._connect(timeout)
+        try:
+            transport = f"host:transport:{self.serial}" if self.serial else "host:transport-any"
+            self._send(sock, transport)
+            self._read_status(sock, transport)
+            self._send(sock, service)
+            self._read_status(sock, service)
+            return sock
+        except Exception:
+            sock.close()
+            raise
+    
+    def _exchange(self, service: str, timeout: Optional[float] = None) -> bytes:
+        """打开服务并读取全部输出直到连接关闭"""
+        timeout = self.timeout if timeout is None else timeout
+        get_round_trip_counter().add_adb()
+        trace_start = time.perf_counter_ns()
+        try:
+            return self._exchange_slot(service, timeout)
+        finally:
+            get_trace_recorder().add("adb", service[:120], trace_start, time.perf_counter_ns(),
+                                     {"serial": self.serial})
+    
+    def _exchange_slot(self, service: str, timeout: float) -> bytes:
+        """占用一个并发连接名额执行 _exchange"""
+        with self._slots:
+            start = time.monotonic()
+            try:
+                sock = self._open_service(service, timeout)
+            except socket.timeout as e:
+                raise AdbConnectionError(f"连接 adb server 超时: {e}") from e
+            try:
+                chunks = []
+                while True:
+                    remaining = timeout - (time.monotonic() - start)
+                    if remaining <= 0:
+                        raise socket.timeout()
+                    sock.settimeout(remaining)
+                    chunk = sock.recv(65536)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                return b"".join(chunks)
+            except socket.timeout as e:
+                raise AdbError(f"adb 命令执行超时 ({timeout}s): {service}") from e
+            finally:
+                sock.close()
+    
+    def host_request(self, request: str, timeout: Optional[float] = None) -> str:
+        """执行 host: 请求（如 host:devices），返回响应内容"""
+        timeout = self.timeout if timeout is None else timeout
+        sock = self._connect(timeout)
+        try:
+            self._send(sock, request)
+            self._read_status(sock, request)
+            length = int(self._recv_exact(sock, 4), 16)
+            return self._recv_exact(sock, length).decode("utf-8", errors="replace")
+        finally:
+            sock.close()
+    
+    # ---------- shell ----------
+    
+    def run_batch(self, commands: List[str], timeout: Optional[float] = None) -> List[AdbResult]:
+        """
+        一次交互执行多条 shell 命令，分别返回输出与退出码
+        :param commands: 命令列表
+        :param timeout: 整批命令的超时时间（秒）
+        :return: AdbResult列表
+        """
+        if not commands:
+            return []
+        marker = f"__ADB_RC_{uuid.uuid4().hex[:8]}__"
+        script = "\n".join(f"{command}\n__rc=$?; echo; echo {marker}$__rc" for command in commands)
+        raw = self._exchange(f"shell:{script}", timeout).decode("utf-8", errors="replace")
+        raw = raw.replace("\r\n", "\n")
+        
+        # segments[0] 为第一条命令输出，之后每段以 "退出码\n" 开头，后接下一条命令的输出
+        segments = raw.split(f"\n{marker}")
+        outputs = [segments[0]]
+        codes = []
+        for segment in segments[1:]:
+            code_text, _, rest = segment.partition("\n")
+            code_text = code_text.strip()
+            codes.append(int(code_text) if code_text.lstrip("-").isdigit() else -1)
+            outputs.append(rest)
+        results = []
+        for index, command in enumerate(commands):
+            # 未读到标记（如连接中断）的命令退出码记为 -1
+            exit_code = codes[index] if index < len(codes) else -1
+            output = outputs[index] if index < len(outputs) else ""
+            results.append(AdbResult(command, output.strip(), exit_code))
+        logger.debug(f"{self} 批量执行 {len(commands)} 条命令，退出码: {[r.exit_code for r in results]}")
+        return results
+    
+    def run(self, command: str, timeout: Optional[float] = None) -> AdbResult:
+        """执行单条 shell 命令，不检查退出码"""
+        return self.run_batch([command], timeout)[0]
+    
+    def shell(self, command: str, timeout: Optional[float] = None) -> str:
+        """
+        执行单条 shell 命令并返回输出，退出码非0时抛出 AdbError
+        :param command: shell 命令
+        :param timeout: 超时时间（秒）
+        :return: 命令输出（去除首尾空白）
+        """
+        result = self.run(command, timeout)
+        if result.exit_code != 0:
+            raise AdbError(f"adb shell 命令失败 (退出码 {result.exit_code}): {command} | {result.output}")
+        return result.output
+    
+    def exec_out(self, command: str, timeout: Optional[float] = None) -> bytes:
+        """
+        执行命令并返回原始输出（exec 服务，不经过终端转换，适合读取二进制文件）
+        :param command: 命令
+        :param timeout: 超时时间（秒）
+        :return: 原始字节
+        """
+        return self._exchange(f"exec:{command}", timeout)
+    
+    def stream_lines(self, command: str, stop: Optional[threading.Event] = None,
+                     poll_interval: float = 1.0) -> Iterator[str]:
+        """
+        打开长连接 shell 命令（如 logcat），逐行读取输出
+        长连接不占用并发连接名额；stop 被设置或命令结束时退出
+        :param command: shell 命令
+        :param stop: 停止事件
+        :param poll_interval: 检查停止事件的间隔（秒）
+        :return: 输出行迭代器
+        """
+        sock = self._open_service(f"shell:{command}", self.timeout)
+        buffer = b""
+        try:
+            sock.settimeout(poll_interval)
+            while stop is None or not stop.is_set():
+                try:
+                    chunk = sock.recv(65536)
+                except socket.timeout:
+                    continue
+                if not chunk:
+                    break
+                *lines, buffer = (buffer + chunk).split(b"\n")
+                for line in lines:
+                    yield line.decode("utf-8", errors="replace").rstrip("\r")
+        finally:
+            sock.close()
+    
+    def devices(self) -> List[str]:
+        """已连接且在线的设备序列号"""
+        response = self.host_request("host:devices")
+        return [line.split("\t")[0] for line in response.splitlines() if line.endswith("\tdevice")]
+
+
+_transports: Dict[Optional[str], AdbTransport] = {}
+_transports_lock = threading.Lock()
+
+
+def get_transport(serial: Optional[str] = None) -> AdbTransport:
+    """
+    获取设备对应的传输层（按序列号复用，同一设备的所有调用方共享并发连接数限制）
+    :param serial: 设备序列号，None 表示 ANDROID_SERIAL 指定的设备（与 adb 客户端一致）或唯一连接的设备
+    :return: AdbTransport对象
+    """
+    serial = serial or os.environ.get("ANDROID_SERIAL") or None
+    with _transports_lock:
+        transport = _transports.get(serial)
+        if transport is None:
+            transport = AdbTransport(serial)
+            _transports[serial] = transport
+        return transport
@@ -0,0 +1,193 @@
+import logging
+import os
+import shlex
+import time
+from typing import List, Optional
+
+from common.device_info import get_app_version
+from utils.adb_transport import AdbError, get_transport
+from utils.config_loader import load_yaml_config
+
+logger = logging.getLogger(__name__)
+
+config_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../config/config.yaml'))
+_config = load_yaml_config(config_path)
+checkpoint_config = _config.get('checkpoint') or {}
+device_config = _config.get('device') or {}
+
+APP_PACKAGE = device_config.get('appPackage')
+APP_ACTIVITY = device_config.get('appActivity')
+# 设备端存档目录（按应用版本分子目录）
+REMOTE_DIR = checkpoint_config.get('remote_dir', '/data/local/tmp/app_checkpoints')
+# 随应用数据一起存档的共享存储目录（如 hwsys 数据库）
+EXTRA_DIRS: List[str] = list(checkpoint_config.get('extra_dirs') or ['/storage/emulated/0/hwsys/database'])
+# 存档与恢复命令的超时时间（秒）
+ARCHIVE_TIMEOUT = 120
+
+
+def checkpoint_enabled() -> bool:
+    """存档开关：config.yaml 中 checkpoint.enabled，且环境变量 ENABLE_CHECKPOINT 未关闭"""
+    if os.environ.get('ENABLE_CHECKPOINT', 'true').lower() != 'true':
+        return False
+    return bool(checkpoint_config.get('enabled', True))
+
+
+class AppCheckpoint:
+    """
+    应用状态存档：将应用私有数据目录与共享存储中的数据库打包保存在设备上，
+    恢复时停止应用、解包覆盖并重新启动（全程设备本地执行，几秒完成），
+    代替重新安装与界面登录
+    存档按应用版本存放，版本变化后旧存档自动删除
+    访问私有数据目录需要 root（adb root 或 su）或可调试应用（run-as）
+    """
+    
+    def __init__(self, serial: Optional[str] = None, package: str = APP_PACKAGE, activity: str = APP_ACTIVITY,
+                 remote_dir: str = REMOTE_DIR, extra_dirs: Optional[List[str]] = None):
+        self.transport = get_transport(serial)
+        self.package = package
+        self.activity = activity
+        self.remote_dir = remote_dir
+        self.extra_dirs = EXTRA_DIRS if extra_dirs is None else extra_dirs
+        self.data_dir = f"/data/data/{package}"
+        self._prefix: Optional[str] = None
+        self._probed = False
+        self._version: Optional[str] = None
+    
+    # ---------- 环境 ----------
+    
+    @property
+    def prefix(self) -> Optional[str]:
+        """
+        访问私有数据目录的命令前缀："" (adb root) / "su 0" / "run-as 包名"
+        :return: 命令前缀；设备不支持时返回 None
+        """
+        if not self._probed:
+            self._probed = True
+            for prefix in ("", "su 0", f"run-as {self.package}"):
+                if self.transport.run(f"{prefix} ls {self.data_dir}".strip(), timeout=10).exit_code == 0:
+                    self._prefix = prefix
+                    break
+            else:
+                logger.warning(f"无法访问应用数据目录（需要 root 或可调试应用）: {self.data_dir}")
+        return self._prefix
+    
+    @property
+    def supported(self) -> bool:
+        return self.prefix is not None
+    
+    @property
+    def version(self) -> str:
+        """应用版本（versionName-versionCode），作为存档目录名"""
+        if self._version is None:
+            self._version = get_app_version(self.package, self.transport.serial)
+        return self._version
+    
+    @property
+    def version_dir(self) -> str:
+        return f"{self.remote_dir}/{self.version}"
+    
+    def _archives(self, name: str):
+        """(应用数据存档, [(共享目录, 存档)])"""
+        app_archive = f"{self.version_dir}/{name}.app.tar"
+        extra = [(directory, f"{self.version_dir}/{name}.{index}.tar")
+                 for index, directory in enumerate(self.extra_dirs)]
+        return app_archive, extra
+    
+    def _privileged(self, command: str) -> str:
+        return f"{self.prefix} {command}".strip()
+    
+    def discard_stale(self):
+        """删除其他应用版本的存档"""
+        result = self.transport.run(f"ls {self.remote_dir}")
+        stale = [entry for entry in result.output.split() if entry != self.version] if result.exit_code == 0 else []
+        if stale:
+            self.transport.run(" ".join(["rm", "-rf"] + [shlex.quote(f"{self.remote_dir}/{entry}") for entry in stale]))
+            logger.info(f"已删除旧版本应用存档: {stale}")
+    
+    def exists(self, name: str) -> bool:
+        app_archive, extra = self._archives(name)
+        return all(result.exit_code == 0 for result in self.transport.run_batch(
+            [f"[ -s {app_archive} ]"] + [f"[ -e {archive} ]" for _, archive in extra]
+        ))
+    
+    # ---------- 存档 / 恢复 ----------
+    
+    def save(self, name: str) -> bool:
+        """
+        存档当前应用状态
+        :param name: 存档名称（如 logged_in）
+        :return: 成功返回 True
+        """
+        if not self.supported:
+            return False
+        start = time.monotonic()
+        self.discard_stale()
+        app_archive, extra = self._archives(name)
+        # 停止应用，保证数据库等文件已落盘且不在写入中
+        commands = [f"mkdir -p {self.version_dir}", f"am force-stop {self.package}",
+                    f"{self._privileged(f'tar -cf - -C {self.data_dir} .')} > {app_archive}"]
+        for directory, archive in extra:
+            # 目录不存在时写入空存档标记，恢复时同样删除该目录
+            commands.append(f"if [ -d {directory} ]; then tar -cf {archive} -C {directory} .; "
+                            f"else : > {archive}; fi")
+        try:
+            results = self.transport.run_batch(commands, timeout=ARCHIVE_TIMEOUT)
+        except AdbError as e:
+            logger.error(f"应用存档失败: {name} | {e}")
+            return False
+        finally:
+            self._start_app()
+        failed = [result for result in results if result.exit_code != 0]
+        if failed:
+            logger.error(f"应用存档失败: {name} | {failed[0].command} | {failed[0].output}")
+            self.transport.run(f"rm -f {app_archive} " + " ".join(archive for _, archive in extra))
+            return False
+        logger.info(f"应用存档已保存: {name} ({self.version})，耗时 {time.monotonic() - start:.2f}s")
+        return True
+    
+    def restore(self, name: str) -> bool:
+        """
+        恢复应用状态并重新启动应用
+        :param name: 存档名称
+        :return: 成功返回 True；存档不存在或设备不支持返回 False
+        """
+        if not self.supported:
+            return False
+        self.discard_stale()
+        if not self.exists(name):
+            logger.info(f"没有当前版本的应用存档: {name} ({self.version})")
+            return False
+        start = time.monotonic()
+        app_archive, extra = self._archives(name)
+        commands = [
+            f"am force-stop {self.package}",
+            # 部分条目（如系统创建的 lib 链接）无权删除，不影响恢复
+            self._privileged(f"sh -c 'rm -rf {self.data_dir}/* {self.data_dir}/.[!.]* 2>/dev/null; true'"),
+            f"cat {app_archive} | {self._privileged(f'tar -xf - -C {self.data_dir}')}",
+        ]
+        if self.prefix != f"run-as {self.package}":
+            # root 解包的文件属主为 root，改回应用用户并恢复 SELinux 标签
+            commands.append(self._privileged(
+                f"sh -c 'chown -R $(stat -c %u:%g {self.data_dir}) {self.data_dir} && restorecon -RF {self.data_dir}'"
+            ))
+        for directory, archive in extra:
+            commands.append(f"rm -rf {directory}; if [ -s {archive} ]; then mkdir -p {directory} && "
+                            f"tar -xf {archive} -C {directory}; fi")
+        try:
+            results = self.transport.run_batch(commands, timeout=ARCHIVE_TIMEOUT)
+        except AdbError as e:
+            logger.error(f"应用存档恢复失败: {name} | {e}")
+            return False
+        failed = [result for result in results if result.exit_code != 0]
+        if failed:
+            logger.error(f"应用存档恢复失败: {name} | {failed[0].command} | {failed[0].output}")
+            return False
+        self._start_app()
+        logger.info(f"应用存档已恢复: {name} ({self.version})，耗时 {time.monotonic() - start:.2f}s")
+        return True
+    
+    def _start_app(self):
+        try:
+            self.transport.run(f"am start -W -n {self.package}/{self.activity}", timeout=30)
+        except AdbError as e:
+            logger.warning(f"启动应用失败: {e}")
@@ -38,6 +38,8 @@ class AppSwitcher(BasePage):
         try:
             # 2. 使用 ADBHelper 执行命令
             result = self.adb_helper.execute_command(adb_command)
+            # 前台应用已切换，界面快照与界面级缓存失效
+            self.invalidate_ui_snapshot()
             logger.info(f"adb 命令执行成功，输出: {result}")
             
             # 3. 验证启动结果（可选，根据实际输出调整）
@@ -75,6 +77,7 @@ class AppSwitcher(BasePage):
         try:
             # 打印最终执行的命令（验证无-s）
             full_cmd = self.adb_helper.execute_command(bring_foreground_cmd)
+            self.invalidate_ui_snapshot()
             logger.debug(f"调前台命令：{' '.join(full_cmd)}")
         except Exception as e:
             logger.error("=== 切换失败 ===", exc_info=True)
@@ -0,0 +1,321 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from utils.config_loader import load_yaml_config
+from utils.file_lock import exclusive_file_lock
+
+try:
+    import allure
+except ImportError:
+    allure = None
+
+try:
+    # zstandard 为可选依赖：存在时压缩文本类产物（页面源码、日志），缺失时原样保存
+    import zstandard as zstd
+except ImportError:
+    zstd = None
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+config_path = os.path.join(BASE_DIR, 'config', 'config.yaml')
+artifact_config = load_yaml_config(config_path).get('artifacts') or {}
+
+# 产物仓库根目录
+STORE_ROOT = os.path.join(BASE_DIR, artifact_config.get('root', 'reports/artifacts'))
+# 仓库容量上限（字节，按实际存储大小计算），0 表示不限制
+MAX_STORE_BYTES = int(artifact_config.get('max_bytes', 2 * 1024 ** 3))
+# 仓库对象数量上限，0 表示不限制
+MAX_STORE_OBJECTS = int(artifact_config.get('max_objects', 5000))
+# 是否压缩文本类产物
+COMPRESS_ENABLED = bool(artifact_config.get('compress', True))
+# 可压缩的扩展名（图片与视频本身已压缩）
+COMPRESSIBLE_EXTENSIONS = (".xml", ".txt", ".log", ".json", ".html")
+INDEX_FILE = "index.json"
+# 索引文件锁：多个工作进程共用同一仓库，读取-合并-写入索引时互斥
+INDEX_LOCK_FILE = "index.lock"
+
+
+class ArtifactStore:
+    """
+    内容寻址的产物仓库：按 sha256 存放截图、录屏、日志、页面源码，相同内容只存一份
+    对外路径（报告目录中的文件）通过硬链接指向仓库对象；
+    索引文件按最近使用顺序记录对象，容量与数量限制按最久未使用逐个淘汰（每次 O(1)）；
+    多个工作进程共用仓库时，写索引前在文件锁内合并其他进程写入的条目
+    """
+    
+    def __init__(self, root: str = STORE_ROOT, compress: bool = COMPRESS_ENABLED,
+                 max_bytes: int = MAX_STORE_BYTES, max_objects: int = MAX_STORE_OBJECTS):
+        self.root = root
+        self.compress = compress and zstd is not None
+        self.max_bytes = max_bytes
+        self.max_objects = max_objects
+        self._lock = threading.RLock()
+        # {摘要: 对象信息}，按最近使用顺序排列（最久未使用在前）
+        self.index: "OrderedDict[str, dict]" = OrderedDict()
+        self.total_bytes = 0
+        self._dirty = False
+        # 本进程淘汰的对象，合并索引时不再从文件中恢复
+        self._evicted = set()
+        os.makedirs(os.path.join(self.root, "objects"), exist_ok=True)
+        with self._index_lock():
+            self._merge_index()
+    
+    # ---------- 索引 ----------
+    
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.root, INDEX_FILE)
+    
+    @contextmanager
+    def _index_lock(self):
+        """跨进程的索引文件锁（阻塞等待），同时持有进程内锁"""
+        with self._lock, exclusive_file_lock(os.path.join(self.root, INDEX_LOCK_FILE)):
+            yield
+    
+    def _read_index_file(self) -> list:
+        if not os.path.exists(self.index_path):
+            return []
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            logger.error(f"产物索引读取失败，重新建立: {e}")
+            return []
+    
+    def _merge_index(self):
+        """
+        将索引文件中的条目（其他进程写入的）合并到内存索引，需在 _index_lock 内调用：
+        同一对象的链接取并集、最近使用时间取较新者；对象文件已不存在（被其他进程淘汰）的条目丢弃
+        """
+        entries = dict(self.index)
+        for digest, entry in self._read_index_file():
+            if digest in self._evicted:
+                continue
+            local = entries.get(digest)
+            if local is None:
+                entries[digest] = entry
+                continue
+            local["links"] = local["links"] + [link for link in entry["links"] if link not in local["links"]]
+            local["last_used"] = max(local["last_used"], entry["last_used"])
+        self.index = OrderedDict(
+            (digest, entry) for digest, entry in sorted(entries.items(), key=lambda item: item[1]["last_used"])
+            if os.path.exists(self.object_path(digest, entry))
+        )
+        self.total_bytes = sum(entry["stored_size"] for entry in self.index.values())
+    
+    def _write_index(self):
+        """写入索引文件（同目录临时文件写完后替换，避免中断时损坏；需在 _index_lock 内调用）"""
+        fd, temp_path = tempfile.mkstemp(prefix=f"{INDEX_FILE}.", suffix=".tmp", dir=self.root)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump(list(self.index.items()), file, ensure_ascii=False)
+            os.replace(temp_path, self.index_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self._evicted.clear()
+        self._dirty = False
+    
+    def save(self):
+        """合并其他进程写入的条目后写入索引文件"""
+        with self._index_lock():
+            if not self._dirty:
+                return
+            self._merge_index()
+            self._write_index()
+    
+    def _touch(self, digest: str):
+        entry = self.index[digest]
+        entry["last_used"] = time.time()
+        self.index.move_to_end(digest)
+        self._dirty = True
+    
+    # ---------- 对象 ----------
+    
+    def object_path(self, digest: str, entry: Optional[dict] = None) -> str:
+        entry = entry or self.index[digest]
+        suffix = ".zst" if entry.get("compressed") else ""
+        return os.path.join(self.root, "objects", digest[:2], f"{digest}{entry['ext']}{suffix}")
+    
+    def contains(self, digest: str) -> bool:
+        return digest in self.index
+    
+    def put_bytes(self, data: bytes, ext: str, link_to: Optional[str] = None) -> str:
+        """
+        存入产物内容
+        :param data: 文件内容
+        :param ext: 扩展名（如 .png）
+        :param link_to: 可选，同时在该路径创建指向对象的文件
+        :return: 内容摘要
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            # 对象文件可能已被其他进程淘汰，此时重新写入
+            if digest in self.index and os.path.exists(self.object_path(digest)):
+                self._touch(digest)
+            else:
+                compressed = self.compress and ext.lower() in COMPRESSIBLE_EXTENSIONS
+                entry = {"ext": ext, "size": len(data), "compressed": compressed,
+                         "created": time.time(), "last_used": time.time(), "links": []}
+                stored = zstd.ZstdCompressor().compress(data) if compressed else data
+                entry["stored_size"] = len(stored)
+                path = self.object_path(digest, entry)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # 其他进程可能同时写入相同内容，各自使用唯一的临时文件
+                fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+                with os.fdopen(fd, "wb") as file:
+                    file.write(stored)
+                os.replace(temp_path, path)
+                self.index[digest] = entry
+                self.total_bytes += entry["stored_size"]
+                self._dirty = True
+            if link_to:
+                self.link(digest, link_to)
+        return digest
+    
+    def put_file(self, path: str, keep_link: bool = True) -> str:
+        """
+        将已有文件移入仓库
+        :param path: 文件路径
+        :param keep_link: 是否在原路径保留指向对象的文件
+        :return: 内容摘要
+        """
+        with open(path, "rb") as file:
+            data = file.read()
+        ext = os.path.splitext(path)[1]
+        with self._lock:
+            digest = self.put_bytes(data, ext)
+            os.remove(path)
+            if keep_link:
+                self.link(digest, path)
+        return digest
+    
+    def read(self, digest: str) -> bytes:
+        """读取对象内容（自动解压）"""
+        with self._lock:
+            entry = self.index[digest]
+            path = self.object_path(digest, entry)
+            self._touch(digest)
+        with open(path, "rb") as file:
+            data = file.read()
+        return zstd.ZstdDecompressor().decompress(data) if entry["compressed"] else data
+    
+    def link(self, digest: str, target: str) -> str:
+        """
+        在目标路径（报告目录、allure-results 等）创建对象的文件：
+        未压缩对象使用硬链接（不占用额外空间），压缩对象解压为普通文件
+        :param digest: 内容摘要
+        :param target: 目标路径
+        :return: 目标路径
+        """
+        with self._lock:
+            entry = self.index[digest]
+            directory = os.path.dirname(target)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if os.path.lexists(target):
+                os.remove(target)
+            if entry["compressed"]:
+                with open(target, "wb") as file:
+                    file.write(self.read(digest))
+            else:
+                try:
+                    os.link(self.object_path(digest, entry), target)
+                except OSError:
+                    shutil.copyfile(self.object_path(digest, entry), target)
+            target = os.path.abspath(target)
+            if target not in entry["links"]:
+                entry["links"].append(target)
+            self._touch(digest)
+        return target
+    
+    def attach(self, digest: str, name: str, attachment_type) -> bool:
+        """
+        将对象作为附件写入 Allure 结果目录（复制对象内容，报告上传或在其他机器打开时仍可查看）
+        :param digest: 内容摘要
+        :param name: 附件名称
+        :param attachment_type: allure.attachment_type 中的类型
+        :return: 成功附加返回 True
+        """
+        if allure is None:
+            return False
+        with self._lock:
+            entry = self.index.get(digest)
+            if entry is None:
+                logger.warning(f"产物已被淘汰，无法附加到报告: {name}")
+                return False
+            path = self.object_path(digest, entry)
+            self._touch(digest)
+        if entry["compressed"]:
+            allure.attach(self.read(digest), name=name, attachment_type=attachment_type)
+        else:
+            allure.attach.file(path, name=name, attachment_type=attachment_type)
+        return True
+    
+    # ---------- 保留策略 ----------
+    
+    def _evict(self, digest: str):
+        entry = self.index.pop(digest)
+        self.total_bytes -= entry["stored_size"]
+        self._evicted.add(digest)
+        for path in [self.object_path(digest, entry)] + entry["links"]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._dirty = True
+    
+    def enforce(self, max_bytes: Optional[int] = None, max_objects: Optional[int] = None) -> int:
+        """
+        按容量与数量限制淘汰最久未使用的对象（连同其链接文件）
+        :param max_bytes: 容量上限，默认使用配置值
+        :param max_objects: 数量上限，默认使用配置值
+        :return: 淘汰的对象数量
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        max_objects = self.max_objects if max_objects is None else max_objects
+        evicted = 0
+        with self._index_lock():
+            # 先合并其他进程的条目，按整个仓库的使用情况淘汰
+            self._merge_index()
+            while self.index and ((max_bytes and self.total_bytes > max_bytes)
+                                  or (max_objects and len(self.index) > max_objects)):
+                self._evict(next(iter(self.index)))
+                evicted += 1
+            self._write_index()
+        if evicted:
+            logger.info(f"产物仓库淘汰 {evicted} 个对象，当前 {len(self.index)} 个，共 {self.total_bytes / 1024 ** 2:.1f}MB")
+        return evicted
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "objects": len(self.index),
+                "stored_bytes": self.total_bytes,
+                "original_bytes": sum(entry["size"] for entry in self.index.values()),
+                "links": sum(len(entry["links"]) for entry in self.index.values()),
+            }
+
+
+_store: Optional[ArtifactStore] = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    """获取进程内共享的产物仓库"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ArtifactStore()
+        return _store
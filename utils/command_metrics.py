@@ -0,0 +1,281 @@
+import heapq
+import itertools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, NamedTuple, Optional
+
+from utils.trace_recorder import get_trace_recorder
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# 运行结束时输出的命令统计报告
+REPORT_PATH = os.path.join(BASE_DIR, "reports", "command_metrics.json")
+# 报告中保留的最慢命令数量
+SLOWEST_COUNT = 20
+# 每个用例命令数的直方图分桶上界
+HISTOGRAM_BUCKETS = (10, 25, 50, 100, 200, 500, 1000)
+# 页面对象方法所在目录（调用栈中这些文件里以 self 调用的方法记为页面方法）
+PAGE_DIRS = tuple(os.path.join(BASE_DIR, directory) + os.sep for directory in ("pages", "base"))
+WAIT_ENGINE_FILE = os.path.join(BASE_DIR, "utils", "wait_engine.py")
+
+
+class RoundTrips(NamedTuple):
+    """累计往返次数：Appium HTTP 命令与 adb server 交互"""
+    driver: int
+    adb: int
+    
+    @property
+    def total(self) -> int:
+        return self.driver + self.adb
+    
+    def __sub__(self, other: "RoundTrips") -> "RoundTrips":
+        return RoundTrips(self.driver - other.driver, self.adb - other.adb)
+
+
+class RoundTripCounter:
+    """进程内往返次数计数（各 driver、各设备的传输层共用），按差值统计某段时间内的往返"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._driver = 0
+        self._adb = 0
+    
+    def add_driver(self, count: int = 1):
+        with self._lock:
+            self._driver += count
+    
+    def add_adb(self, count: int = 1):
+        with self._lock:
+            self._adb += count
+    
+    def snapshot(self) -> RoundTrips:
+        with self._lock:
+            return RoundTrips(self._driver, self._adb)
+
+
+class CommandRecord(NamedTuple):
+    """一次 Appium HTTP 命令"""
+    test: Optional[str]
+    page_method: Optional[str]
+    command: str
+    locator: Optional[str]
+    duration: float
+    result: str
+    in_wait: bool
+
+
+class TestCommandStats:
+    """单个用例的命令统计"""
+    
+    def __init__(self):
+        self.count = 0
+        self.command_time = 0.0
+        self.wait_command_time = 0.0
+        self.action_command_time = 0.0
+        self.wait_time = 0.0
+        self.errors = 0
+        self.commands: Counter = Counter()
+    
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "command_time": round(self.command_time, 3),
+            "wait_command_time": round(self.wait_command_time, 3),
+            "action_command_time": round(self.action_command_time, 3),
+            "wait_time": round(self.wait_time, 3),
+            "errors": self.errors,
+            "top_commands": self.commands.most_common(5),
+        }
+
+
+def _caller_context():
+    """
+    从调用栈中找出最外层的页面对象方法，以及是否处于等待中
+    :return: (页面方法 "类名.方法名" 或 None, 是否在等待中)
+    """
+    page_method = None
+    in_wait = False
+    frame = sys._getframe(2)
+    while frame is not None:
+        code = frame.f_code
+        filename = code.co_filename
+        if filename == WAIT_ENGINE_FILE or code.co_name.startswith("wait_"):
+            in_wait = True
+        if filename.startswith(PAGE_DIRS) and "self" in code.co_varnames[:1]:
+            owner = frame.f_locals.get("self")
+            page_method = f"{type(owner).__name__}.{code.co_name}"
+        frame = frame.f_back
+    return page_method, in_wait
+
+
+def _locator(params: Optional[dict]) -> Optional[str]:
+    if not params or "using" not in params:
+        return None
+    return f"{params['using']}={params.get('value')}"
+
+
+def _result(response) -> str:
+    if isinstance(response, dict):
+        value = response.get("value")
+        if isinstance(value, dict) and value.get("error"):
+            return str(value["error"])
+        if response.get("status") not in (None, 0):
+            return f"status {response.get('status')}"
+    return "ok"
+
+
+class CommandMetrics:
+    """
+    Appium 命令统计：记录每条 HTTP 命令（名称、定位器、耗时、结果），
+    归属到当前用例与调用栈上的页面对象方法，运行结束时输出最慢命令、
+    每用例命令数分布以及等待与操作的耗时占比
+    """
+    
+    def __init__(self, slowest_count: int = SLOWEST_COUNT):
+        self._lock = threading.Lock()
+        self.current_test: Optional[str] = None
+        self.tests: Dict[str, TestCommandStats] = defaultdict(TestCommandStats)
+        self.by_method: Dict[tuple, List[float]] = defaultdict(lambda: [0, 0.0])
+        self.slowest_count = slowest_count
+        self._slowest: List[tuple] = []
+        self._sequence = itertools.count()
+    
+    def begin_test(self, node_id: str):
+        self.current_test = node_id
+    
+    def end_test(self):
+        self.current_test = None
+    
+    def add_wait(self, duration: float):
+        """记录一次等待的总耗时（含轮询间隔）"""
+        if self.current_test is not None:
+            with self._lock:
+                self.tests[self.current_test].wait_time += duration
+    
+    def record(self, record: CommandRecord):
+        with self._lock:
+            key = (record.page_method, record.command)
+            self.by_method[key][0] += 1
+            self.by_method[key][1] += record.duration
+            entry = (record.duration, next(self._sequence), record)
+            if len(self._slowest) < self.slowest_count:
+                heapq.heappush(self._slowest, entry)
+            elif record.duration > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+            if record.test is None:
+                return
+            stats = self.tests[record.test]
+            stats.count += 1
+            stats.command_time += record.duration
+            if record.in_wait:
+                stats.wait_command_time += record.duration
+            else:
+                stats.action_command_time += record.duration
+            if record.result != "ok":
+                stats.errors += 1
+            stats.commands[record.command] += 1
+    
+    def test_stats(self, node_id: str) -> TestCommandStats:
+        with self._lock:
+            return self.tests.get(node_id) or TestCommandStats()
+    
+    def histogram(self) -> Dict[str, int]:
+        """每个用例命令数的分布"""
+        labels = [f"<={bound}" for bound in HISTOGRAM_BUCKETS] + [f">{HISTOGRAM_BUCKETS[-1]}"]
+        histogram = dict.fromkeys(labels, 0)
+        for stats in self.tests.values():
+            index = next((i for i, bound in enumerate(HISTOGRAM_BUCKETS) if stats.count <= bound), -1)
+            histogram[labels[index]] += 1
+        return histogram
+    
+    def report(self) -> dict:
+        with self._lock:
+            slowest = [record._asdict() for _, _, record in sorted(self._slowest, reverse=True)]
+            methods = sorted(self.by_method.items(), key=lambda item: -item[1][1])[:self.slowest_count]
+            wait_time = sum(stats.wait_time for stats in self.tests.values())
+            wait_command_time = sum(stats.wait_command_time for stats in self.tests.values())
+            action_command_time = sum(stats.action_command_time for stats in self.tests.values())
+            return {
+                "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "commands": sum(stats.count for stats in self.tests.values()),
+                "time_split": {
+                    "wait_time": round(wait_time, 3),
+                    "wait_command_time": round(wait_command_time, 3),
+                    "action_command_time": round(action_command_time, 3),
+                },
+                "commands_per_test": self.histogram(),
+                "slowest_commands": slowest,
+                "slowest_page_methods": [
+                    {"page_method": page_method, "command": command, "count": count, "duration": round(total, 3)}
+                    for (page_method, command), (count, total) in methods
+                ],
+                "tests": {node_id: stats.to_dict() for node_id, stats in self.tests.items()},
+            }
+    
+    def write_report(self, path: str = REPORT_PATH) -> dict:
+        """
+        写入统计报告并输出摘要日志
+        :param path: 报告路径
+        :return: 报告内容
+        """
+        report = self.report()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        split = report["time_split"]
+        logger.info(f"driver 命令统计: 共 {report['commands']} 条，等待 {split['wait_time']:.1f}s"
+                    f"（其中命令 {split['wait_command_time']:.1f}s），操作命令 {split['action_command_time']:.1f}s，"
+                    f"每用例命令数分布 {report['commands_per_test']}")
+        for record in report["slowest_commands"][:5]:
+            logger.info(f"最慢命令: {record['command']} {record['locator'] or ''} {record['duration']:.3f}s "
+                        f"| {record['page_method']} | {record['test']}")
+        logger.info(f"driver 命令统计报告: {path}")
+        return report
+
+
+_counter = RoundTripCounter()
+_metrics = CommandMetrics()
+
+
+def get_round_trip_counter() -> RoundTripCounter:
+    return _counter
+
+
+def get_command_metrics() -> CommandMetrics:
+    return _metrics
+
+
+def instrument_driver(driver):
+    """
+    统计 driver 的 HTTP 命令（包装 command_executor.execute，重复调用不会重复包装）
+    :param driver: driver对象
+    """
+    executor = driver.command_executor
+    if getattr(executor, "_round_trips_instrumented", False):
+        return
+    execute = executor.execute
+    
+    def instrumented_execute(command, params):
+        _counter.add_driver()
+        page_method, in_wait = _caller_context()
+        start = time.perf_counter_ns()
+        result = "exception"
+        try:
+            response = execute(command, params)
+            result = _result(response)
+            return response
+        finally:
+            end = time.perf_counter_ns()
+            locator = _locator(params)
+            _metrics.record(CommandRecord(_metrics.current_test, page_method, command, locator,
+                                          (end - start) / 1e9, result, in_wait))
+            get_trace_recorder().add("driver", command, start, end, {"locator": locator, "result": result})
+    
+    executor.execute = instrumented_execute
+    executor._round_trips_instrumented = True
@@ -0,0 +1,230 @@
+import logging
+import os
+import re
+import shutil
+import subprocess
+import time
+from typing import List, NamedTuple, Optional
+from urllib.error import URLError
+from urllib.parse import urlparse
+from urllib.request import urlopen
+
+from utils.adb_transport import AdbError, get_transport
+from utils.config_loader import load_yaml_config
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+logger = logging.getLogger(__name__)
+
+config_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../config/config.yaml'))
+_config = load_yaml_config(config_path)
+pool_config = _config.get('device_pool') or {}
+appium_config = _config.get('appium') or {}
+
+_server_url = urlparse(appium_config.get('server_url', 'http://127.0.0.1:4723'))
+# 设备序列号列表，为空时使用 adb devices 中全部在线设备
+POOL_DEVICES: List[str] = [str(serial) for serial in pool_config.get('devices') or []]
+# 第 n 台设备（按序列号排序）使用 APPIUM_BASE_PORT + n 端口的 Appium 服务，单设备时即 appium.server_url
+APPIUM_HOST = _server_url.hostname or '127.0.0.1'
+APPIUM_BASE_PORT = int(pool_config.get('appium_base_port', _server_url.port or 4723))
+# UiAutomator2 设备端服务转发端口，同一台主机上并行的会话必须不同
+SYSTEM_PORT_BASE = int(pool_config.get('system_port_base', 8200))
+MJPEG_PORT_BASE = int(pool_config.get('mjpeg_port_base', 7810))
+# 设备对应端口无 Appium 服务时是否自动启动
+START_APPIUM = bool(pool_config.get('start_appium', True))
+# 所有设备均被占用时等待空闲设备的最长时间（秒）
+LEASE_TIMEOUT = float(pool_config.get('lease_timeout', 600))
+LEASE_POLL_INTERVAL = 1.0
+APPIUM_START_TIMEOUT = 60
+LOCK_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../reports/.device_locks'))
+APPIUM_LOG_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../reports/logs'))
+# 序列号中不能用于文件名的字符（如网络设备的 ip:port）
+UNSAFE_NAME_PATTERN = re.compile(r'[^\w.-]')
+
+
+class DevicePoolError(RuntimeError):
+    """没有可用设备或设备租约获取超时"""
+
+
+class DeviceSlot(NamedTuple):
+    """设备池中的一台设备及其分配的端口（index 为设备在池中的位置，各进程一致）"""
+    serial: str
+    index: int
+    
+    @property
+    def appium_port(self) -> int:
+        return APPIUM_BASE_PORT + self.index
+    
+    @property
+    def server_url(self) -> str:
+        return f"http://{APPIUM_HOST}:{self.appium_port}"
+    
+    @property
+    def system_port(self) -> int:
+        return SYSTEM_PORT_BASE + self.index
+    
+    @property
+    def mjpeg_port(self) -> int:
+        return MJPEG_PORT_BASE + self.index
+    
+    def capabilities(self) -> dict:
+        """该设备会话需要覆盖的能力（设备序列号与设备端端口）"""
+        return {
+            "udid": self.serial,
+            "systemPort": self.system_port,
+            "mjpegServerPort": self.mjpeg_port,
+        }
+
+
+def discover_devices() -> List[DeviceSlot]:
+    """
+    获取设备池：config.yaml 中 device_pool.devices，未配置时为全部在线设备
+    按序列号排序，保证各工作进程为同一设备分配相同的端口
+    :return: DeviceSlot列表
+    """
+    serials = POOL_DEVICES
+    if not serials:
+        try:
+            serials = get_transport().devices()
+        except AdbError as e:
+            logger.warning(f"获取设备列表失败: {e}")
+            serials = []
+    return [DeviceSlot(serial, index) for index, serial in enumerate(sorted(set(serials)))]
+
+
+def _lock_file(handle) -> bool:
+    """非阻塞获取文件锁，进程退出（包括崩溃）时由系统释放"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        elif msvcrt is not None:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock_file(handle):
+    try:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+        elif msvcrt is not None:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+    except OSError as e:
+        logger.debug(f"释放设备锁失败: {e}")
+
+
+def appium_reachable(server_url: str, timeout: float = 2.0) -> bool:
+    """Appium 服务是否可用（GET /status）"""
+    try:
+        with urlopen(f"{server_url}/status", timeout=timeout) as response:
+            return response.status == 200
+    except (URLError, OSError):
+        return False
+
+
+class DeviceLease:
+    """
+    设备租约：通过锁文件跨进程独占一台设备，并保证该设备的 Appium 服务可用
+    每个工作进程持有一个租约，会话内的 driver、adb 调用都只访问租到的设备
+    """
+    
+    def __init__(self, slot: DeviceSlot, handle):
+        self.slot = slot
+        self._handle = handle
+        self._server: Optional[subprocess.Popen] = None
+    
+    @property
+    def serial(self) -> str:
+        return self.slot.serial
+    
+    def ensure_server(self) -> str:
+        """
+        确保设备对应端口的 Appium 服务可用，未运行且允许自动启动时启动一个
+        :return: Appium 服务地址
+        """
+        server_url = self.slot.server_url
+        if appium_reachable(server_url) or not START_APPIUM:
+            return server_url
+        executable = shutil.which("appium")
+        if executable is None:
+            logger.warning(f"未找到 appium 命令，无法为设备 {self.serial} 启动 Appium 服务")
+            return server_url
+        os.makedirs(APPIUM_LOG_DIR, exist_ok=True)
+        log_path = os.path.join(APPIUM_LOG_DIR, f"appium_{UNSAFE_NAME_PATTERN.sub('_', self.serial)}.log")
+        command = [executable, "--address", APPIUM_HOST, "--port", str(self.slot.appium_port), "--log", log_path]
+        if appium_config.get('relaxedSecurityEnabled'):
+            command.append("--relaxed-security")
+        self._server = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + APPIUM_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if appium_reachable(server_url):
+                logger.info(f"已为设备 {self.serial} 启动 Appium 服务: {server_url}")
+                return server_url
+            if self._server.poll() is not None:
+                break
+            time.sleep(0.5)
+        logger.error(f"设备 {self.serial} 的 Appium 服务启动失败，日志: {log_path}")
+        return server_url
+    
+    def release(self):
+        """停止本租约启动的 Appium 服务并释放设备"""
+        if self._server is not None:
+            self._server.terminate()
+            try:
+                self._server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._server.kill()
+            self._server = None
+        if self._handle is not None:
+            _unlock_file(self._handle)
+            self._handle.close()
+            self._handle = None
+            logger.info(f"已释放设备: {self.serial}")
+
+
+def acquire_device(preferred: Optional[str] = None, worker_index: int = 0,
+                   timeout: float = LEASE_TIMEOUT) -> DeviceLease:
+    """
+    租用一台空闲设备
+    :param preferred: 指定设备序列号（只租用该设备）
+    :param worker_index: 工作进程序号，从对应位置开始尝试，减少进程间争用
+    :param timeout: 等待空闲设备的最长时间（秒）
+    :return: DeviceLease对象
+    """
+    slots = discover_devices()
+    if preferred:
+        slots = [slot for slot in slots if slot.serial == preferred] or [DeviceSlot(preferred, 0)]
+    if not slots:
+        raise DevicePoolError("没有可用设备")
+    if fcntl is None and msvcrt is None:
+        logger.warning("当前平台不支持文件锁，设备租约不具备跨进程互斥")
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    offset = worker_index % len(slots)
+    ordered = slots[offset:] + slots[:offset]
+    deadline = time.monotonic() + timeout
+    while True:
+        for slot in ordered:
+            lock_path = os.path.join(LOCK_DIR, f"{UNSAFE_NAME_PATTERN.sub('_', slot.serial)}.lock")
+            handle = open(lock_path, "a+")
+            if _lock_file(handle):
+                handle.seek(0)
+                handle.truncate()
+                handle.write(f"{os.getpid()}\n")
+                handle.flush()
+                logger.info(f"已租用设备: {slot.serial}（Appium 端口 {slot.appium_port}）")
+                return DeviceLease(slot, handle)
+            handle.close()
+        if time.monotonic() >= deadline:
+            raise DevicePoolError(f"等待空闲设备超时（{timeout:.0f}s）: {[slot.serial for slot in slots]}")
+        time.sleep(LEASE_POLL_INTERVAL)
@@ -0,0 +1,256 @@
+import logging
+import shlex
+import time
+import urllib.request
+from collections import deque
+from io import BytesIO
+from typing import Deque, List, Optional
+
+from PIL import Image, ImageChops, ImageStat
+
+from utils.adb_transport import get_transport
+from utils.driver_memo import SESSION_SCOPE, get_driver_memo, memo_current_activity, memo_current_package
+from utils.wait_engine import record_wait
+
+try:
+    # numpy 为可选依赖：存在时用数组计算帧差，缺失时使用 PIL 计算
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# 低分辨率帧宽度（像素），足以判断墨水屏是否仍在刷新
+FRAME_WIDTH = 96
+# 相邻两帧平均像素差（0-255）低于该值视为静止
+FRAME_DIFF_THRESHOLD = 1.0
+# 连续静止的帧数
+STABLE_FRAMES = 2
+# 默认等待显示稳定的超时时间（秒）
+DISPLAY_SETTLE_TIMEOUT = 3.0
+# SurfaceFlinger 无新帧提交的静默时间（秒）
+SURFACE_QUIET_PERIOD = 0.3
+SURFACE_POLL_INTERVAL = 0.05
+# MJPEG 帧在设备端的缩放比例（百分比）与 JPEG 质量，帧差只需要很小的灰度图
+MJPEG_SCALING_FACTOR = 25
+MJPEG_QUALITY = 30
+MJPEG_CONNECT_TIMEOUT = 2.0
+# 保留最近的刷新耗时条数
+REFRESH_HISTORY_SIZE = 500
+
+_refresh_durations: Deque[float] = deque(maxlen=REFRESH_HISTORY_SIZE)
+
+
+def get_refresh_durations() -> List[float]:
+    """最近记录的屏幕刷新耗时（秒），最多 REFRESH_HISTORY_SIZE 条"""
+    return list(_refresh_durations)
+
+
+def frame_difference(previous: Image.Image, current: Image.Image) -> float:
+    """两帧的平均像素差（0-255）"""
+    if np is not None:
+        return float(np.abs(np.asarray(previous, dtype=np.int16) - np.asarray(current, dtype=np.int16)).mean())
+    return ImageStat.Stat(ImageChops.difference(previous, current)).mean[0]
+
+
+class MjpegFrameStream:
+    """
+    读取 UiAutomator2 MJPEG 服务（mjpegServerPort）的视频帧
+    帧在设备端缩放并压缩为 JPEG，每帧只有几 KB，代替完整的 PNG 截图
+    """
+    
+    def __init__(self, port: int, host: str = "127.0.0.1", timeout: float = MJPEG_CONNECT_TIMEOUT):
+        self.response = urllib.request.urlopen(f"http://{host}:{port}", timeout=timeout)
+    
+    def read_frame(self) -> bytes:
+        """读取下一帧 JPEG 数据（multipart 块：边界行、头部行、空行、图像数据）"""
+        length = None
+        while True:
+            line = self.response.readline()
+            if not line:
+                raise EOFError("MJPEG 流已关闭")
+            line = line.strip()
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":", 1)[1])
+            elif not line and length is not None:
+                return self.response.read(length)
+    
+    def close(self):
+        self.response.close()
+
+
+class DisplaySettleDetector:
+    """
+    墨水屏显示稳定检测：无障碍树先于屏幕刷新完成，截图或点按前需等待面板静止
+    优先使用应用图层的 SurfaceFlinger 帧时间戳（adb dumpsys，无需截图）；
+    不可用时连续抓取低分辨率帧（MJPEG 流，无 MJPEG 端口时退回截图）做帧差，直到连续多帧静止
+    """
+    
+    def __init__(self, driver, device_id: Optional[str] = None):
+        self.driver = driver
+        self.device_id = device_id
+        self.layer: Optional[str] = None
+        self.stream: Optional[MjpegFrameStream] = None
+    
+    # ---------- SurfaceFlinger ----------
+    
+    def _find_app_layer(self, package: str, activity: Optional[str]) -> Optional[str]:
+        """
+        从 dumpsys SurfaceFlinger --list 中查找当前应用的窗口图层
+        不指定图层时 --latency 在多数系统上没有数据或只统计其他图层
+        :param package: 当前应用包名
+        :param activity: 当前 Activity（完整类名或以 . 开头的相对类名）
+        :return: 图层名，未找到返回 None
+        """
+        output = get_transport(self.device_id).shell("dumpsys SurfaceFlinger --list", timeout=2)
+        # 应用窗口图层形如 "包名/Activity类名#0"
+        layers = [line.strip() for line in output.splitlines() if line.strip().startswith(f"{package}/")]
+        if activity:
+            class_name = package + activity if activity.startswith(".") else activity
+            current = [layer for layer in layers
+                       if layer.split("/", 1)[1].split("#", 1)[0] in (class_name, activity)]
+            # 当前 Activity 的图层优先（返回栈中下层 Activity 的图层没有新帧，会被误判为静止）
+            layers = current or layers
+        # 取最后一个（最上层）
+        return layers[-1] if layers else None
+    
+    def _app_layer(self) -> Optional[str]:
+        """
+        当前应用窗口图层：按 (包名, Activity) 缓存在会话级 driver 缓存中，
+        只在包名或 Activity 变化后重新执行 dumpsys --list（两者取自界面纪元缓存）
+        """
+        package = memo_current_package(self.driver)
+        if not package:
+            return None
+        activity = memo_current_activity(self.driver)
+        # 未找到时缓存空字符串（None 不缓存），同一界面不重复查找
+        layer = get_driver_memo(self.driver).get(("surface_layer", package, activity),
+                                                 lambda: self._find_app_layer(package, activity) or "",
+                                                 SESSION_SCOPE)
+        return layer or None
+    
+    def _latest_frame_time(self) -> Optional[int]:
+        """最近一帧的实际显示时间戳（纳秒），无数据返回 None"""
+        command = "dumpsys SurfaceFlinger --latency"
+        if self.layer:
+            command += f" {shlex.quote(self.layer)}"
+        output = get_transport(self.device_id).shell(command, timeout=2)
+        latest = None
+        for line in output.splitlines()[1:]:
+            parts = line.split()
+            if len(parts) != 3:
+                continue
+            actual_present = int(parts[1])
+            # 0 与 INT64_MAX 表示该帧尚未显示
+            if 0 < actual_present < (1 << 63) - 1:
+                latest = actual_present if latest is None else max(latest, actual_present)
+        return latest
+    
+    def _surface_flinger_supported(self) -> bool:
+        supported = getattr(self.driver, "_surface_latency_supported", None)
+        if supported is False:
+            return False
+        try:
+            self.layer = self._app_layer()
+        except Exception as e:
+            logger.debug(f"查找应用图层失败: {e}")
+        if supported is None:
+            try:
+                supported = self._latest_frame_time() is not None
+            except Exception as e:
+                logger.debug(f"SurfaceFlinger 帧时间不可用: {e}")
+                supported = False
+            self.driver._surface_latency_supported = supported
+            logger.info(f"显示稳定检测方式: {'SurfaceFlinger 帧时间' if supported else '截图帧差'}")
+        return supported
+    
+    def _wait_surface_quiet(self, deadline: float):
+        """等待 SURFACE_QUIET_PERIOD 内没有新帧提交，返回 (是否稳定, 探测次数)"""
+        last_frame = self._latest_frame_time()
+        last_change = time.monotonic()
+        polls = 1
+        while time.monotonic() < deadline:
+            time.sleep(SURFACE_POLL_INTERVAL)
+            polls += 1
+            frame = self._latest_frame_time()
+            if frame != last_frame:
+                last_frame = frame
+                last_change = time.monotonic()
+            elif time.monotonic() - last_change >= SURFACE_QUIET_PERIOD:
+                return True, polls
+        return False, polls
+    
+    # ---------- 截图帧差 ----------
+    
+    def _open_stream(self):
+        """打开 MJPEG 流，并在会话中首次使用时设置设备端缩放与压缩质量；不可用时使用截图"""
+        port = (getattr(self.driver, "capabilities", None) or {}).get("mjpegServerPort")
+        if not port:
+            return
+        try:
+            if not getattr(self.driver, "_mjpeg_scaled", False):
+                self.driver.update_settings({"mjpegScalingFactor": MJPEG_SCALING_FACTOR,
+                                             "mjpegServerScreenshotQuality": MJPEG_QUALITY})
+                self.driver._mjpeg_scaled = True
+            self.stream = MjpegFrameStream(port)
+        except Exception as e:
+            logger.debug(f"MJPEG 流不可用，使用截图帧差: {e}")
+            self.stream = None
+    
+    def _close_stream(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+    
+    def grab_frame(self) -> Image.Image:
+        """抓取一帧低分辨率灰度图"""
+        data = self.stream.read_frame() if self.stream is not None else self.driver.get_screenshot_as_png()
+        image = Image.open(BytesIO(data)).convert("L")
+        height = max(1, image.height * FRAME_WIDTH // image.width)
+        return image.resize((FRAME_WIDTH, height))
+    
+    def _wait_frames_static(self, deadline: float):
+        """连续抓帧直到 STABLE_FRAMES 次帧差低于阈值，返回 (是否稳定, 抓帧次数)"""
+        previous = self.grab_frame()
+        polls = 1
+        stable = 0
+        while time.monotonic() < deadline:
+            current = self.grab_frame()
+            polls += 1
+            difference = frame_difference(previous, current)
+            stable = stable + 1 if difference < FRAME_DIFF_THRESHOLD else 0
+            if stable >= STABLE_FRAMES:
+                return True, polls
+            previous = current
+        return False, polls
+    
+    def wait(self, timeout: float = DISPLAY_SETTLE_TIMEOUT) -> Optional[float]:
+        """
+        等待屏幕刷新完成
+        :param timeout: 超时时间（秒）
+        :return: 刷新耗时（秒），超时返回 None
+        """
+        start = time.monotonic()
+        deadline = start + timeout
+        method = "surface"
+        try:
+            if self._surface_flinger_supported():
+                settled, polls = self._wait_surface_quiet(deadline)
+            else:
+                method = "frame"
+                self._open_stream()
+                try:
+                    settled, polls = self._wait_frames_static(deadline)
+                finally:
+                    self._close_stream()
+        except Exception as e:
+            logger.warning(f"显示稳定检测失败: {e}")
+            return None
+        duration = time.monotonic() - start
+        record_wait(f"显示稳定({method})", timeout, duration, polls, settled)
+        if not settled:
+            logger.warning(f"屏幕在 {timeout}s 内未稳定")
+            return None
+        _refresh_durations.append(duration)
+        logger.debug(f"屏幕刷新完成，耗时 {duration:.3f}s（{method}，探测 {polls} 次）")
+        return duration
@@ -0,0 +1,284 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# 下载状态
+STATE_DOWNLOADING = "下载中"
+STATE_RETRY = "重试"
+STATE_DONE = "打开"
+STATE_UNKNOWN = "未知"
+# 终止状态：到达后不再变化
+TERMINAL_STATES = (STATE_RETRY, STATE_DONE)
+
+PROGRESS_PATTERN = re.compile(r'(\d+)%')
+
+# 默认采样间隔范围（秒）：进度变化时加快采样，长时间无变化时放慢
+MIN_SAMPLE_INTERVAL = 0.5
+MAX_SAMPLE_INTERVAL = 5.0
+# 默认最长监控时间（秒）
+DEFAULT_MONITOR_TIMEOUT = 1800
+
+# 当前用例中运行过的下载监控，用例失败时导出其时间线
+_test_monitors: List["DownloadMonitor"] = []
+
+
+class DownloadSample(NamedTuple):
+    """单次采样"""
+    elapsed: float
+    state: str
+    percent: Optional[int]
+    raw: str
+
+
+def parse_download_status(text: Optional[str]):
+    """
+    解析下载状态文本
+    :param text: 状态文本，如 "下载中43%"、"重试"、"打开"
+    :return: (状态, 进度百分比)
+    """
+    if not text:
+        return STATE_UNKNOWN, None
+    if STATE_DOWNLOADING in text:
+        match = PROGRESS_PATTERN.search(text)
+        return STATE_DOWNLOADING, int(match.group(1)) if match else None
+    if STATE_RETRY in text:
+        return STATE_RETRY, None
+    if STATE_DONE in text:
+        return STATE_DONE, 100
+    return STATE_UNKNOWN, None
+
+
+class FileTimeline:
+    """单个文件的下载时间线（只记录状态或进度发生变化的采样）"""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.samples: List[DownloadSample] = []
+    
+    def add(self, sample: DownloadSample) -> bool:
+        """记录采样，返回状态或进度是否发生变化"""
+        if self.samples and self.samples[-1][1:3] == sample[1:3]:
+            return False
+        self.samples.append(sample)
+        return True
+    
+    @property
+    def last(self) -> Optional[DownloadSample]:
+        return self.samples[-1] if self.samples else None
+    
+    @property
+    def terminal(self) -> bool:
+        return self.last is not None and self.last.state in TERMINAL_STATES
+    
+    @property
+    def percent(self) -> Optional[int]:
+        return self.last.percent if self.last else None
+    
+    def rate(self) -> Optional[float]:
+        """平均下载速率（百分比/秒），按首个有进度的采样到最新有进度的采样计算"""
+        progress = [sample for sample in self.samples if sample.percent is not None]
+        if len(progress) < 2:
+            return None
+        first, last = progress[0], progress[-1]
+        duration = last.elapsed - first.elapsed
+        if duration <= 0 or last.percent <= first.percent:
+            return None
+        return (last.percent - first.percent) / duration
+    
+    def eta(self) -> Optional[float]:
+        """预计剩余时间（秒）"""
+        if self.terminal:
+            return 0.0
+        rate = self.rate()
+        if not rate or self.percent is None:
+            return None
+        return (100 - self.percent) / rate
+    
+    def progress_value(self):
+        """兼容旧接口的进度值：下载中为百分比，完成为100，重试为"重试"，未知为None"""
+        last = self.last
+        if last is None:
+            return None
+        if last.state == STATE_RETRY:
+            return STATE_RETRY
+        return last.percent
+    
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "final_state": self.last.state if self.last else None,
+            "rate_percent_per_s": self.rate(),
+            "samples": [sample._asdict() for sample in self.samples],
+        }
+
+
+class DownloadMonitor:
+    """
+    下载进度监控：按自适应间隔采样状态，生成每个文件的时间线，
+    所有文件到达终止状态（打开/重试）后立即返回
+    """
+    
+    def __init__(self, read_statuses: Callable[[], Dict[str, str]], filenames: List[str],
+                 timeout: float = DEFAULT_MONITOR_TIMEOUT, min_interval: float = MIN_SAMPLE_INTERVAL,
+                 max_interval: float = MAX_SAMPLE_INTERVAL, wake_event: Optional[threading.Event] = None):
+        """
+        :param read_statuses: 读取当前状态的函数，返回 {文件名: 状态文本}
+        :param filenames: 监控的文件名列表
+        :param timeout: 最长监控时间（秒）
+        :param min_interval: 最小采样间隔（秒）
+        :param max_interval: 最大采样间隔（秒）
+        :param wake_event: 可选，被设置时立即采样（如设备日志中的下载完成事件）
+        """
+        self.read_statuses = read_statuses
+        self.filenames = list(filenames)
+        self.timeout = timeout
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.wake_event = wake_event
+        self.timelines: Dict[str, FileTimeline] = {name: FileTimeline(name) for name in self.filenames}
+        self.sample_count = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+    
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+    
+    @property
+    def all_terminal(self) -> bool:
+        return all(timeline.terminal for timeline in self.timelines.values())
+    
+    def sample(self) -> bool:
+        """
+        采样一次
+        :return: 是否有文件的状态或进度发生变化
+        """
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+        statuses = self.read_statuses()
+        elapsed = time.monotonic() - self.started_at
+        self.sample_count += 1
+        changed = False
+        for name in self.filenames:
+            # 本次未读到的文件（如不在已扫描的页中）不记录采样，避免未知状态打断进度与速率计算
+            if self.timelines[name].terminal or name not in statuses:
+                continue
+            raw = statuses[name]
+            state, percent = parse_download_status(raw)
+            if self.timelines[name].add(DownloadSample(round(elapsed, 3), state, percent, raw or "")):
+                changed = True
+                self._log_change(name, state, percent)
+        return changed
+    
+    def _log_change(self, name: str, state: str, percent: Optional[int]):
+        if state == STATE_DOWNLOADING:
+            eta = self.timelines[name].eta()
+            eta_text = f"，预计剩余 {eta:.0f}s" if eta is not None else ""
+            logger.info(f"文件{name}下载中，进度：{percent}%{eta_text}")
+        elif state == STATE_DONE:
+            logger.info(f"文件{name}下载完成")
+        elif state == STATE_RETRY:
+            logger.warning(f"文件{name}需要重试下载")
+    
+    def next_interval(self, changed: bool, interval: float) -> float:
+        """进度有变化时回到最小间隔；无变化时逐步放慢，且不超过最近完成文件的预计剩余时间"""
+        if changed:
+            interval = self.min_interval
+        else:
+            interval = min(interval * 1.5, self.max_interval)
+        etas = [eta for eta in (timeline.eta() for timeline in self.timelines.values()
+                                if not timeline.terminal) if eta is not None]
+        if etas:
+            interval = min(interval, max(self.min_interval, min(etas) / 2))
+        return interval
+    
+    def run(self) -> Dict[str, object]:
+        """
+        持续采样直到所有文件到达终止状态或超时
+        :return: {文件名: 进度值}，与 progress_dict() 相同
+        """
+        _test_monitors.append(self)
+        self.started_at = time.monotonic()
+        self.finished_at = None
+        interval = self.min_interval
+        deadline = self.started_at + self.timeout
+        while True:
+            try:
+                changed = self.sample()
+            except Exception as e:
+                # 界面刷新瞬间可能读取失败，下一次采样重试
+                logger.debug(f"下载状态采样失败: {e}")
+                changed = False
+            if self.all_terminal:
+                break
+            if time.monotonic() + interval > deadline:
+                logger.warning(f"下载监控超时（{self.timeout}s），未完成：{self.pending()}")
+                break
+            interval = self.next_interval(changed, interval)
+            if self.wake_event is not None:
+                if self.wake_event.wait(interval):
+                    self.wake_event.clear()
+                    logger.debug("收到下载完成事件，立即采样")
+            else:
+                time.sleep(interval)
+        self.finished_at = time.monotonic()
+        logger.info(f"下载监控结束：采样 {self.sample_count} 次，耗时 {self.elapsed:.1f}s，"
+                    f"总速率 {self.aggregate_rate() or 0:.2f}%/s")
+        return self.progress_dict()
+    
+    def pending(self) -> List[str]:
+        return [name for name, timeline in self.timelines.items() if not timeline.terminal]
+    
+    def progress_dict(self) -> Dict[str, object]:
+        return {name: timeline.progress_value() for name, timeline in self.timelines.items()}
+    
+    def aggregate_rate(self) -> Optional[float]:
+        """所有文件的总下载速率（百分比/秒之和）"""
+        rates = [rate for rate in (timeline.rate() for timeline in self.timelines.values()) if rate]
+        return sum(rates) if rates else None
+    
+    def aggregate_eta(self) -> Optional[float]:
+        """全部完成的预计剩余时间（秒），取未完成文件 ETA 的最大值"""
+        etas = [timeline.eta() for timeline in self.timelines.values() if not timeline.terminal]
+        if not etas:
+            return 0.0
+        if any(eta is None for eta in etas):
+            return None
+        return max(etas)
+    
+    def to_dict(self) -> dict:
+        return {
+            "elapsed_s": round(self.elapsed, 3),
+            "sample_count": self.sample_count,
+            "aggregate_rate_percent_per_s": self.aggregate_rate(),
+            "files": [timeline.to_dict() for timeline in self.timelines.values()],
+        }
+    
+    def export(self, path: str) -> str:
+        """
+        导出时间线为 JSON（用于大文件下载吞吐分析）
+        :param path: 输出文件路径
+        :return: 输出文件路径
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, ensure_ascii=False, indent=2)
+        logger.info(f"下载时间线已导出: {path}")
+        return path
+
+
+def pop_test_monitors() -> List[DownloadMonitor]:
+    """取出并清空当前用例中运行过的下载监控"""
+    monitors = list(_test_monitors)
+    _test_monitors.clear()
+    return monitors
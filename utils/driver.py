@@ -1,36 +1,51 @@
 import logging
 import os
+from typing import Optional
 
 from appium import webdriver
 from appium.options.android import UiAutomator2Options
 
 from utils.config_loader import load_yaml_config
+from utils.device_pool import DeviceSlot
+from utils.driver_memo import memo_current_package
+from utils.wait_engine import disable_implicit_wait
 
 config_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../config/config.yaml'))
 config = load_yaml_config(config_path)
 logger = logging.getLogger(__name__)
 
 
-def init_driver():
+def init_driver(device: Optional[DeviceSlot] = None, server_url: Optional[str] = None):
+    """
+    创建 Appium 会话并校验目标 App
+    :param device: 设备池中租用的设备（多设备并行时指定序列号与设备端端口），None 使用配置中的设备
+    :param server_url: Appium 服务地址，None 时使用设备对应端口或 appium.server_url
+    :return: driver对象
+    """
     # 创建选项对象
     options = UiAutomator2Options()
     # 从配置加载设备能力
     device_config = config['device']
     for key, value in device_config.items():
         options.set_capability(key, value)
+    if device is not None:
+        for key, value in device.capabilities().items():
+            options.set_capability(key, value)
+        server_url = server_url or device.server_url
     
     # 创建驱动实例
     driver = webdriver.Remote(
-        command_executor=config['appium']['server_url'],
+        command_executor=server_url or config['appium']['server_url'],
         options=options
     )
     
     # 验证：是否成功启动目标 App（通过 appPackage 校验当前运行的 App）
-    current_app = driver.current_package
+    current_app = memo_current_package(driver)
     target_app = device_config.get('appPackage')
     if current_app != target_app:
         logger.error(f"初始化失败：当前运行的 App 是 {current_app}，目标 App 是 {target_app}")
         raise Exception(f"App 上下文错误：未启动目标 App {target_app}")
     logger.info(f"初始化成功：已启动目标 App {target_app}")
-    driver.implicitly_wait(10)
+    # 所有等待均为显式等待，隐式等待只在此处关闭一次（避免两种等待叠加，也不再每次等待前后切换）
+    disable_implicit_wait(driver)
     return driver
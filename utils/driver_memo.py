@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 会话级缓存：整个会话内不变（窗口尺寸、能力集）
+SESSION_SCOPE = "session"
+# 界面级缓存：当前“界面纪元”内有效，任何可能改变界面的操作都会使其失效
+SCREEN_SCOPE = "screen"
+
+
+class DriverMemo:
+    """
+    driver 幂等查询的缓存层
+    界面纪元（epoch）：每次点击、输入、返回、手势、切换应用等操作后加一，界面级缓存随之清空
+    """
+    
+    def __init__(self):
+        self.epoch = 0
+        # 最近一次改变界面的操作开始时间（time.time()），用于确定操作触发的设备端事件的起点
+        self.action_started_at = 0.0
+        # 缓存项为 (值, 写入时间 time.monotonic())
+        self._session: Dict[Hashable, Tuple[Any, float]] = {}
+        self._screen: Dict[Hashable, Tuple[Any, float]] = {}
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+        self._lock = threading.Lock()
+    
+    def _store(self, scope: str) -> Dict[Hashable, Tuple[Any, float]]:
+        if scope == SESSION_SCOPE:
+            return self._session
+        if scope == SCREEN_SCOPE:
+            return self._screen
+        raise ValueError(f"不支持的缓存范围: {scope}")
+    
+    @staticmethod
+    def _name(key: Hashable) -> str:
+        return key[0] if isinstance(key, tuple) else str(key)
+    
+    def get(self, key: Hashable, compute: Callable[[], Any], scope: str = SCREEN_SCOPE,
+            max_age: Optional[float] = None, refresh: bool = False) -> Any:
+        """
+        读取缓存，未命中时调用 compute 计算并缓存（None 结果不缓存）
+        :param key: 缓存键，元组时第一个元素作为统计名称
+        :param compute: 实际查询函数
+        :param scope: session / screen
+        :param max_age: 最长复用时间（秒），超过后重新查询；用于界面会自行变化（不经过操作）的值
+        :param refresh: 忽略已缓存的值重新查询（轮询等待变化时使用），结果仍写入缓存
+        :return: 查询结果
+        """
+        store = self._store(scope)
+        with self._lock:
+            entry = None if refresh else store.get(key)
+            if entry is not None and (max_age is None or time.monotonic() - entry[1] <= max_age):
+                self.hits[self._name(key)] += 1
+                return entry[0]
+            epoch = self.epoch
+        value = compute()
+        with self._lock:
+            self.misses[self._name(key)] += 1
+            # 查询期间界面发生变化时不写入，避免旧值进入新纪元
+            if value is not None and (scope == SESSION_SCOPE or epoch == self.epoch):
+                store[key] = (value, time.monotonic())
+        return value
+    
+    def put(self, key: Hashable, value: Any, scope: str = SCREEN_SCOPE):
+        """直接写入已知的值（如翻页确认时读到的页码）"""
+        with self._lock:
+            self._store(scope)[key] = (value, time.monotonic())
+    
+    def bump_epoch(self, action: bool = True):
+        """
+        界面可能发生变化：进入新纪元并清空界面级缓存
+        :param action: 是否为操作开始（操作完成后的再次失效传 False，不更新操作开始时间）
+        """
+        with self._lock:
+            self.epoch += 1
+            self._screen.clear()
+            if action:
+                self.action_started_at = time.time()
+    
+    def clear(self):
+        with self._lock:
+            self._session.clear()
+            self._screen.clear()
+    
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """命中统计 {查询名称: {"hits": n, "misses": n}}"""
+        with self._lock:
+            names = set(self.hits) | set(self.misses)
+            return {name: {"hits": self.hits[name], "misses": self.misses[name]} for name in sorted(names)}
+
+
+def get_driver_memo(driver) -> DriverMemo:
+    """获取与 driver 绑定的缓存层（同一个 driver 的所有页面对象共享）"""
+    memo = getattr(driver, "_driver_memo", None)
+    if memo is None:
+        memo = DriverMemo()
+        driver._driver_memo = memo
+    return memo
+
+
+def bump_screen_epoch(driver, action: bool = True):
+    get_driver_memo(driver).bump_epoch(action)
+
+
+def memo_window_size(driver) -> dict:
+    return get_driver_memo(driver).get("window_size", driver.get_window_size, SESSION_SCOPE)
+
+
+def memo_current_package(driver) -> str:
+    return get_driver_memo(driver).get("current_package", lambda: driver.current_package)
+
+
+def memo_current_activity(driver, refresh: bool = False) -> str:
+    """
+    当前 Activity（界面纪元内缓存）
+    :param refresh: 轮询等待 Activity 变化时传 True，每次重新查询并更新缓存
+    """
+    return get_driver_memo(driver).get("current_activity", lambda: driver.current_activity, refresh=refresh)
+
+
+def log_memo_stats(driver):
+    """输出缓存命中统计"""
+    memo = getattr(driver, "_driver_memo", None)
+    if memo is None:
+        return
+    for name, counts in memo.stats().items():
+        logger.info(f"driver缓存 {name}: 命中 {counts['hits']} 次，未命中 {counts['misses']} 次")
@@ -0,0 +1,236 @@
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from appium.webdriver.common.appiumby import AppiumBy
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from utils.wait_engine import DEFAULT_TIMEOUT, AdaptiveWait
+
+logger = logging.getLogger(__name__)
+
+# 服务端未开启 execute_driver（未加 --allow-insecure=execute_driver_script 或未安装插件）时的错误特征
+UNSUPPORTED_MARKERS = (
+    "execute_driver_script",
+    "execute-driver",
+    "insecure",
+    "unknown command",
+    "not implemented",
+    "notimplemented",
+    "not yet implemented",
+)
+
+
+class DriverScriptError(Exception):
+    """服务端脚本执行失败（脚本本身出错，例如元素未找到）"""
+
+
+def _is_unsupported(error: Exception) -> bool:
+    message = str(error).lower()
+    return any(marker in message for marker in UNSUPPORTED_MARKERS)
+
+
+def _ui_selector_string(value: str) -> str:
+    """转义 UiSelector 字符串参数中的反斜杠与双引号"""
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def to_wdio_selector(locator) -> str:
+    """
+    将定位器元组转换为 WebdriverIO 选择器
+    :param locator: (By, value)
+    :return: 选择器字符串
+    """
+    locator_type, locator_value = locator
+    if locator_type in (AppiumBy.ID, "id"):
+        return f"id={locator_value}"
+    if locator_type == AppiumBy.XPATH:
+        return locator_value
+    if locator_type == AppiumBy.ANDROID_UIAUTOMATOR:
+        return f"android={locator_value}"
+    if locator_type == AppiumBy.ACCESSIBILITY_ID:
+        return f"~{locator_value}"
+    if locator_type == AppiumBy.CLASS_NAME:
+        return f'android=new UiSelector().className("{_ui_selector_string(locator_value)}")'
+    raise ValueError(f"服务端脚本不支持的定位器类型: {locator_type}")
+
+
+def text_in_locator(locator, text: str) -> Tuple[str, str]:
+    """
+    构造“某个 id 下文本等于 text 的元素”定位器（用于按名称点击列表项）
+    :param locator: 名称元素定位器，仅支持 id
+    :param text: 文本内容
+    :return: UiAutomator 定位器元组
+    """
+    locator_type, locator_value = locator
+    if locator_type not in (AppiumBy.ID, "id"):
+        raise ValueError(f"按文本点击仅支持 id 定位器: {locator}")
+    resource_id = locator_value if ":id/" in locator_value else f".*:id/{locator_value}"
+    selector = (f'new UiSelector().resourceIdMatches("{_ui_selector_string(resource_id)}")'
+                f'.text("{_ui_selector_string(text)}")')
+    return AppiumBy.ANDROID_UIAUTOMATOR, selector
+
+
+class DriverScript:
+    """
+    页面操作步骤的批量脚本：编译为一个 execute_driver（WebdriverIO）脚本在服务端执行，
+    一次 HTTP 请求完成全部步骤并返回结构化结果；服务端不支持时逐步在本地执行
+    
+    用法:
+        script = DriverScript("搜索文件")
+        script.input_text(search_et, "abc").click(search_btn).get_text(page_tv, "page")
+        result = script.run(driver)  # {"page": "1/3"}
+    """
+    
+    def __init__(self, name: str = "driver_script", timeout: Optional[float] = None):
+        self.name = name
+        self.timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+        self.steps: List[Dict[str, Any]] = []
+    
+    def __len__(self):
+        return len(self.steps)
+    
+    def _add(self, op: str, locator=None, key: Optional[str] = None, **kwargs) -> "DriverScript":
+        self.steps.append(dict(op=op, locator=locator, key=key, **kwargs))
+        return self
+    
+    def click(self, locator) -> "DriverScript":
+        return self._add("click", locator)
+    
+    def click_text(self, locator, text: str) -> "DriverScript":
+        """点击 id 为 locator 且文本等于 text 的元素"""
+        return self._add("click", text_in_locator(locator, text))
+    
+    def input_text(self, locator, text: str) -> "DriverScript":
+        return self._add("input", locator, text=text)
+    
+    def wait_for(self, locator, timeout: Optional[float] = None) -> "DriverScript":
+        return self._add("wait", locator, timeout=self.timeout if timeout is None else timeout)
+    
+    def wait_for_text(self, locator, text: str, timeout: Optional[float] = None) -> "DriverScript":
+        """等待 id 为 locator 且文本等于 text 的元素出现（确认跳转到了指定的目标）"""
+        return self.wait_for(text_in_locator(locator, text), timeout)
+    
+    def get_text(self, locator, key: str) -> "DriverScript":
+        return self._add("text", locator, key)
+    
+    def get_texts(self, locator, key: str) -> "DriverScript":
+        return self._add("texts", locator, key)
+    
+    def get_attribute(self, locator, attribute: str, key: str) -> "DriverScript":
+        return self._add("attribute", locator, key, attribute=attribute)
+    
+    def pause(self, seconds: float) -> "DriverScript":
+        return self._add("pause", seconds=seconds)
+    
+    def back(self) -> "DriverScript":
+        return self._add("back")
+    
+    def to_webdriverio(self) -> str:
+        """编译为 WebdriverIO 脚本"""
+        timeout_ms = int(self.timeout * 1000)
+        lines = [
+            "const result = {};",
+            "const find = async (selector, timeout) => {",
+            "  const el = await driver.$(selector);",
+            "  await el.waitForExist({ timeout });",
+            "  return el;",
+            "};",
+        ]
+        for index, step in enumerate(self.steps):
+            op = step["op"]
+            selector = json.dumps(to_wdio_selector(step["locator"])) if step["locator"] is not None else None
+            key = json.dumps(step["key"]) if step["key"] is not None else None
+            if op == "click":
+                lines.append(f"await (await find({selector}, {timeout_ms})).click();")
+            elif op == "input":
+                lines.append(f"await (await find({selector}, {timeout_ms})).setValue({json.dumps(step['text'])});")
+            elif op == "wait":
+                lines.append(f"await find({selector}, {int(step['timeout'] * 1000)});")
+            elif op == "text":
+                lines.append(f"result[{key}] = await (await find({selector}, {timeout_ms})).getText();")
+            elif op == "texts":
+                # 列表可以为空：等待第一个元素出现，超时不报错
+                lines.append(f"await (await driver.$({selector})).waitForExist({{ timeout: {timeout_ms} }})"
+                             f".catch(() => {{}});")
+                lines.append(f"const els{index} = await driver.$$({selector});")
+                lines.append(f"result[{key}] = [];")
+                lines.append(f"for (const el of els{index}) {{ result[{key}].push(await el.getText()); }}")
+            elif op == "attribute":
+                attribute = json.dumps(step["attribute"])
+                lines.append(f"result[{key}] = await (await find({selector}, {timeout_ms})).getAttribute({attribute});")
+            elif op == "pause":
+                lines.append(f"await driver.pause({int(step['seconds'] * 1000)});")
+            elif op == "back":
+                lines.append("await driver.back();")
+        lines.append("return result;")
+        return "\n".join(lines)
+    
+    def run(self, driver, prefer_server: bool = True) -> Dict[str, Any]:
+        """
+        执行脚本
+        :param driver: Appium driver
+        :param prefer_server: 是否优先在服务端执行
+        :return: 结果字典 {key: 值}
+        """
+        start = time.monotonic()
+        if prefer_server and getattr(driver, "_driver_script_supported", True):
+            try:
+                response = driver.execute_driver(script=self.to_webdriverio(), script_type="webdriverio",
+                                                 timeout_ms=int((self.timeout * len(self.steps) + 10) * 1000))
+                result = response.result or {}
+                logger.info(f"服务端脚本[{self.name}]执行完成: {len(self.steps)} 步，"
+                            f"耗时 {time.monotonic() - start:.3f}s")
+                return result
+            except (AttributeError, WebDriverException) as e:
+                if isinstance(e, WebDriverException) and not _is_unsupported(e):
+                    logger.error(f"服务端脚本[{self.name}]执行失败: {e}")
+                    raise DriverScriptError(str(e)) from e
+                # 记住服务端不支持，后续脚本直接本地执行
+                driver._driver_script_supported = False
+                logger.warning(f"服务端不支持 execute_driver，改为逐步执行: {e}")
+        result = self.run_steps(driver)
+        logger.info(f"脚本[{self.name}]逐步执行完成: {len(self.steps)} 步，耗时 {time.monotonic() - start:.3f}s")
+        return result
+    
+    def run_steps(self, driver) -> Dict[str, Any]:
+        """逐步在本地执行（服务端不支持时的回退）"""
+        result = {}
+        for step in self.steps:
+            op, locator, key = step["op"], step["locator"], step["key"]
+            if op == "click":
+                self._find(driver, locator).click()
+            elif op == "input":
+                element = self._find(driver, locator)
+                element.clear()
+                element.send_keys(step["text"])
+            elif op == "wait":
+                self._find(driver, locator, step["timeout"])
+            elif op == "text":
+                result[key] = self._find(driver, locator).text
+            elif op == "texts":
+                result[key] = [element.text for element in self._find_all(driver, locator)]
+            elif op == "attribute":
+                result[key] = self._find(driver, locator).get_attribute(step["attribute"])
+            elif op == "pause":
+                time.sleep(step["seconds"])
+            elif op == "back":
+                driver.back()
+        return result
+    
+    def _find(self, driver, locator, timeout: Optional[float] = None):
+        return AdaptiveWait(driver, self.timeout if timeout is None else timeout).until(
+            lambda d: d.find_element(*locator),
+            f"脚本[{self.name}]等待元素: {locator}"
+        )
+    
+    def _find_all(self, driver, locator) -> list:
+        """等待至少一个元素出现后返回全部元素，超时返回空列表（会话未开启隐式等待）"""
+        try:
+            return AdaptiveWait(driver, self.timeout).until(
+                lambda d: d.find_elements(*locator),
+                f"脚本[{self.name}]等待元素列表: {locator}"
+            )
+        except TimeoutException:
+            return []
@@ -0,0 +1,329 @@
+import html
+import logging
+import os
+import sqlite3
+import statistics
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from common.device_info import get_app_version, get_hardware_version
+from utils.config_loader import load_yaml_config
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+config_path = os.path.join(BASE_DIR, 'config', 'config.yaml')
+_config = load_yaml_config(config_path)
+history_config = _config.get('duration_history') or {}
+APP_PACKAGE = (_config.get('device') or {}).get('appPackage')
+
+# 历史库路径（多个工作进程可同时写入）
+HISTORY_PATH = os.path.join(BASE_DIR, history_config.get('path', 'reports/duration_history.sqlite3'))
+# 趋势页路径
+TREND_PAGE_PATH = os.path.join(BASE_DIR, history_config.get('trend_page', 'reports/duration_trends.html'))
+# 基线：同一用例、同一硬件版本最近 n 次通过的耗时
+BASELINE_RUNS = int(history_config.get('baseline_runs', 20))
+# 基线样本少于该数量时不判定变慢
+MIN_SAMPLES = int(history_config.get('min_samples', 5))
+# 稳健 z 分数阈值：(本次 - 中位数) / (1.4826 * MAD)
+Z_THRESHOLD = float(history_config.get('z_threshold', 3.5))
+# 同时要求本次耗时至少为基线中位数的倍数，避免极稳定用例的微小波动被判定变慢
+MIN_RATIO = float(history_config.get('min_ratio', 1.2))
+# 趋势页每个用例显示的最近次数
+TREND_RUNS = int(history_config.get('trend_runs', 30))
+# 没有历史记录的用例按该耗时（秒）参与分片（有历史时取已知用例耗时的中位数）
+DEFAULT_DURATION = 30.0
+# MAD 为 0（基线完全一致）时使用的最小离散度（秒）
+MIN_SPREAD = 0.05
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS durations (
+    run_id TEXT NOT NULL,
+    node_id TEXT NOT NULL,
+    hardware TEXT NOT NULL,
+    app_version TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    duration REAL NOT NULL,
+    round_trips INTEGER NOT NULL,
+    outcome TEXT NOT NULL,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_durations_node ON durations (node_id, hardware, phase, recorded_at);
+CREATE INDEX IF NOT EXISTS idx_durations_run ON durations (run_id);
+"""
+
+
+def history_enabled() -> bool:
+    """耗时历史开关：config.yaml 中 duration_history.enabled，且环境变量 ENABLE_DURATION_HISTORY 未关闭"""
+    if os.environ.get('ENABLE_DURATION_HISTORY', 'true').lower() != 'true':
+        return False
+    return bool(history_config.get('enabled', True))
+
+
+def current_versions(device_id: Optional[str] = None) -> Tuple[str, str]:
+    """
+    历史记录的分组维度
+    :param device_id: 设备序列号
+    :return: (硬件版本, 被测应用版本)
+    """
+    return get_hardware_version(device_id), get_app_version(APP_PACKAGE, device_id)
+
+
+class DurationRecord(NamedTuple):
+    """一个用例一个阶段的一次耗时"""
+    run_id: str
+    node_id: str
+    hardware: str
+    app_version: str
+    phase: str
+    duration: float
+    round_trips: int
+    outcome: str
+    recorded_at: float
+
+
+class Regression(NamedTuple):
+    """相对基线显著变慢的用例阶段"""
+    node_id: str
+    hardware: str
+    phase: str
+    duration: float
+    baseline: float
+    samples: int
+    score: float
+    
+    @property
+    def ratio(self) -> float:
+        return self.duration / self.baseline if self.baseline else float("inf")
+
+
+def robust_score(value: float, samples: Sequence[float]) -> Tuple[float, float]:
+    """
+    稳健 z 分数（中位数与 MAD 不受个别异常耗时影响）
+    :param value: 本次耗时
+    :param samples: 基线耗时
+    :return: (基线中位数, z 分数)
+    """
+    median = statistics.median(samples)
+    mad = statistics.median(abs(sample - median) for sample in samples)
+    spread = max(1.4826 * mad, MIN_SPREAD)
+    return median, (value - median) / spread
+
+
+class DurationHistory:
+    """
+    用例耗时历史：按用例、硬件版本、应用版本记录各阶段耗时与往返次数（SQLite，WAL 模式支持多进程写入）
+    用于按历史耗时均衡分片、检测相对滚动基线的显著变慢，以及生成静态趋势页
+    """
+    
+    def __init__(self, path: str = HISTORY_PATH):
+        self.path = path
+        self._pending: List[DurationRecord] = []
+        self._lock = threading.Lock()
+    
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        return conn
+    
+    # ---------- 记录 ----------
+    
+    def add(self, run_id: str, node_id: str, hardware: str, app_version: str, phase: str,
+            duration: float, round_trips: int = 0, outcome: str = "passed"):
+        """暂存一条记录（flush 时批量写入）"""
+        with self._lock:
+            self._pending.append(DurationRecord(run_id, node_id, hardware, app_version, phase,
+                                                duration, round_trips, outcome, time.time()))
+    
+    def flush(self) -> int:
+        """
+        写入暂存的记录
+        :return: 写入条数
+        """
+        with self._lock:
+            records, self._pending = self._pending, []
+        if not records:
+            return 0
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany("INSERT INTO durations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", records)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"写入耗时历史失败: {e}")
+            return 0
+        return len(records)
+    
+    def _query(self, sql: str, params: Sequence = ()) -> List[tuple]:
+        if not os.path.exists(self.path):
+            return []
+        try:
+            conn = self._connect()
+            try:
+                return conn.execute(sql, params).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"读取耗时历史失败: {e}")
+            return []
+    
+    # ---------- 分片 ----------
+    
+    def expected_durations(self, hardware: Optional[str] = None, runs: int = BASELINE_RUNS) -> Dict[str, float]:
+        """
+        各用例的预期耗时：最近 n 次通过的总耗时中位数
+        :param hardware: 硬件版本，None 表示不区分
+        :param runs: 取最近的次数
+        :return: {用例 node id: 秒}
+        """
+        sql = "SELECT node_id, duration FROM durations WHERE phase = 'total' AND outcome = 'passed'"
+        params: List[str] = []
+        if hardware is not None:
+            sql += " AND hardware = ?"
+            params.append(hardware)
+        samples: Dict[str, List[float]] = defaultdict(list)
+        for node_id, duration in self._query(sql + " ORDER BY recorded_at DESC", params):
+            if len(samples[node_id]) < runs:
+                samples[node_id].append(duration)
+        return {node_id: statistics.median(values) for node_id, values in samples.items()}
+    
+    def balanced_shards(self, node_ids: Iterable[str], shard_count: int,
+                        hardware: Optional[str] = None) -> List[List[str]]:
+        """
+        按历史耗时均衡分片（最长处理时间优先：耗时长的用例先分配到当前总耗时最少的分片）
+        :param node_ids: 用例 node id
+        :param shard_count: 分片数
+        :param hardware: 硬件版本
+        :return: 各分片的用例列表（保持输入顺序）
+        """
+        node_ids = list(node_ids)
+        expected = self.expected_durations(hardware)
+        fallback = statistics.median(expected.values()) if expected else DEFAULT_DURATION
+        weights = {node_id: expected.get(node_id, fallback) for node_id in node_ids}
+        loads = [0.0] * shard_count
+        assignment: Dict[str, int] = {}
+        for node_id in sorted(node_ids, key=lambda n: (-weights[n], n)):
+            shard = loads.index(min(loads))
+            assignment[node_id] = shard
+            loads[shard] += weights[node_id]
+        logger.info(f"按历史耗时分片: {shard_count} 片，预计耗时 {[round(load, 1) for load in loads]}s")
+        return [[node_id for node_id in node_ids if assignment[node_id] == shard] for shard in range(shard_count)]
+    
+    # ---------- 变慢检测 ----------
+    
+    def baseline(self, node_id: str, hardware: str, phase: str, exclude_run: str,
+                 runs: int = BASELINE_RUNS) -> List[float]:
+        """同一用例、硬件版本、阶段最近 n 次通过的耗时（不含本次运行）"""
+        rows = self._query(
+            "SELECT duration FROM durations WHERE node_id = ? AND hardware = ? AND phase = ? "
+            "AND outcome = 'passed' AND run_id != ? ORDER BY recorded_at DESC LIMIT ?",
+            (node_id, hardware, phase, exclude_run, runs)
+        )
+        return [row[0] for row in rows]
+    
+    def detect_regressions(self, run_id: str, z_threshold: float = Z_THRESHOLD,
+                           min_ratio: float = MIN_RATIO) -> List[Regression]:
+        """
+        检测本次运行中相对基线显著变慢的用例阶段（只检查通过的用例）
+        :param run_id: 运行 ID
+        :param z_threshold: 稳健 z 分数阈值
+        :param min_ratio: 最小变慢倍数
+        :return: Regression列表，按 z 分数从高到低
+        """
+        regressions = []
+        rows = self._query("SELECT node_id, hardware, phase, duration FROM durations "
+                           "WHERE run_id = ? AND outcome = 'passed'", (run_id,))
+        for node_id, hardware, phase, duration in rows:
+            samples = self.baseline(node_id, hardware, phase, run_id)
+            if len(samples) < MIN_SAMPLES:
+                continue
+            median, score = robust_score(duration, samples)
+            if score >= z_threshold and duration >= median * min_ratio:
+                regressions.append(Regression(node_id, hardware, phase, duration, median, len(samples), score))
+        return sorted(regressions, key=lambda regression: -regression.score)
+    
+    # ---------- 趋势页 ----------
+    
+    def trends(self, runs: int = TREND_RUNS) -> Dict[Tuple[str, str], List[tuple]]:
+        """
+        各用例最近 n 次的总耗时
+        :return: {(用例, 硬件版本): [(记录时间, 应用版本, 耗时, 往返次数, 结果)]}，按时间升序
+        """
+        series: Dict[Tuple[str, str], List[tuple]] = defaultdict(list)
+        rows = self._query("SELECT node_id, hardware, recorded_at, app_version, duration, round_trips, outcome "
+                           "FROM durations WHERE phase = 'total' ORDER BY recorded_at DESC")
+        for node_id, hardware, *point in rows:
+            if len(series[(node_id, hardware)]) < runs:
+                series[(node_id, hardware)].append(tuple(point))
+        return {key: points[::-1] for key, points in series.items()}
+    
+    def render_trend_page(self, path: str = TREND_PAGE_PATH, regressions: Sequence[Regression] = ()) -> str:
+        """
+        生成静态趋势页（内联 SVG 折线，无外部依赖）
+        :param path: 输出路径
+        :param regressions: 本次检测到的变慢，在页面中高亮
+        :return: 输出路径
+        """
+        flagged = {(regression.node_id, regression.hardware) for regression in regressions}
+        rows = []
+        for (node_id, hardware), points in sorted(self.trends().items(),
+                                                  key=lambda item: ((item[0][0], item[0][1]) not in flagged, item[0])):
+            durations = [point[2] for point in points]
+            latest = points[-1]
+            median = statistics.median(durations)
+            css = ' class="slow"' if (node_id, hardware) in flagged else ""
+            rows.append(
+                f"<tr{css}><td>{html.escape(node_id)}</td><td>{html.escape(hardware)}</td>"
+                f"<td>{html.escape(latest[1])}</td><td>{latest[2]:.2f}</td><td>{median:.2f}</td>"
+                f"<td>{latest[3]}</td><td>{html.escape(latest[4])}</td><td>{self._sparkline(durations)}</td></tr>"
+            )
+        content = f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>用例耗时趋势</title>
+<style>
+body {{ font-family: sans-serif; font-size: 13px; }}
+table {{ border-collapse: collapse; }}
+td, th {{ border: 1px solid #ccc; padding: 2px 6px; }}
+tr.slow {{ background: #fdd; }}
+polyline {{ fill: none; stroke: #36c; stroke-width: 1.5; }}
+</style></head><body>
+<h2>用例耗时趋势（最近 {TREND_RUNS} 次）</h2>
+<p>生成时间: {time.strftime("%Y-%m-%d %H:%M:%S")}，本次变慢 {len(flagged)} 个（红色）</p>
+<table><tr><th>用例</th><th>硬件版本</th><th>应用版本</th><th>最近耗时(s)</th><th>中位数(s)</th>
+<th>往返次数</th><th>结果</th><th>趋势</th></tr>
+{chr(10).join(rows)}
+</table></body></html>
+"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
+    
+    @staticmethod
+    def _sparkline(values: Sequence[float], width: int = 160, height: int = 30) -> str:
+        if len(values) < 2:
+            return ""
+        low, high = min(values), max(values)
+        span = (high - low) or 1.0
+        step = width / (len(values) - 1)
+        points = " ".join(f"{index * step:.1f},{height - (value - low) / span * height:.1f}"
+                          for index, value in enumerate(values))
+        return f'<svg width="{width}" height="{height}"><polyline points="{points}"/></svg>'
+
+
+_history: Optional[DurationHistory] = None
+_history_lock = threading.Lock()
+
+
+def get_duration_history() -> DurationHistory:
+    """获取进程内共享的耗时历史"""
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = DurationHistory()
+        return _history
@@ -0,0 +1,132 @@
+import logging
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from utils.ui_snapshot import UiNode
+
+logger = logging.getLogger(__name__)
+
+
+class ListRow:
+    """
+    列表中的一行（如 rootListLayout / rootLayout / layout）
+    快照行持有 UiNode，实时行持有 WebElement，两者的 get_attribute 用法一致
+    """
+    
+    __slots__ = ("index", "name", "info", "checked", "row_locator", "node", "element")
+    
+    def __init__(self, index: int, name: str, row_locator, node: Optional[UiNode] = None, element=None,
+                 info: Optional[str] = None, checked: Optional[bool] = None):
+        self.index = index
+        self.name = name
+        self.info = info
+        self.checked = checked
+        self.row_locator = row_locator
+        self.node = node
+        self.element = element
+    
+    def __repr__(self):
+        return f"ListRow({self.index}, {self.name!r}, checked={self.checked})"
+    
+    @property
+    def bounds(self) -> Optional[Tuple[int, int, int, int]]:
+        return self.node.bounds if self.node is not None else None
+    
+    @property
+    def center(self) -> Optional[Tuple[int, int]]:
+        return self.node.center if self.node is not None else None
+    
+    def child(self, locator):
+        """
+        获取行内目标元素
+        :param locator: 目标定位器；与行定位器相同时返回行本身
+        :return: UiNode / WebElement，未找到返回 None
+        """
+        if tuple(locator) == tuple(self.row_locator):
+            return self.node if self.node is not None else self.element
+        if self.node is not None:
+            return self.node.find(locator)
+        elements = self.element.find_elements(*locator)
+        return elements[0] if elements else None
+    
+    def attribute(self, locator, attribute: str) -> Optional[str]:
+        """读取行内目标元素的属性，未找到返回 None"""
+        target = self.child(locator)
+        if target is None:
+            return None
+        return target.get_attribute(attribute)
+
+
+class ListRowIndex:
+    """单页列表的行模型：一次读取所有行，按名称 O(1) 查找"""
+    
+    def __init__(self, rows: List[ListRow]):
+        self.rows = rows
+        self._by_name: Dict[str, ListRow] = {}
+        for row in rows:
+            # 同名文件保留第一行，与逐行匹配时“先到先得”的行为一致
+            self._by_name.setdefault(row.name, row)
+    
+    def __len__(self):
+        return len(self.rows)
+    
+    def __iter__(self) -> Iterator[ListRow]:
+        return iter(self.rows)
+    
+    def __contains__(self, name) -> bool:
+        return name.strip() in self._by_name
+    
+    @property
+    def names(self) -> List[str]:
+        return [row.name for row in self.rows]
+    
+    def get(self, name: str) -> Optional[ListRow]:
+        return self._by_name.get(name.strip())
+    
+    @classmethod
+    def from_nodes(cls, row_nodes: List[UiNode], row_locator, file_name_locator, info_locator=None,
+                   checkbox_locator=None) -> "ListRowIndex":
+        """
+        从界面快照构建行模型（不产生任何设备请求）
+        :param row_nodes: 行节点列表
+        :param row_locator: 行定位器
+        :param file_name_locator: 名称定位器
+        :param info_locator: 可选，信息文本定位器
+        :param checkbox_locator: 可选，复选框定位器
+        """
+        rows = []
+        for index, node in enumerate(row_nodes):
+            if not node.displayed:
+                continue
+            name_node = node.find(file_name_locator)
+            if name_node is None:
+                continue
+            info = checked = None
+            if info_locator is not None:
+                info_node = node.find(info_locator)
+                info = info_node.text.strip() if info_node is not None else None
+            if checkbox_locator is not None:
+                checkbox_node = node if tuple(checkbox_locator) == tuple(row_locator) else node.find(checkbox_locator)
+                checked = checkbox_node.checked if checkbox_node is not None else None
+            rows.append(ListRow(index, name_node.text.strip(), row_locator, node=node, info=info, checked=checked))
+        logger.debug(f"快照行模型: {len(rows)} 行")
+        return cls(rows)
+    
+    @classmethod
+    def from_elements(cls, row_elements, row_locator, file_name_locator) -> "ListRowIndex":
+        """
+        从实时元素构建行模型（快照不可用时的回退），每行只读取一次名称
+        :param row_elements: 行 WebElement 列表
+        :param row_locator: 行定位器
+        :param file_name_locator: 名称定位器
+        """
+        rows = []
+        for index, element in enumerate(row_elements):
+            try:
+                name_elements = element.find_elements(*file_name_locator)
+                if not name_elements:
+                    continue
+                rows.append(ListRow(index, name_elements[0].text.strip(), row_locator, element=element))
+            except Exception as e:
+                logger.debug(f"读取第{index + 1}行名称失败: {e}")
+        logger.debug(f"实时行模型: {len(rows)} 行")
+        return cls(rows)
@@ -0,0 +1,163 @@
+import logging
+import re
+import threading
+import time
+from typing import Callable, Dict, NamedTuple, Optional, Pattern, Set
+
+from utils.logcat_collector import LogcatCollector, LogLine, logcat_config
+from utils.wait_engine import record_wait
+
+logger = logging.getLogger(__name__)
+
+# 事件类型
+EVENT_TOAST = "toast"
+EVENT_ACTIVITY_RESUMED = "activity_resumed"
+EVENT_DOWNLOAD_COMPLETE = "download_complete"
+
+DEFAULT_EVENT_PATTERNS = {
+    EVENT_TOAST: r'enqueueToast(?:.*?text="?(?P<text>[^"\n]*))?',
+    EVENT_ACTIVITY_RESUMED: r'wm_on_resume_called: \[\d+,(?P<activity>[\w.$]+)',
+    EVENT_DOWNLOAD_COMPLETE: r'(?i)download.*(?:complete|success|finish)|下载完成',
+}
+# 事件正则，可在 config.yaml 的 logcat.events 中覆盖
+EVENT_PATTERNS: Dict[str, Pattern] = {
+    kind: re.compile(pattern)
+    for kind, pattern in {**DEFAULT_EVENT_PATTERNS, **(logcat_config.get('events') or {})}.items()
+}
+# Toast 最长显示时间（秒）：等待 Toast 时回看这段时间内已入队的 Toast
+TOAST_LOOKBACK = 3.5
+
+# 本次运行中实际观测到过的事件类型（设备系统版本不同，部分事件可能从不输出日志）
+_observed_kinds: Set[str] = set()
+
+
+def event_observed(kind: str) -> bool:
+    """该类型事件是否在本次运行中出现过（出现过才可单独依赖日志事件等待）"""
+    return kind in _observed_kinds
+
+
+class LogEvent(NamedTuple):
+    """一次设备端事件"""
+    kind: str
+    timestamp: float
+    groups: Dict[str, Optional[str]]
+    line: LogLine
+    
+    @property
+    def text(self) -> Optional[str]:
+        return self.groups.get("text")
+
+
+def match_event(kind: str, line: LogLine) -> Optional[LogEvent]:
+    """按事件正则匹配日志行"""
+    match = EVENT_PATTERNS[kind].search(line.message)
+    if match is None:
+        return None
+    return LogEvent(kind, line.timestamp, match.groupdict(), line)
+
+
+class LogEventWaiter:
+    """
+    设备端事件等待：创建时即开始监听（应在触发操作之前创建，避免错过事件），
+    并补查 since 之后已采集到的日志
+    """
+    
+    def __init__(self, collector: LogcatCollector, kind: str,
+                 predicate: Optional[Callable[[LogEvent], bool]] = None, since: Optional[float] = None):
+        """
+        :param collector: logcat 采集器
+        :param kind: 事件类型
+        :param predicate: 可选，事件过滤条件
+        :param since: 可选，补查该时间（time.time()）之后已采集的日志
+        """
+        self.collector = collector
+        self.kind = kind
+        self.predicate = predicate
+        self.event: Optional[LogEvent] = None
+        self._ready = threading.Event()
+        collector.add_listener(self._on_line)
+        if since is not None:
+            for line in collector.slice(since):
+                self._on_line(line)
+    
+    def _on_line(self, line: LogLine):
+        if self._ready.is_set():
+            return
+        event = match_event(self.kind, line)
+        if event is None:
+            return
+        _observed_kinds.add(self.kind)
+        if self.predicate is None or self.predicate(event):
+            self.event = event
+            self._ready.set()
+    
+    @property
+    def ready(self) -> threading.Event:
+        """事件到达时被设置，可作为轮询等待的唤醒事件"""
+        return self._ready
+    
+    def wait(self, timeout: float) -> Optional[LogEvent]:
+        """
+        等待事件
+        :param timeout: 超时时间（秒）
+        :return: LogEvent，超时返回 None
+        """
+        self._ready.wait(timeout)
+        return self.event
+    
+    def close(self):
+        self.collector.remove_listener(self._on_line)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class LogEventSignal:
+    """每次出现指定事件时设置 signal（可重复触发，使用方在处理后清除），用于唤醒后台轮询"""
+    
+    def __init__(self, collector: LogcatCollector, kind: str):
+        self.collector = collector
+        self.kind = kind
+        self.signal = threading.Event()
+        self.count = 0
+        collector.add_listener(self._on_line)
+    
+    def _on_line(self, line: LogLine):
+        if match_event(self.kind, line) is not None:
+            _observed_kinds.add(self.kind)
+            self.count += 1
+            self.signal.set()
+    
+    def close(self):
+        self.collector.remove_listener(self._on_line)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def wait_for_log_event(collector: LogcatCollector, kind: str, timeout: float, since: Optional[float] = None,
+                       predicate: Optional[Callable[[LogEvent], bool]] = None,
+                       description: str = "") -> Optional[LogEvent]:
+    """
+    等待设备端事件，记录等待耗时
+    :param collector: logcat 采集器
+    :param kind: 事件类型
+    :param timeout: 超时时间（秒）
+    :param since: 可选，补查该时间之后已采集的日志
+    :param predicate: 可选，事件过滤条件
+    :param description: 日志描述
+    :return: LogEvent，超时返回 None
+    """
+    start = time.monotonic()
+    with LogEventWaiter(collector, kind, predicate, since) as waiter:
+        event = waiter.wait(timeout)
+    record_wait(f"日志事件: {kind} {description}".strip(), timeout, time.monotonic() - start, 1, event is not None)
+    if event is not None:
+        logger.debug(f"捕获日志事件 {kind}: {event.line.message}")
+    return event
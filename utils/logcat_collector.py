@@ -0,0 +1,199 @@
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Set
+
+from utils.adb_transport import AdbError, get_transport
+from utils.config_loader import load_yaml_config
+
+logger = logging.getLogger(__name__)
+
+config_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../config/config.yaml'))
+_config = load_yaml_config(config_path)
+logcat_config = _config.get('logcat') or {}
+
+# 读取的日志缓冲区
+LOGCAT_BUFFERS = logcat_config.get('buffers', 'main,system,crash,events')
+# 内存环形缓冲区最大行数（超出后丢弃最旧的行，整夜运行内存也不会增长）
+MAX_LINES = int(logcat_config.get('max_lines', 50000))
+# 应用进程号刷新间隔（秒），应用重启后进程号会变化
+PID_REFRESH_INTERVAL = float(logcat_config.get('pid_refresh', 5))
+# 连接断开后的重连间隔（秒）
+RECONNECT_INTERVAL = 2.0
+# 采集的应用包名：被测应用与书架应用
+APP_PACKAGES = tuple(package for package in (
+    (_config.get('device') or {}).get('appPackage'),
+    (_config.get('bookshelf_app') or {}).get('package'),
+) if package)
+
+# logcat -v epoch 格式: "  1697612345.123  1234  1256 I Tag     : message"
+LINE_PATTERN = re.compile(r'^\s*(\d+\.\d+)\s+(\d+)\s+(\d+)\s+([VDIWEFA])\s+(.*)$')
+
+
+class LogLine(NamedTuple):
+    """一行设备日志，timestamp 已换算为本机时间（time.time()）"""
+    timestamp: float
+    pid: int
+    level: str
+    message: str
+    raw: str
+
+
+def parse_logcat_line(line: str) -> Optional[tuple]:
+    """
+    解析 logcat -v epoch 格式的日志行
+    :return: (设备时间戳, 进程号, 级别, 消息)，非日志行返回 None
+    """
+    match = LINE_PATTERN.match(line)
+    if not match:
+        return None
+    return float(match.group(1)), int(match.group(2)), match.group(4), match.group(5)
+
+
+class LogcatCollector:
+    """
+    后台 logcat 采集：通过 adb server 长连接读取日志流，只保留被测应用进程
+    （以及提到应用包名的系统日志，如进程启动、崩溃、ANR），存入有界环形缓冲区
+    测试线程只在需要时按时间截取片段，不会被采集阻塞
+    """
+    
+    def __init__(self, serial: Optional[str] = None, packages=APP_PACKAGES, max_lines: int = MAX_LINES,
+                 buffers: str = LOGCAT_BUFFERS):
+        self.transport = get_transport(serial)
+        self.packages = tuple(packages)
+        self.buffers = buffers
+        self.lines: Deque[LogLine] = deque(maxlen=max_lines)
+        self.pids: Set[int] = set()
+        # 设备时钟与本机时钟的偏差（本机 - 设备），取观测到的最小值（传输延迟最小的行）
+        self.clock_offset: Optional[float] = None
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pids_refreshed_at = 0.0
+        self._listeners: List[Callable[[LogLine], None]] = []
+    
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="logcat-collector", daemon=True)
+        self._thread.start()
+        logger.info(f"logcat 采集已启动: {self.packages}")
+    
+    def stop(self, timeout: float = 3.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        logger.info(f"logcat 采集已停止: 缓冲 {len(self.lines)} 行，丢弃 {self.dropped} 行")
+    
+    def refresh_pids(self):
+        """刷新应用进程号"""
+        try:
+            output = self.transport.run(f"pidof {' '.join(self.packages)}", timeout=5).output
+            self.pids = {int(pid) for pid in output.split() if pid.isdigit()}
+        except AdbError as e:
+            logger.debug(f"刷新应用进程号失败: {e}")
+        self._pids_refreshed_at = time.monotonic()
+    
+    def _run(self):
+        command = f"logcat -v epoch -b {self.buffers} -T 1"
+        while not self._stop.is_set():
+            try:
+                self.refresh_pids()
+                for line in self.transport.stream_lines(command, self._stop):
+                    self._handle(line)
+                    if time.monotonic() - self._pids_refreshed_at > PID_REFRESH_INTERVAL:
+                        self.refresh_pids()
+            except AdbError as e:
+                logger.debug(f"logcat 连接中断: {e}")
+            except Exception as e:
+                logger.error(f"logcat 采集异常: {e}")
+            self._stop.wait(RECONNECT_INTERVAL)
+    
+    def _handle(self, line: str):
+        parsed = parse_logcat_line(line)
+        if parsed is None:
+            return
+        device_time, pid, level, message = parsed
+        offset = time.time() - device_time
+        if self.clock_offset is None or offset < self.clock_offset:
+            self.clock_offset = offset
+        if pid not in self.pids:
+            if not any(package in message for package in self.packages):
+                return
+            # 应用进程重启（如 "Start proc 1234:hanvon.aebr.hanvondrive"）后立即刷新进程号
+            if "Start proc" in message:
+                self._pids_refreshed_at = 0.0
+        with self._lock:
+            if len(self.lines) == self.lines.maxlen:
+                self.dropped += 1
+            log_line = LogLine(device_time + self.clock_offset, pid, level, message, line)
+            self.lines.append(log_line)
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(log_line)
+            except Exception as e:
+                logger.debug(f"日志监听回调异常: {e}")
+    
+    def add_listener(self, listener: Callable[[LogLine], None]):
+        """注册新日志行回调（在采集线程中调用，回调必须快速返回）"""
+        with self._lock:
+            self._listeners.append(listener)
+    
+    def remove_listener(self, listener: Callable[[LogLine], None]):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+    
+    def slice(self, start: float, end: Optional[float] = None) -> List[LogLine]:
+        """
+        按本机时间截取日志片段
+        :param start: 开始时间（time.time()）
+        :param end: 结束时间，默认到当前
+        :return: LogLine列表
+        """
+        end = time.time() if end is None else end
+        with self._lock:
+            lines = list(self.lines)
+        return [line for line in lines if start <= line.timestamp <= end]
+    
+    def slice_text(self, start: float, end: Optional[float] = None) -> str:
+        return "\n".join(line.raw for line in self.slice(start, end))
+
+
+_collectors: Dict[Optional[str], LogcatCollector] = {}
+_collectors_lock = threading.Lock()
+
+
+def get_logcat_collector(serial: Optional[str] = None, start: bool = True) -> LogcatCollector:
+    """
+    获取设备对应的 logcat 采集器（每台设备一个，首次获取时启动）
+    :param serial: 设备序列号
+    :param start: 是否确保采集已启动
+    :return: LogcatCollector对象
+    """
+    with _collectors_lock:
+        collector = _collectors.get(serial)
+        if collector is None:
+            collector = LogcatCollector(serial)
+            _collectors[serial] = collector
+    if start:
+        collector.start()
+    return collector
+
+
+def stop_logcat_collectors():
+    with _collectors_lock:
+        collectors = list(_collectors.values())
+        _collectors.clear()
+    for collector in collectors:
+        collector.stop()
@@ -0,0 +1,150 @@
+import glob
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, FrozenSet, NamedTuple, Optional
+
+from utils.config_loader import load_yaml_config
+
+logger = logging.getLogger(__name__)
+
+LOCATORS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../data/locators'))
+# 定位器值中的资源 ID（id 定位器或 XPath 中的 @resource-id）
+RESOURCE_ID_PATTERN = re.compile(r'[\w.]+:id/[\w.]+')
+# 弹窗类界面（定位器文件名）：与下层界面同时出现时作为弹窗返回
+DIALOG_SCREENS = frozenset({
+    "details_page", "unbind_page", "search_copy_page", "clouds_more_page", "cloud_sort_page",
+    "account_rename_page",
+})
+# 判定为某界面的最低得分（资源 ID 出现在 n 个定位器文件中时计 1/n 分）
+MIN_SCORE = 0.5
+# 判定弹窗的最低得分：弹窗须出现至少一个独有的资源 ID，避免共用的标题、关闭按钮误判
+DIALOG_MIN_SCORE = 1.0
+# 指纹 -> 分类结果 缓存条数
+CACHE_SIZE = 128
+
+
+class ScreenSignature(NamedTuple):
+    """界面特征：定位器文件中出现的全部资源 ID"""
+    name: str
+    package: Optional[str]
+    ids: FrozenSet[str]
+    keys: Dict[str, str]
+
+
+class ScreenMatch(NamedTuple):
+    """一次分类结果，screen/dialog 为定位器文件名（不含扩展名）"""
+    screen: Optional[str]
+    dialog: Optional[str]
+    package: Optional[str]
+    ids: FrozenSet[str]
+    fingerprint: str
+
+
+def load_signatures(directory: str = LOCATORS_DIR) -> Dict[str, ScreenSignature]:
+    """
+    从定位器文件生成界面特征
+    :param directory: 定位器目录
+    :return: {定位器文件名: ScreenSignature}
+    """
+    signatures = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.yaml"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        keys = {}
+        for section in (load_yaml_config(path).get("locators") or {}).values():
+            for key, value in (section or {}).items():
+                match = RESOURCE_ID_PATTERN.search(str(value))
+                if match:
+                    keys[key] = match.group(0)
+        if not keys:
+            continue
+        packages = Counter(resource_id.split(":", 1)[0] for resource_id in keys.values())
+        signatures[name] = ScreenSignature(name, packages.most_common(1)[0][0], frozenset(keys.values()), keys)
+    return signatures
+
+
+class ScreenClassifier:
+    """
+    界面分类：对一份界面快照（包名 + 出现的资源 ID 集合）计算指纹，
+    与各定位器文件生成的特征比对，资源 ID 按出现的文件数加权（越独有权重越高）
+    同一指纹的分类结果缓存（LRU），重复出现的界面无需再次比对
+    """
+    
+    def __init__(self, signatures: Optional[Dict[str, ScreenSignature]] = None,
+                 dialogs: FrozenSet[str] = DIALOG_SCREENS, min_score: float = MIN_SCORE,
+                 dialog_min_score: float = DIALOG_MIN_SCORE, cache_size: int = CACHE_SIZE):
+        self.signatures = load_signatures() if signatures is None else signatures
+        self.dialogs = dialogs
+        self.min_score = min_score
+        self.dialog_min_score = dialog_min_score
+        self.cache_size = cache_size
+        document_frequency = Counter(
+            resource_id for signature in self.signatures.values() for resource_id in signature.ids
+        )
+        self.weights = {resource_id: 1.0 / count for resource_id, count in document_frequency.items()}
+        self._cache: "OrderedDict[str, ScreenMatch]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def fingerprint(package: Optional[str], ids: FrozenSet[str]) -> str:
+        content = f"{package or ''}|" + "|".join(sorted(ids))
+        return hashlib.sha1(content.encode("utf-8")).hexdigest()
+    
+    def score(self, signature: ScreenSignature, ids: FrozenSet[str]) -> float:
+        return sum(self.weights[resource_id] for resource_id in signature.ids & ids)
+    
+    def classify(self, snapshot) -> ScreenMatch:
+        """
+        分类当前界面
+        :param snapshot: UiSnapshot对象
+        :return: ScreenMatch对象
+        """
+        package = snapshot.package
+        # 只比较已知资源 ID，列表项数量、文本变化不影响指纹
+        ids = snapshot.resource_ids & self.weights.keys()
+        key = self.fingerprint(package, frozenset(ids))
+        with self._lock:
+            match = self._cache.get(key)
+            if match is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return match
+        
+        scores = {
+            name: self.score(signature, ids) for name, signature in self.signatures.items()
+            if package is None or signature.package == package
+        }
+        screen = self._best(scores, dialog=False)
+        dialog = self._best(scores, dialog=True)
+        match = ScreenMatch(screen, dialog, package, frozenset(ids), key)
+        logger.debug(f"界面分类: 界面={screen} 弹窗={dialog} 指纹={key[:8]}")
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = match
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return match
+    
+    def _best(self, scores: Dict[str, float], dialog: bool) -> Optional[str]:
+        min_score = self.dialog_min_score if dialog else self.min_score
+        candidates = [(score, name) for name, score in scores.items()
+                      if (name in self.dialogs) == dialog and score >= min_score]
+        return max(candidates)[1] if candidates else None
+
+
+_classifier: Optional[ScreenClassifier] = None
+_classifier_lock = threading.Lock()
+
+
+def get_screen_classifier() -> ScreenClassifier:
+    """获取进程内共享的界面分类器"""
+    global _classifier
+    with _classifier_lock:
+        if _classifier is None:
+            _classifier = ScreenClassifier()
+        return _classifier
@@ -0,0 +1,229 @@
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Deque, List, Optional
+
+from utils.adb_transport import AdbError, get_transport
+from utils.artifact_store import get_artifact_store
+from utils.config_loader import load_yaml_config
+
+logger = logging.getLogger(__name__)
+
+config_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../config/config.yaml'))
+_config = load_yaml_config(config_path)
+recording_config = _config.get('recording') or {}
+
+# 每段录屏时长（秒）
+SEGMENT_SECONDS = int(recording_config.get('segment_seconds', 10))
+# 保留的最近段数：失败时只拼接失败前的这几段
+KEEP_SEGMENTS = int(recording_config.get('keep_segments', 3))
+# 设备端分段存放目录
+REMOTE_DIR = recording_config.get('remote_dir', '/sdcard/test_recordings')
+# 后台转码进程数
+TRANSCODE_WORKERS = int(recording_config.get('transcode_workers', 2))
+# 转码后视频最大宽度（像素）
+MAX_WIDTH = int(recording_config.get('max_width', 480))
+# 停止录制时等待 screenrecord 写完文件的时间（秒）
+STOP_TIMEOUT = 10
+
+
+def recording_enabled() -> bool:
+    """录屏开关：config.yaml 中 device.recordScreen，且环境变量 ENABLE_RECORDING 未关闭"""
+    if os.environ.get('ENABLE_RECORDING', 'true').lower() != 'true':
+        return False
+    return bool((_config.get('device') or {}).get('recordScreen', False))
+
+
+def transcode_segments(segment_paths: List[str], output_path: str, max_width: int = MAX_WIDTH) -> str:
+    """
+    拼接分段并转码为小体积灰度视频（在后台进程中执行）
+    :param segment_paths: 按时间顺序排列的分段文件
+    :param output_path: 输出文件路径
+    :param max_width: 输出视频最大宽度
+    :return: 输出文件路径
+    """
+    if shutil.which("ffmpeg") is None:
+        # 无 ffmpeg 时无法拼接，保留最后一段（包含失败时刻）
+        shutil.copyfile(segment_paths[-1], output_path)
+    else:
+        list_path = f"{output_path}.segments.txt"
+        with open(list_path, "w", encoding="utf-8") as file:
+            for path in segment_paths:
+                file.write(f"file '{os.path.abspath(path)}'\n")
+        try:
+            subprocess.run(
+                ["ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path,
+                 "-vf", f"scale='min({max_width},iw)':-2,format=gray", "-c:v", "libx264",
+                 "-preset", "veryfast", "-crf", "32", "-an", output_path],
+                check=True, capture_output=True, timeout=300
+            )
+        finally:
+            os.remove(list_path)
+    # 删除本地分段及临时目录
+    for path in segment_paths:
+        os.remove(path)
+    try:
+        os.rmdir(os.path.dirname(segment_paths[0]))
+    except OSError:
+        pass
+    return output_path
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_transcode_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=TRANSCODE_WORKERS)
+        return _pool
+
+
+def shutdown_transcode_pool(wait: bool = True):
+    """等待转码任务完成并关闭进程池"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait)
+
+
+class SegmentedScreenRecorder:
+    """
+    分段录屏：设备端 screenrecord 循环录制短分段，只保留最近 KEEP_SEGMENTS 段
+    用例通过时直接删除设备上的分段；失败时拉取分段，交给后台进程拼接转码
+    """
+    
+    def __init__(self, serial: Optional[str] = None, segment_seconds: int = SEGMENT_SECONDS,
+                 keep_segments: int = KEEP_SEGMENTS, remote_dir: str = REMOTE_DIR):
+        self.transport = get_transport(serial)
+        self.segment_seconds = segment_seconds
+        self.keep_segments = keep_segments
+        self.remote_dir = remote_dir
+        self.session = uuid.uuid4().hex[:8]
+        self.segments: Deque[str] = deque()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self):
+        """开始后台循环录制"""
+        self.transport.shell(f"mkdir -p {self.remote_dir}")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._record_loop, name="screen-recorder", daemon=True)
+        self._thread.start()
+        logger.debug(f"分段录屏已开始: 每段 {self.segment_seconds}s，保留 {self.keep_segments} 段")
+    
+    def _record_loop(self):
+        index = 0
+        while not self._stop.is_set():
+            remote = f"{self.remote_dir}/{self.session}_{index:04d}.mp4"
+            with self._lock:
+                self.segments.append(remote)
+                expired = []
+                while len(self.segments) > self.keep_segments:
+                    expired.append(self.segments.popleft())
+            try:
+                if expired:
+                    self.transport.run(f"rm -f {' '.join(expired)}")
+                self.transport.run(f"screenrecord --time-limit {self.segment_seconds} {remote}",
+                                   timeout=self.segment_seconds + 15)
+            except AdbError as e:
+                logger.warning(f"录屏分段失败，停止录制: {e}")
+                return
+            index += 1
+    
+    def stop(self):
+        """停止录制（SIGINT 使 screenrecord 正常写完当前分段）"""
+        self._stop.set()
+        # 停止信号与新分段启动可能交错，线程未退出时再发送一次
+        for wait in (1, STOP_TIMEOUT):
+            try:
+                self.transport.run("pkill -INT screenrecord")
+            except AdbError as e:
+                logger.warning(f"停止录屏失败: {e}")
+            if self._thread is None:
+                return
+            self._thread.join(wait)
+            if not self._thread.is_alive():
+                return
+    
+    def discard(self):
+        """删除设备上的全部分段"""
+        with self._lock:
+            segments, self.segments = list(self.segments), deque()
+        if segments:
+            try:
+                self.transport.run(f"rm -f {' '.join(segments)}")
+            except AdbError as e:
+                logger.warning(f"删除录屏分段失败: {e}")
+    
+    def pull(self, local_dir: str) -> List[str]:
+        """
+        拉取设备上的分段到本地
+        :param local_dir: 本地目录
+        :return: 本地分段文件列表（按时间顺序）
+        """
+        os.makedirs(local_dir, exist_ok=True)
+        with self._lock:
+            segments = list(self.segments)
+        paths = []
+        for remote in segments:
+            try:
+                data = self.transport.exec_out(f"cat {remote}")
+            except AdbError as e:
+                logger.warning(f"拉取录屏分段失败: {remote} | {e}")
+                continue
+            if not data:
+                continue
+            path = os.path.join(local_dir, os.path.basename(remote))
+            with open(path, "wb") as file:
+                file.write(data)
+            paths.append(path)
+        return paths
+    
+    def finish(self, keep: bool, output_path: str) -> Optional[Future]:
+        """
+        结束录制
+        :param keep: 是否保留录屏（用例失败时为 True）
+        :param output_path: 拼接后的视频路径
+        :return: 后台转码任务，结果为视频在产物仓库中的摘要；未保留或没有可用分段时返回 None
+        """
+        self.stop()
+        if not keep:
+            self.discard()
+            return None
+        paths = self.pull(os.path.join(os.path.dirname(output_path), f".segments_{self.session}"))
+        self.discard()
+        if not paths:
+            logger.warning("没有可用的录屏分段")
+            return None
+        stored: Future = Future()
+        future = get_transcode_pool().submit(transcode_segments, paths, output_path)
+        future.add_done_callback(lambda f: self._store_transcode(f, output_path, stored))
+        logger.info(f"失败用例录屏已提交转码: {len(paths)} 段 -> {output_path}")
+        return stored
+    
+    @staticmethod
+    def _store_transcode(future: Future, output_path: str, stored: Future):
+        """转码完成后存入产物仓库，stored 的结果为视频的内容摘要"""
+        if future.exception() is not None:
+            logger.error(f"录屏转码失败: {output_path} | {future.exception()}")
+            stored.set_exception(future.exception())
+            return
+        try:
+            # 转码结果存入产物仓库，原路径保留为硬链接
+            digest = get_artifact_store().put_file(output_path)
+        except Exception as e:
+            logger.error(f"录屏存入产物仓库失败: {output_path} | {e}")
+            stored.set_exception(e)
+            return
+        logger.info(f"录屏转码完成: {output_path}")
+        stored.set_result(digest)
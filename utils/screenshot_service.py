@@ -0,0 +1,210 @@
+import base64
+import logging
+import os
+import queue
+import threading
+from io import BytesIO
+from typing import Optional
+
+from PIL import Image
+
+from utils.artifact_store import get_artifact_store
+
+logger = logging.getLogger(__name__)
+
+# 缩略图最长边（像素）
+THUMBNAIL_SIZE = 400
+# 感知哈希汉明距离不超过该值时视为与上一帧相同，不再重复编码
+DUPLICATE_DISTANCE = 2
+# 关闭服务时等待队列写完的最长时间（秒）
+FLUSH_TIMEOUT = 30
+
+
+def difference_hash(image: Image.Image) -> int:
+    """64 位差值哈希（dHash）：缩放到 9x8 灰度图，比较相邻像素亮度"""
+    pixels = list(image.convert("L").resize((9, 8)).getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value
+
+
+def hamming_distance(first: int, second: int) -> int:
+    return bin(first ^ second).count("1")
+
+
+def thumbnail_path_for(path: str) -> str:
+    base, ext = os.path.splitext(path)
+    return f"{base}_thumb{ext}"
+
+
+class ScreenshotTicket:
+    """
+    一次截图请求：文件路径在提交时即确定，文件由后台线程写入
+    报告中可直接引用路径，需要读取文件内容时调用 wait()
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.thumbnail_path = thumbnail_path_for(path)
+        self.duplicate_of: Optional[str] = None
+        # 原图在产物仓库中的摘要（写入完成后设置）
+        self.digest: Optional[str] = None
+        self.error: Optional[Exception] = None
+        self._done = threading.Event()
+    
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待文件写入完成
+        :param timeout: 超时时间（秒），None 表示一直等待
+        :return: 写入成功返回 True
+        """
+        return self._done.wait(timeout) and self.error is None
+    
+    def __repr__(self):
+        return f"ScreenshotTicket({self.path}, done={self.done})"
+
+
+class ScreenshotService:
+    """
+    异步截图服务：测试线程只取回截图数据（一次 WebDriver 请求），
+    解码、感知哈希、原图与灰度缩略图的写盘都在后台线程完成，文件存入产物仓库
+    与上一帧几乎相同的截图不再编码，直接链接到上一帧的对象
+    """
+    
+    def __init__(self, thumbnail_size: int = THUMBNAIL_SIZE, duplicate_distance: int = DUPLICATE_DISTANCE):
+        self.thumbnail_size = thumbnail_size
+        self.duplicate_distance = duplicate_distance
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        # 上一帧 {流名称: (感知哈希, 原图摘要, 缩略图摘要)}
+        self._last_frames = {}
+        self.saved = 0
+        self.skipped = 0
+    
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="screenshot-service", daemon=True)
+                self._worker.start()
+    
+    def capture(self, driver, path: str, stream: str = "default") -> ScreenshotTicket:
+        """
+        截图并提交后台保存（测试线程不做任何图像编码与文件写入）
+        :param driver: Appium driver
+        :param path: 原图保存路径（.png）
+        :param stream: 去重使用的截图流名称（如设备序列号），只与同一流的上一帧比较
+        :return: ScreenshotTicket对象
+        """
+        return self.submit(driver.get_screenshot_as_base64(), path, stream)
+    
+    def submit(self, png_base64: str, path: str, stream: str = "default") -> ScreenshotTicket:
+        """提交已取回的截图数据（base64 编码的 PNG）"""
+        ticket = ScreenshotTicket(path)
+        self._ensure_worker()
+        self._queue.put((ticket, png_base64, stream))
+        return ticket
+    
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                ticket, png_base64, stream = item
+                try:
+                    self._save(ticket, png_base64, stream)
+                except Exception as e:
+                    ticket.error = e
+                    logger.error(f"截图保存失败: {ticket.path} | {e}")
+                finally:
+                    ticket._done.set()
+            finally:
+                self._queue.task_done()
+    
+    def _save(self, ticket: ScreenshotTicket, png_base64: str, stream: str):
+        data = base64.b64decode(png_base64)
+        image = Image.open(BytesIO(data))
+        frame_hash = difference_hash(image)
+        store = get_artifact_store()
+        
+        last = self._last_frames.get(stream)
+        if last is not None and hamming_distance(last[0], frame_hash) <= self.duplicate_distance \
+                and store.contains(last[1]) and store.contains(last[2]):
+            # 与上一帧相同：直接链接到上一帧的对象，不再生成缩略图
+            store.link(last[1], ticket.path)
+            store.link(last[2], ticket.thumbnail_path)
+            ticket.duplicate_of = store.object_path(last[1])
+            ticket.digest = last[1]
+            self.skipped += 1
+            logger.debug(f"截图与上一帧相同，已链接: {ticket.path}")
+            return
+        
+        # 原图直接存入 driver 返回的 PNG 数据，不重新编码
+        image_digest = store.put_bytes(data, ".png", link_to=ticket.path)
+        ticket.digest = image_digest
+        # 墨水屏本身为灰度，缩略图使用灰度图
+        thumbnail = image.convert("L")
+        thumbnail.thumbnail((self.thumbnail_size, self.thumbnail_size))
+        buffer = BytesIO()
+        thumbnail.save(buffer, format="PNG")
+        thumbnail_digest = store.put_bytes(buffer.getvalue(), ".png", link_to=ticket.thumbnail_path)
+        self._last_frames[stream] = (frame_hash, image_digest, thumbnail_digest)
+        self.saved += 1
+        logger.info(f"截图已保存: {ticket.path}")
+    
+    def flush(self, timeout: Optional[float] = FLUSH_TIMEOUT) -> bool:
+        """
+        等待队列中的截图全部写入
+        :param timeout: 超时时间（秒）
+        :return: 全部写入返回 True
+        """
+        if self._worker is None:
+            return True
+        done = threading.Event()
+        
+        def wait_queue():
+            self._queue.join()
+            done.set()
+        
+        threading.Thread(target=wait_queue, daemon=True).start()
+        flushed = done.wait(timeout)
+        if not flushed:
+            logger.warning(f"截图队列在 {timeout}s 内未写完，剩余 {self._queue.qsize()} 张")
+        return flushed
+    
+    def close(self, timeout: Optional[float] = FLUSH_TIMEOUT):
+        """写完剩余截图并停止后台线程"""
+        self.flush(timeout)
+        if self._worker is not None and self._worker.is_alive():
+            self._queue.put(None)
+            self._worker.join(timeout)
+        self._worker = None
+        logger.info(f"截图服务已关闭: 保存 {self.saved} 张，跳过重复 {self.skipped} 张")
+
+
+_service: Optional[ScreenshotService] = None
+_service_lock = threading.Lock()
+
+
+def get_screenshot_service() -> ScreenshotService:
+    """获取进程内共享的截图服务"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = ScreenshotService()
+        return _service
+
+
+def shutdown_screenshot_service(timeout: Optional[float] = FLUSH_TIMEOUT):
+    global _service
+    with _service_lock:
+        service, _service = _service, None
+    if service is not None:
+        service.close(timeout)
@@ -0,0 +1,138 @@
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from utils.artifact_store import get_artifact_store
+from utils.config_loader import load_yaml_config
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+config_path = os.path.join(BASE_DIR, 'config', 'config.yaml')
+trace_config = load_yaml_config(config_path).get('trace') or {}
+
+TRACE_DIR = os.path.join(BASE_DIR, "reports", "traces")
+# 记录开关（关闭后所有埋点只多一次判断）
+TRACE_ENABLED = os.environ.get('ENABLE_TRACE', 'true').lower() == 'true' and bool(trace_config.get('enabled', True))
+# 保存并附加到报告的用例：failed（失败用例）/ always / never
+ATTACH_MODES = ("failed", "always", "never")
+DEFAULT_ATTACH_MODE = os.environ.get('TRACE_ATTACH', trace_config.get('attach', 'failed'))
+# 单个用例最多记录的事件数，超出后丢弃（防止长时间轮询的用例占用过多内存）
+MAX_EVENTS = int(trace_config.get('max_events', 200000))
+
+
+class TraceRecorder:
+    """
+    时间线追踪：记录页面对象方法、等待、adb 命令、driver 请求的嵌套耗时区间，
+    按用例输出 Chrome / Perfetto trace JSON（chrome://tracing 或 ui.perfetto.dev 打开）
+    记录时只保存元组，写文件时才转换格式
+    """
+    
+    def __init__(self, max_events: int = MAX_EVENTS, enabled: bool = TRACE_ENABLED):
+        self.enabled = enabled
+        self.max_events = max_events
+        self.active = False
+        self.test: Optional[str] = None
+        self.dropped = 0
+        self._events: List[tuple] = []
+        self._thread_names: Dict[int, str] = {}
+    
+    def begin_test(self, node_id: str):
+        self._events = []
+        self.dropped = 0
+        self.test = node_id
+        self.active = self.enabled
+    
+    def end_test(self) -> List[tuple]:
+        """停止记录并返回本用例的事件"""
+        self.active = False
+        events, self._events = self._events, []
+        return events
+    
+    def add(self, category: str, name: str, start_ns: int, end_ns: int, args: Optional[dict] = None):
+        """
+        记录一个区间
+        :param category: 类别（page / wait / adb / driver）
+        :param name: 名称
+        :param start_ns: 开始时间（time.perf_counter_ns()）
+        :param end_ns: 结束时间
+        :param args: 附加信息
+        """
+        if not self.active:
+            return
+        if len(self._events) >= self.max_events:
+            self.dropped += 1
+            return
+        tid = threading.get_ident()
+        if tid not in self._thread_names:
+            self._thread_names[tid] = threading.current_thread().name
+        self._events.append((category, name, start_ns, end_ns - start_ns, tid, args))
+    
+    def to_chrome_trace(self, events: List[tuple]) -> dict:
+        """转换为 Chrome trace 格式（完整事件 ph=X，时间单位微秒，从用例开始计时）"""
+        pid = os.getpid()
+        origin = min((event[2] for event in events), default=0)
+        trace_events = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in self._thread_names.items()
+        ]
+        for category, name, start, duration, tid, args in events:
+            event = {"name": name, "cat": category, "ph": "X", "pid": pid, "tid": tid,
+                     "ts": (start - origin) / 1000, "dur": duration / 1000}
+            if args:
+                event["args"] = args
+            trace_events.append(event)
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms",
+                "otherData": {"test": self.test, "dropped": self.dropped}}
+    
+    def write(self, events: List[tuple], path: str) -> str:
+        """
+        写入 trace 文件（存入产物仓库）
+        :param events: end_test() 返回的事件
+        :param path: 输出路径
+        :return: trace 在产物仓库中的摘要
+        """
+        data = json.dumps(self.to_chrome_trace(events), ensure_ascii=False).encode("utf-8")
+        return get_artifact_store().put_bytes(data, ".json", link_to=path)
+
+
+_recorder = TraceRecorder()
+
+
+def get_trace_recorder() -> TraceRecorder:
+    return _recorder
+
+
+def trace_method(func, category: str = "page"):
+    """包装页面对象方法：追踪开启时记录方法的耗时区间"""
+    name = func.__qualname__
+    
+    @functools.wraps(func)
+    def traced(*args, **kwargs):
+        if not _recorder.active:
+            return func(*args, **kwargs)
+        start = time.perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _recorder.add(category, name, start, time.perf_counter_ns())
+    
+    traced.__traced__ = True
+    return traced
+
+
+def instrument_class(cls):
+    """
+    包装类中直接定义的普通方法（不含属性、静态方法、类方法与双下划线方法），
+    wait_ 开头的方法记为等待类区间
+    :param cls: 页面类
+    """
+    for attr, value in list(vars(cls).items()):
+        if attr.startswith("__") or not inspect.isfunction(value) or getattr(value, "__traced__", False):
+            continue
+        setattr(cls, attr, trace_method(value, "wait" if attr.startswith("wait_") else "page"))
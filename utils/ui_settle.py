@@ -0,0 +1,116 @@
+import hashlib
+import logging
+import time
+from typing import NamedTuple, Optional
+
+from utils.driver_memo import memo_current_activity
+from utils.ui_snapshot import SnapshotUnsupportedLocator, UiSnapshot
+from utils.wait_engine import DEFAULT_TIMEOUT, record_wait
+
+logger = logging.getLogger(__name__)
+
+# 探测间隔（秒）：每次探测是一次 page_source 请求，本身已有几十毫秒耗时
+PROBE_INTERVAL = 0.1
+# 变化后连续多少次探测结果一致视为稳定
+STABLE_PROBES = 2
+
+
+class UiState(NamedTuple):
+    """一次探测得到的界面状态"""
+    page_text: Optional[str]
+    row_count: Optional[int]
+    rows_hash: str
+    activity: Optional[str]
+
+
+class UiSettleDetector:
+    """
+    界面稳定检测：操作前记录界面状态，操作后轮询探测，
+    观察到由操作引起的变化（页码文本、列表行集合、Activity）且连续多次探测一致后立即返回
+    """
+    
+    def __init__(self, driver, page_indicator_locator=None, row_locator=None, check_activity=False):
+        """
+        :param driver: Appium driver
+        :param page_indicator_locator: 可选，页码指示器定位器（如 page_tv）
+        :param row_locator: 可选，列表行定位器，为空时对整个界面取哈希
+        :param check_activity: 是否同时比较当前 Activity（每次探测多一次请求）
+        """
+        self.driver = driver
+        self.page_indicator_locator = page_indicator_locator
+        self.row_locator = row_locator
+        self.check_activity = check_activity
+        self.snapshot: Optional[UiSnapshot] = None
+    
+    def probe(self) -> UiState:
+        """探测当前界面状态（一次 page_source 请求）"""
+        self.snapshot = UiSnapshot.capture(self.driver)
+        page_text = None
+        if self.page_indicator_locator is not None:
+            node = self._find(self.page_indicator_locator)
+            page_text = node[0].text if node else None
+        rows = self._find(self.row_locator) if self.row_locator is not None else None
+        if rows is None:
+            # 无行定位器（或快照不支持）时对整个界面取哈希
+            row_count = None
+            rows_hash = self.snapshot.content_hash()
+        else:
+            row_count = len(rows)
+            content = "|".join(f"{row.bounds}:{self._row_text(row)}" for row in rows)
+            rows_hash = hashlib.md5(content.encode("utf-8")).hexdigest()
+        # 每次探测都要读到最新的 Activity；结果写入纪元缓存，供同一界面内的其他查询复用
+        activity = memo_current_activity(self.driver, refresh=True) if self.check_activity else None
+        return UiState(page_text, row_count, rows_hash, activity)
+    
+    def _find(self, locator):
+        try:
+            return self.snapshot.find_all(locator)
+        except SnapshotUnsupportedLocator as e:
+            logger.debug(f"稳定检测忽略不支持的定位器: {e}")
+            return None
+    
+    @staticmethod
+    def _row_text(row) -> str:
+        return "/".join(element.attrib.get("text", "") for element in row.element.iter())
+    
+    def wait(self, before: UiState, timeout: Optional[float] = None, require_change: bool = True,
+             stable_probes: int = STABLE_PROBES, description: str = "") -> bool:
+        """
+        等待界面稳定
+        :param before: 操作前的界面状态（probe() 的返回值）
+        :param timeout: 超时时间（秒）
+        :param require_change: 是否要求界面先发生变化（False 时只要求连续探测一致）
+        :param stable_probes: 变化后连续一致的探测次数
+        :param description: 日志描述
+        :return: 稳定返回 True，超时返回 False
+        """
+        timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        changed = not require_change
+        previous = None
+        stable = 0
+        polls = 0
+        settled = False
+        while True:
+            polls += 1
+            state = self.probe()
+            if not changed and state != before:
+                changed = True
+                logger.debug(f"界面已变化（{time.monotonic() - start:.3f}s）: {before} -> {state}")
+            if changed:
+                stable = stable + 1 if state == previous else 1
+                if stable >= stable_probes:
+                    settled = True
+                    break
+            previous = state
+            if time.monotonic() + PROBE_INTERVAL > deadline:
+                break
+            time.sleep(PROBE_INTERVAL)
+        latency = time.monotonic() - start
+        record_wait(f"界面稳定: {description}", timeout, latency, polls, settled)
+        if settled:
+            logger.info(f"界面稳定: {description} | 耗时 {latency:.3f}s | 探测 {polls} 次")
+        else:
+            logger.warning(f"界面在 {timeout}s 内未{'稳定' if changed else '发生变化'}: {description}")
+        return settled
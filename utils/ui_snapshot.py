@@ -0,0 +1,324 @@
+import hashlib
+import logging
+import re
+import time
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, Tuple
+
+from appium.webdriver.common.appiumby import AppiumBy
+
+try:
+    # lxml 为可选依赖：存在时支持完整 XPath，缺失时仅支持常用的简单 XPath
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_etree = None
+
+logger = logging.getLogger(__name__)
+
+# bounds 属性格式: [x1,y1][x2,y2]
+BOUNDS_PATTERN = re.compile(r'\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]')
+# _parse_locator 生成的 UiSelector 文本定位器
+UI_SELECTOR_PATTERN = re.compile(
+    r'^new UiSelector\(\)\.(text|textContains|textMatches|resourceId)\("(.*)"\)(?:\.instance\((\d+)\))?$'
+)
+# 简单 XPath: //节点[谓词][谓词]...
+SIMPLE_XPATH_PATTERN = re.compile(r'^//(\*|[\w.$]+)((?:\[[^\[\]]+\])*)$')
+# 带索引的 XPath: (表达式)[n]
+INDEXED_XPATH_PATTERN = re.compile(r'^\((.+)\)\[(\d+)\]$')
+PREDICATE_PATTERN = re.compile(r'\[([^\[\]]+)\]')
+# 谓词条件: @属性='值' 或 contains(@属性, '值')，值内不能包含同种引号（否则是多个条件，如 or 连接）
+CONDITION_PATTERN = re.compile(
+    r'^(?:@([\w-]+)\s*=\s*([\'"])((?:(?!\2).)*)\2'
+    r'|contains\(\s*@([\w-]+)\s*,\s*([\'"])((?:(?!\5).)*)\5\s*\))$'
+)
+
+# selenium get_attribute 属性名 -> page_source 属性名
+ATTRIBUTE_ALIASES = {
+    "resourceId": "resource-id",
+    "contentDescription": "content-desc",
+    "className": "class",
+}
+
+
+class SnapshotUnsupportedLocator(Exception):
+    """快照无法解析该定位器（调用方应回退为实时查询）"""
+
+
+class UiNode:
+    """快照中的单个界面节点"""
+    
+    __slots__ = ("element", "snapshot")
+    
+    def __init__(self, element, snapshot: "UiSnapshot"):
+        self.element = element
+        self.snapshot = snapshot
+    
+    def __repr__(self):
+        return f"UiNode({self.resource_id or self.class_name}, text={self.text!r})"
+    
+    def get_attribute(self, name: str) -> Optional[str]:
+        """按 selenium get_attribute 的命名读取属性"""
+        return self.element.attrib.get(ATTRIBUTE_ALIASES.get(name, name))
+    
+    @property
+    def text(self) -> str:
+        return self.element.attrib.get("text", "")
+    
+    @property
+    def resource_id(self) -> str:
+        return self.element.attrib.get("resource-id", "")
+    
+    @property
+    def class_name(self) -> str:
+        return self.element.attrib.get("class", self.element.tag)
+    
+    @property
+    def checked(self) -> bool:
+        return self.element.attrib.get("checked") == "true"
+    
+    @property
+    def displayed(self) -> bool:
+        # 旧版本 page_source 不含 displayed 属性，按可见处理
+        return self.element.attrib.get("displayed", "true") != "false"
+    
+    @property
+    def enabled(self) -> bool:
+        return self.element.attrib.get("enabled", "true") != "false"
+    
+    @property
+    def bounds(self) -> Optional[Tuple[int, int, int, int]]:
+        """返回 (x1, y1, x2, y2)，无 bounds 属性时返回 None"""
+        match = BOUNDS_PATTERN.match(self.element.attrib.get("bounds", ""))
+        if not match:
+            return None
+        return tuple(int(value) for value in match.groups())
+    
+    @property
+    def center(self) -> Optional[Tuple[int, int]]:
+        bounds = self.bounds
+        if not bounds:
+            return None
+        x1, y1, x2, y2 = bounds
+        return (x1 + x2) // 2, (y1 + y2) // 2
+    
+    @property
+    def parent(self) -> Optional["UiNode"]:
+        return self.snapshot.parent_of(self)
+    
+    def find_all(self, locator) -> List["UiNode"]:
+        """在当前节点子树内查找"""
+        return self.snapshot.find_all(locator, root=self)
+    
+    def find(self, locator) -> Optional["UiNode"]:
+        nodes = self.find_all(locator)
+        return nodes[0] if nodes else None
+
+
+class UiSnapshot:
+    """
+    界面快照：一次 page_source 请求，之后所有只读查询在内存中完成
+    支持 _parse_locator 产生的 id / xpath / text 系列定位器
+    """
+    
+    def __init__(self, page_source: str, taken_at: Optional[float] = None):
+        self.page_source = page_source
+        self.taken_at = taken_at or time.monotonic()
+        if lxml_etree is not None:
+            self._root = lxml_etree.fromstring(page_source.encode("utf-8"))
+            self._parents = None
+        else:
+            self._root = ET.fromstring(page_source)
+            self._parents = {child: parent for parent in self._root.iter() for child in parent}
+        self._elements = list(self._root.iter())
+        self._id_index: Dict[str, List] = {}
+        for element in self._elements:
+            resource_id = element.attrib.get("resource-id")
+            if resource_id:
+                self._id_index.setdefault(resource_id, []).append(element)
+    
+    @classmethod
+    def capture(cls, driver) -> "UiSnapshot":
+        """抓取当前界面快照（单次 HTTP 请求）"""
+        start = time.monotonic()
+        page_source = driver.page_source
+        snapshot = cls(page_source)
+        logger.debug(f"界面快照已抓取: {len(snapshot._elements)} 个节点，耗时 {time.monotonic() - start:.3f}s")
+        return snapshot
+    
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.taken_at
+    
+    @property
+    def resource_ids(self) -> frozenset:
+        return frozenset(self._id_index)
+    
+    @property
+    def package(self) -> Optional[str]:
+        """前台应用包名（取第一个带 package 属性的节点）"""
+        for element in self._elements:
+            package = element.attrib.get("package")
+            if package:
+                return package
+        return None
+    
+    def content_hash(self) -> str:
+        """界面内容哈希（所有节点的 resource-id、文本与位置），用于判断界面是否变化"""
+        content = "|".join(
+            f"{e.attrib.get('resource-id', '')}:{e.attrib.get('text', '')}:{e.attrib.get('bounds', '')}"
+            for e in self._elements
+        )
+        return hashlib.md5(content.encode("utf-8")).hexdigest()
+    
+    def parent_of(self, node: UiNode) -> Optional[UiNode]:
+        if self._parents is None:
+            parent = node.element.getparent()
+        else:
+            parent = self._parents.get(node.element)
+        return UiNode(parent, self) if parent is not None else None
+    
+    def _wrap(self, elements) -> List[UiNode]:
+        return [UiNode(element, self) for element in elements]
+    
+    def find_all(self, locator, root: Optional[UiNode] = None) -> List[UiNode]:
+        """
+        按定位器查找所有匹配节点
+        :param locator: 定位器元组 (By, value)
+        :param root: 可选，限定在某个节点的子树内查找
+        :return: 节点列表（文档顺序）
+        """
+        locator_type, locator_value = locator
+        if locator_type in (AppiumBy.ID, "id"):
+            return self._find_by_id(locator_value, root)
+        if locator_type == AppiumBy.XPATH:
+            return self._find_by_xpath(locator_value, root)
+        if locator_type == AppiumBy.ANDROID_UIAUTOMATOR:
+            return self._find_by_ui_selector(locator_value, root)
+        if locator_type == AppiumBy.CLASS_NAME:
+            return self._filter(root, lambda e: e.attrib.get("class", e.tag) == locator_value)
+        if locator_type == AppiumBy.ACCESSIBILITY_ID:
+            return self._filter(root, lambda e: e.attrib.get("content-desc") == locator_value)
+        raise SnapshotUnsupportedLocator(f"快照不支持的定位器类型: {locator_type}")
+    
+    def find(self, locator, root: Optional[UiNode] = None) -> Optional[UiNode]:
+        nodes = self.find_all(locator, root)
+        return nodes[0] if nodes else None
+    
+    def _scope(self, root: Optional[UiNode]):
+        if root is None:
+            return self._elements
+        # 子树查找不包含根节点本身，与 element.find_elements 行为一致
+        return [element for element in root.element.iter() if element is not root.element]
+    
+    def _filter(self, root: Optional[UiNode], predicate) -> List[UiNode]:
+        return self._wrap(element for element in self._scope(root) if predicate(element))
+    
+    def _find_by_id(self, resource_id: str, root: Optional[UiNode]) -> List[UiNode]:
+        # 与 UiAutomator2 一致：不带包名的 id 按 ":id/<name>" 后缀匹配
+        if ":id/" not in resource_id:
+            suffix = f":id/{resource_id}"
+            return self._filter(root, lambda e: e.attrib.get("resource-id", "").endswith(suffix))
+        if root is None:
+            return self._wrap(self._id_index.get(resource_id, []))
+        return self._filter(root, lambda e: e.attrib.get("resource-id") == resource_id)
+    
+    def _find_by_ui_selector(self, selector: str, root: Optional[UiNode]) -> List[UiNode]:
+        match = UI_SELECTOR_PATTERN.match(selector.strip())
+        if not match:
+            raise SnapshotUnsupportedLocator(f"快照不支持的 UiSelector: {selector}")
+        method, value, instance = match.groups()
+        if method == "text":
+            nodes = self._filter(root, lambda e: e.attrib.get("text") == value)
+        elif method == "textContains":
+            nodes = self._filter(root, lambda e: value in e.attrib.get("text", ""))
+        elif method == "textMatches":
+            pattern = re.compile(value)
+            nodes = self._filter(root, lambda e: pattern.fullmatch(e.attrib.get("text", "")) is not None)
+        else:
+            nodes = self._find_by_id(value, root)
+        if instance is not None:
+            index = int(instance)
+            return nodes[index:index + 1]
+        return nodes
+    
+    def _find_by_xpath(self, xpath: str, root: Optional[UiNode]) -> List[UiNode]:
+        if lxml_etree is not None:
+            context = self._root if root is None else root.element
+            expression = xpath
+            if root is not None and expression.startswith("//"):
+                expression = f".{expression}"
+            try:
+                result = context.xpath(expression)
+            except lxml_etree.XPathError as e:
+                raise SnapshotUnsupportedLocator(f"XPath 解析失败: {xpath} | {e}") from e
+            if not isinstance(result, list):
+                raise SnapshotUnsupportedLocator(f"XPath 未返回节点集合: {xpath}")
+            return self._wrap(item for item in result if hasattr(item, "attrib"))
+        return self._find_by_simple_xpath(xpath, root)
+    
+    def _find_by_simple_xpath(self, xpath: str, root: Optional[UiNode]) -> List[UiNode]:
+        """无 lxml 时的简化 XPath 实现，仅支持 //tag[@a='v' and contains(@b,'v')] 与 (expr)[n]"""
+        expression = xpath.strip()
+        index = None
+        indexed = INDEXED_XPATH_PATTERN.match(expression)
+        if indexed:
+            expression, index = indexed.group(1).strip(), int(indexed.group(2))
+        match = SIMPLE_XPATH_PATTERN.match(expression)
+        if not match:
+            raise SnapshotUnsupportedLocator(f"快照不支持的 XPath: {xpath}")
+        tag, predicates = match.groups()
+        conditions = []
+        for predicate in PREDICATE_PATTERN.findall(predicates):
+            for part in re.split(r'\s+and\s+', predicate.strip()):
+                condition = CONDITION_PATTERN.match(part.strip())
+                if not condition:
+                    raise SnapshotUnsupportedLocator(f"快照不支持的 XPath 谓词: {part}")
+                equal_attr, _, equal_value, contains_attr, _, contains_value = condition.groups()
+                if equal_attr:
+                    conditions.append((equal_attr, equal_value, False))
+                else:
+                    conditions.append((contains_attr, contains_value, True))
+        
+        def _matches(element):
+            if tag != "*" and element.tag != tag and element.attrib.get("class") != tag:
+                return False
+            for attr, value, contains in conditions:
+                actual = element.attrib.get(attr)
+                if actual is None:
+                    return False
+                if contains and value not in actual:
+                    return False
+                if not contains and actual != value:
+                    return False
+            return True
+        
+        nodes = self._filter(root, _matches)
+        if index is not None:
+            return nodes[index - 1:index] if index >= 1 else []
+        return nodes
+
+
+def get_cached_snapshot(driver, refresh: bool = False, max_age: Optional[float] = None) -> UiSnapshot:
+    """
+    获取与 driver 绑定的界面快照，同一个 driver 的所有页面对象共享
+    :param driver: Appium driver
+    :param refresh: 是否强制重新抓取
+    :param max_age: 快照最长复用时间（秒），超过后自动重新抓取
+    :return: UiSnapshot
+    """
+    snapshot = getattr(driver, "_ui_snapshot", None)
+    if refresh or snapshot is None or (max_age is not None and snapshot.age > max_age):
+        snapshot = UiSnapshot.capture(driver)
+        driver._ui_snapshot = snapshot
+    return snapshot
+
+
+def store_snapshot(driver, snapshot: UiSnapshot):
+    """将已抓取的快照作为 driver 的当前快照（如界面稳定检测最后一次探测的结果）"""
+    driver._ui_snapshot = snapshot
+
+
+def invalidate_snapshot(driver):
+    """界面发生变化（点击、输入、返回、手势）后使快照失效"""
+    if getattr(driver, "_ui_snapshot", None) is not None:
+        driver._ui_snapshot = None
@@ -0,0 +1,136 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, List, NamedTuple, Optional
+
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, TimeoutException
+
+from utils.command_metrics import get_command_metrics
+from utils.config_loader import load_yaml_config
+from utils.trace_recorder import get_trace_recorder
+
+logger = logging.getLogger(__name__)
+
+config_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../config/config.yaml'))
+timeout_config = load_yaml_config(config_path).get('timeout') or {}
+
+# 默认等待超时（秒），对应 config.yaml 中的 timeout.default
+DEFAULT_TIMEOUT = float(timeout_config.get('default', 10))
+# 最大轮询间隔（秒），对应 config.yaml 中的 timeout.polling
+MAX_POLL_INTERVAL = float(timeout_config.get('polling', 0.5))
+# 首次轮询间隔（秒）：大多数元素在操作后很快出现，先密集轮询
+INITIAL_POLL_INTERVAL = min(0.05, MAX_POLL_INTERVAL)
+# 每次轮询后间隔的增长倍数
+BACKOFF_FACTOR = 1.5
+# 轮询期间忽略的异常（元素尚未出现 / 已刷新）
+IGNORED_EXCEPTIONS = (NoSuchElementException, StaleElementReferenceException)
+# 保留最近的等待记录数量
+MAX_WAIT_RECORDS = 1000
+
+
+class WaitRecord(NamedTuple):
+    """单次等待的耗时记录"""
+    description: str
+    timeout: float
+    duration: float
+    polls: int
+    success: bool
+
+
+_wait_records: Deque[WaitRecord] = deque(maxlen=MAX_WAIT_RECORDS)
+
+
+def get_wait_records() -> List[WaitRecord]:
+    """获取最近的等待记录（按时间顺序）"""
+    return list(_wait_records)
+
+
+def clear_wait_records():
+    _wait_records.clear()
+
+
+def record_wait(description: str, timeout: float, duration: float, polls: int, success: bool):
+    """记录一次等待（供不经过 AdaptiveWait 的等待方式使用，如界面稳定检测）"""
+    _wait_records.append(WaitRecord(description, timeout, duration, polls, success))
+    get_command_metrics().add_wait(duration)
+
+
+def disable_implicit_wait(driver):
+    """
+    会话开始时关闭隐式等待（只设置一次）：所有等待都由 AdaptiveWait 显式轮询，
+    轮询中每次失败的 find_element 立即返回，不再阻塞整个隐式等待时间
+    :param driver: Appium driver
+    """
+    driver.implicitly_wait(0)
+    logger.debug("隐式等待已关闭，统一使用显式等待")
+
+
+class AdaptiveWait:
+    """
+    自适应轮询等待：与 WebDriverWait 用法一致（until / until_not），
+    轮询间隔从 INITIAL_POLL_INTERVAL 开始按 BACKOFF_FACTOR 增长到 MAX_POLL_INTERVAL，
+    并记录每次等待的耗时（隐式等待在会话开始时已关闭，见 disable_implicit_wait）
+    """
+    
+    def __init__(self, driver, timeout: Optional[float] = None, max_interval: Optional[float] = None,
+                 initial_interval: Optional[float] = None, ignored_exceptions=IGNORED_EXCEPTIONS,
+                 wake_event: Optional[threading.Event] = None):
+        """
+        :param wake_event: 可选，轮询间隔内该事件被设置时立即进行下一次轮询（如设备端日志事件到达）
+        """
+        self.driver = driver
+        self.wake_event = wake_event
+        self.timeout = DEFAULT_TIMEOUT if timeout is None else float(timeout)
+        self.max_interval = max_interval or MAX_POLL_INTERVAL
+        self.initial_interval = min(initial_interval or INITIAL_POLL_INTERVAL, self.max_interval)
+        self.ignored_exceptions = tuple(ignored_exceptions)
+    
+    def _poll(self, method: Callable, expect_truthy: bool, message: str):
+        trace_start = time.perf_counter_ns()
+        start = time.monotonic()
+        deadline = start + self.timeout
+        interval = self.initial_interval
+        polls = 0
+        last_exception = None
+        description = message or getattr(method, "__name__", repr(method))
+        success = False
+        try:
+            while True:
+                polls += 1
+                try:
+                    value = method(self.driver)
+                    if bool(value) == expect_truthy:
+                        success = True
+                        return value if expect_truthy else True
+                except self.ignored_exceptions as e:
+                    if not expect_truthy:
+                        # 等待消失时，元素查找失败即视为已消失
+                        success = True
+                        return True
+                    last_exception = e
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                if self.wake_event is not None:
+                    self.wake_event.wait(min(interval, remaining))
+                else:
+                    time.sleep(min(interval, remaining))
+                interval = min(interval * BACKOFF_FACTOR, self.max_interval)
+        finally:
+            duration = time.monotonic() - start
+            record_wait(description, self.timeout, duration, polls, success)
+            get_trace_recorder().add("wait", description, trace_start, time.perf_counter_ns(),
+                                     {"polls": polls, "success": success})
+            logger.debug(f"等待{'成功' if success else '超时'}: {description} | 耗时 {duration:.3f}s | 轮询 {polls} 次")
+        raise TimeoutException(message, getattr(last_exception, "screen", None),
+                               getattr(last_exception, "stacktrace", None))
+    
+    def until(self, method: Callable, message: str = ""):
+        """等待 method(driver) 返回真值，返回该值；超时抛出 TimeoutException"""
+        return self._poll(method, True, message)
+    
+    def until_not(self, method: Callable, message: str = ""):
+        """等待 method(driver) 返回假值（或元素已不存在）；超时抛出 TimeoutException"""
+        return self._poll(method, False, message)